@@ -0,0 +1,86 @@
+"""
+Async API support
+Request checks and JSON rendering for plain Django async views
+
+DRF's APIView only runs synchronously, so async endpoints are plain Django
+coroutine views. async_read_view() gives them the same front door as the
+DRF views: the configured authentication and throttle classes, DRF-style
+error bodies and JSONRenderer output.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .db_router import activate, finish, request_state
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """
+    HttpResponse with data rendered exactly as DRF's JSONRenderer does
+    """
+    return HttpResponse(
+        JSONRenderer().render(data), status=status_code, content_type='application/json'
+    )
+
+
+def _check_request(request):
+    """
+    Authenticate and throttle like APIView.initial() (sync: JWT auth reads
+    the user row, throttles use the cache)
+
+    Returns:
+        tuple: (DRF Request, error response or None, routing state)
+    """
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        drf_request.user
+        for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+            throttle = throttle_class()
+            if not throttle.allow_request(drf_request, None):
+                raise exceptions.Throttled(throttle.wait())
+    except exceptions.APIException as exc:
+        response = json_response({'detail': exc.detail}, exc.status_code)
+        if isinstance(exc, exceptions.AuthenticationFailed) and authenticators:
+            response['WWW-Authenticate'] = authenticators[0].authenticate_header(drf_request)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(int(exc.wait))
+        return drf_request, response, None
+    return drf_request, None, request_state(drf_request.user, safe=True)
+
+
+def async_read_view(view):
+    """
+    Decorator for read-only async API views
+
+    Answers other methods with 405, runs _check_request() off the event
+    loop and calls view(drf_request, *args, **kwargs), with reads routed
+    to the replica when allowed (car_rental/db_router.py).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            response = json_response(
+                {'detail': f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+            response['Allow'] = ', '.join(SAFE_METHODS)
+            return response
+
+        drf_request, error, state = await sync_to_async(_check_request)(request)
+        if error is not None:
+            return error
+        token = activate(state)
+        try:
+            return await view(drf_request, *args, **kwargs)
+        finally:
+            finish(token, drf_request.user)
+
+    return wrapper
@@ -0,0 +1,107 @@
+"""
+Conditional GET support
+ETag / Last-Modified validators for list and retrieve endpoints
+"""
+import hashlib
+from calendar import timegm
+from operator import attrgetter
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before serializing
+
+    Validators:
+        - retrieve: ETag + Last-Modified from updated_at of the object (and
+          of joined rows listed in last_modified_fields)
+        - list: ETag only, from the rows of the page (id + updated_at
+          stamps), the full request path (cursor, page_size, ...) and the
+          page links. Costs nothing past the page query; no Last-Modified,
+          since a row leaving the page does not move any timestamp forward.
+
+    Used with ValuesListMixin (list pages go through its page_response()).
+    Subclasses can override get_etag_scope() when the payload depends on
+    who is asking (e.g. role-specific fields).
+    """
+    last_modified_fields = ('updated_at',)
+
+    def get_etag_scope(self, request):
+        return ''
+
+    def get_last_modified_fields(self):
+        return self.last_modified_fields
+
+    def get_values_list_columns(self):
+        # Page rows carry their stamps for the list ETag
+        columns = super().get_values_list_columns()
+        return tuple(columns) + tuple(
+            field for field in self.get_last_modified_fields() if field not in columns
+        )
+
+    def _get_stamps(self, row):
+        if isinstance(row, dict):
+            # values() row (see ValuesListMixin)
+            return [row[field] for field in self.get_last_modified_fields()]
+        return [
+            attrgetter(field.replace('__', '.'))(row)
+            for field in self.get_last_modified_fields()
+        ]
+
+    def _make_etag(self, request, parts):
+        raw = '|'.join([request.get_full_path(), self.get_etag_scope(request)] + parts)
+        return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+    def get_page_etag(self, request, page):
+        """
+        Returns:
+            str: ETag of a list page, from its rows and links
+        """
+        parts = [
+            str(self.paginator.get_next_link()),
+            str(self.paginator.get_previous_link()),
+        ]
+        for row in page:
+            pk = row['id'] if isinstance(row, dict) else row.pk
+            stamps = [stamp.isoformat() for stamp in self._get_stamps(row) if stamp is not None]
+            parts.append(':'.join([str(pk)] + stamps))
+        return self._make_etag(request, parts)
+
+    def get_object_validators(self, request, obj):
+        stamps = [stamp for stamp in self._get_stamps(obj) if stamp is not None]
+        etag = self._make_etag(request, [str(obj.pk)] + [stamp.isoformat() for stamp in stamps])
+        last_modified = timegm(max(stamps).utctimetuple()) if stamps else None
+        return etag, last_modified
+
+    def get_not_modified_response(self, request, etag, last_modified=None):
+        """
+        Returns:
+            HttpResponse: 304 (or 412) when the client copy is current, else None
+        """
+        return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def set_validators(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def page_response(self, page, render):
+        etag = self.get_page_etag(self.request, page)
+        not_modified = self.get_not_modified_response(self.request, etag)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(super().page_response(page, render), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_object_validators(request, instance)
+        not_modified = self.get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data)
+        return self.set_validators(response, etag, last_modified)
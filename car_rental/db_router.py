@@ -0,0 +1,162 @@
+"""
+Database routing
+Read replica for read-only API traffic, primary for everything else
+
+settings.REPLICA_DATABASE names an optional replica alias (None: every
+query goes to default). Reads are only sent to it inside a request that
+opted in (ReplicaReadMixin, async_read_view) and only when:
+    - the request method is safe (GET / HEAD / OPTIONS)
+    - the user has not written in the last REPLICA_STICKY_SECONDS (they
+      must see their own writes while the replica catches up)
+    - nothing has been written yet in this request and no transaction is
+      open on the primary
+Writes always go to default, and a request that writes pins its user to
+the primary for the sticky window. Management commands, Celery tasks and
+the admin never read from the replica.
+
+Data cached under versions bumped on commit (catalog payloads, price
+calendars, quotes) must be built inside primary_reads(): a lagging
+replica would otherwise store the old rows under the new version.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PIN_KEY = 'db:primary-pin:user:{pk}'
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """
+    Routing of the current request: replica alias to read from (or None)
+    and whether it has written anything
+    """
+    __slots__ = ('replica', 'safe', 'wrote')
+
+    def __init__(self, replica, safe):
+        self.replica = replica
+        self.safe = safe
+        self.wrote = False
+
+
+def replica_alias():
+    """
+    Configured replica alias, or None
+    """
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def _pin_key(user):
+    if user is None or not user.is_authenticated:
+        return None
+    return PIN_KEY.format(pk=user.pk)
+
+
+def is_pinned(user):
+    """
+    True while the user's recent write may not have reached the replica
+    """
+    key = _pin_key(user)
+    return key is not None and cache.get(key) is not None
+
+
+def pin_to_primary(user):
+    key = _pin_key(user)
+    if key is not None:
+        cache.set(key, 1, timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+def request_state(user, safe):
+    """
+    RoutingState for a request by user, or None when no replica is
+    configured (everything on default, nothing to track)
+    """
+    alias = replica_alias()
+    if alias is None:
+        return None
+    return RoutingState(alias if safe and not is_pinned(user) else None, safe)
+
+
+def activate(state):
+    """
+    Route the current context with state
+
+    Returns:
+        Token for finish()
+    """
+    return _state.set(state)
+
+
+def finish(token, user):
+    """
+    Restore the routing before activate(); pin user to the primary if the
+    request wrote (or was a write request)
+    """
+    state = _state.get()
+    _state.reset(token)
+    if state is not None and (state.wrote or not state.safe):
+        pin_to_primary(user)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary inside the block
+    """
+    token = _state.set(None)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    DATABASE_ROUTERS entry: see the module docstring
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same rows on both sides
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Let this view's safe-method requests read from the replica
+
+    Routing starts after authentication (the sticky window is per user)
+    and ends when the response is finalized. A streamed body is read after
+    that: bind its queryset with .using(queryset.db) inside the view.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._db_routing = activate(request_state(request.user, request.method in SAFE_METHODS))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_db_routing', None)
+        if token is not None:
+            self._db_routing = None
+            finish(token, request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
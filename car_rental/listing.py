@@ -0,0 +1,70 @@
+"""
+List rendering
+values()-based read path shared by the list endpoints
+"""
+from django.conf import settings
+from rest_framework.response import Response
+
+from .serializers import ValuesRenderer
+
+
+def get_values_renderer(serializer, extra_columns=()):
+    """
+    ValuesRenderer for serializer, or None when it cannot reproduce it or
+    settings.VALUES_LIST_RENDERING is False
+    """
+    if not getattr(settings, 'VALUES_LIST_RENDERING', True):
+        return None
+    return ValuesRenderer.compile(serializer, extra_columns)
+
+
+class ValuesListMixin:
+    """
+    Serve list pages from queryset.values() rows instead of model instances
+
+    The viewset's serializer (with its request context: role, ?fields=,
+    ?expand=) is compiled into a ValuesRenderer, the queryset is fetched with
+    only the columns it needs and each row is rendered directly. Pagination,
+    ETags and caching see the same queryset and the same output.
+
+    Falls back to the serializer when it has fields the renderer cannot
+    reproduce, or when settings.VALUES_LIST_RENDERING is False.
+    """
+    # Columns the paginator reads from each row (keyset position)
+    values_list_columns = ('id', 'created_at')
+
+    def get_values_list_columns(self):
+        return self.values_list_columns
+
+    def get_values_renderer(self):
+        return get_values_renderer(self.get_serializer(), self.get_values_list_columns())
+
+    def list_response(self, queryset):
+        """
+        Returns:
+            Response: Paginated (or full) list of queryset rendered for this request
+        """
+        renderer = self.get_values_renderer()
+        if renderer is None:
+            rows = queryset
+
+            def render(instances):
+                return self.get_serializer(instances, many=True).data
+        else:
+            rows = queryset.values(*renderer.columns)
+            render = renderer.render_many
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.page_response(page, render)
+        return Response(render(rows))
+
+    def page_response(self, page, render):
+        """
+        Paginated response for the rows of page (values() dicts or model
+        instances), rendered with render(rows)
+        """
+        return self.get_paginated_response(render(page))
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
@@ -0,0 +1,271 @@
+"""
+Request metrics
+Per-view latency, SQL query count and SQL time, served as Prometheus text
+
+MetricsMiddleware times every request and counts its queries. The
+collector of the current request sits in a contextvar, read by an execute
+wrapper installed on every connection (on connection_created and
+request_started): under ASGI, the ORM runs in sync_to_async threads with
+their own connections, and the contextvar follows the request there. Series are
+labelled with the URL name of the view (resolver_match.view_name), so the
+router's names cover ViewSet actions separately: reservation-list,
+reservation-activate, reservation-cancel, car-quote, ...
+
+Exposed on GET /metrics:
+    - http_requests_total{view, method, status}
+    - http_request_duration_seconds{view, method} (histogram)
+    - db_queries_per_request{view, method} (histogram; _sum = all queries)
+    - db_query_duration_seconds_total{view, method}
+
+Counters live in the process (one registry per worker; Prometheus keeps
+workers apart by instance). The body of a streamed response is produced
+after the middleware returns and is not counted.
+
+METRICS_ENABLED = False removes the middleware (MiddlewareNotUsed) and the
+/metrics route. /metrics is never public: scrapers send METRICS_TOKEN as a
+Bearer token, staff can read it from a logged-in session.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Anything else is reported as "other" (bounded label values)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """
+    Prometheus histogram: per-bucket counts (le is inclusive), sum, count
+    """
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class _ViewSeries:
+    __slots__ = ('latency', 'queries', 'sql_seconds')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of the request series of this process
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._responses = {}
+
+    def record(self, view, method, status, seconds, queries, sql_seconds):
+        with self._lock:
+            series = self._views.get((view, method))
+            if series is None:
+                series = self._views[(view, method)] = _ViewSeries()
+            series.latency.observe(seconds)
+            series.queries.observe(queries)
+            series.sql_seconds += sql_seconds
+            key = (view, method, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._responses.clear()
+
+    def render(self):
+        """
+        Returns:
+            str: Prometheus text exposition format
+        """
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Requests per view, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(self._responses.items()):
+                lines.append(
+                    f'http_requests_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}'
+                )
+
+            views = sorted(self._views.items())
+            for name, kind, help_text, get in (
+                ('http_request_duration_seconds', 'histogram',
+                 'Request latency per view.', lambda series: series.latency),
+                ('db_queries_per_request', 'histogram',
+                 'SQL queries per request.', lambda series: series.queries),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for (view, method), series in views:
+                    lines.extend(get(series).lines(name, f'view="{_label(view)}",method="{method}"'))
+
+            lines += [
+                '# HELP db_query_duration_seconds_total Time spent in SQL per view.',
+                '# TYPE db_query_duration_seconds_total counter',
+            ]
+            for (view, method), series in views:
+                lines.append(
+                    f'db_query_duration_seconds_total{{view="{_label(view)}",method="{method}"}} '
+                    f'{series.sql_seconds}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryCollector:
+    """
+    execute_wrapper counting the queries of one request and their time
+    """
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+# QueryCollector of the request being handled (copied into sync_to_async threads)
+_collector = ContextVar('metrics_query_collector', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_query_counter(connection=None, **kwargs):
+    """
+    Add the query counter to connection, or to every connection of the
+    current thread (signal receiver for connection_created / request_started)
+    """
+    targets = [connection] if connection is not None else connections.all()
+    for target in targets:
+        if _count_query not in target.execute_wrappers:
+            # First: execute_wrapper() contexts pop the last wrapper on exit
+            target.execute_wrappers.insert(0, _count_query)
+
+
+class MetricsMiddleware:
+    """
+    Record latency and SQL usage of every request in the registry
+
+    Sync and async capable, so it adds no thread hop in front of the async
+    views under ASGI. Put it first in MIDDLEWARE to time the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # request_started is sent from the thread the ORM runs in (the
+        # thread-sensitive sync thread under ASGI) and covers connections
+        # opened before the middleware was loaded
+        connection_created.connect(install_query_counter, dispatch_uid='metrics_query_counter')
+        request_started.connect(install_query_counter, dispatch_uid='metrics_query_counter')
+        install_query_counter()
+
+    def _record(self, request, response, started, collector):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None and match.view_name else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        registry.record(
+            view, method, response.status_code,
+            time.perf_counter() - started, collector.count, collector.seconds,
+        )
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        collector = QueryCollector()
+        started = time.perf_counter()
+        token = _collector.set(collector)
+        try:
+            response = self.get_response(request)
+        finally:
+            _collector.reset(token)
+        self._record(request, response, started, collector)
+        return response
+
+    async def __acall__(self, request):
+        collector = QueryCollector()
+        started = time.perf_counter()
+        token = _collector.set(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _collector.reset(token)
+        self._record(request, response, started, collector)
+        return response
+
+
+def metrics_view(request):
+    """
+    GET /metrics: the registry in Prometheus text format
+
+    Allowed with the METRICS_TOKEN Bearer token (when one is configured) or
+    for a logged-in staff user, refused otherwise
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    has_token = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+    user = getattr(request, 'user', None)
+    if not has_token and not (user is not None and user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,134 @@
+"""
+API Pagination
+Keyset (cursor) pagination shared by the list endpoints
+"""
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import remove_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over the (-created_at, id) keyset
+
+    DRF's CursorPagination only seeks on the first ordering field and falls
+    back to an OFFSET for rows sharing a created_at. Here the cursor holds
+    both created_at and id, so every page is a plain
+    WHERE (created_at, id) past the cursor ... LIMIT n query, bounded on
+    created_at so the index scan starts at the cursor: deep pages cost the
+    same as the first one.
+
+    Query params:
+        - cursor: Opaque cursor from the next/previous links
+        - page_size: Rows per page (capped at max_page_size)
+    """
+    ordering = ('-created_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        paginate_queryset() for async views: the page is read with async for
+        """
+        queryset = self._page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self._set_page([row async for row in queryset])
+
+    def _page_queryset(self, queryset, request):
+        """
+        Ordered, cursor-filtered queryset for the requested page (one extra
+        row), or None when pagination is off
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor.reverse)
+        self.position = self._parse_position(self.cursor.position) if self.cursor else None
+
+        if self.reverse:
+            queryset = queryset.order_by('created_at', '-id')
+        else:
+            queryset = queryset.order_by('-created_at', 'id')
+
+        if self.position is not None:
+            created_at, pk = self.position
+            # The OR alone cannot bound an index range: the plain
+            # created_at__gte/lte conjunct lets the scan start at the cursor
+            # instead of reading and discarding every row before it
+            if self.reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk),
+                    created_at__gte=created_at,
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk),
+                    created_at__lte=created_at,
+                )
+
+        # Fetch one extra row to know whether another page follows
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position(self.page[-1])
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Nothing left past the cursor: point back to the first page
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        position = self._get_position(self.page[0])
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position(self, instance):
+        if isinstance(instance, dict):
+            # values() row (see ValuesListMixin)
+            return f"{instance['created_at'].isoformat()}|{instance['id']}"
+        return f"{instance.created_at.isoformat()}|{instance.pk}"
+
+    def _parse_position(self, position):
+        if position is None:
+            return None
+        try:
+            created_at, pk = position.rsplit('|', 1)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
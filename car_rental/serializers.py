@@ -0,0 +1,220 @@
+"""
+Shared serializer helpers
+"""
+import copy
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.fields.files import FieldFile
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework.relations import PrimaryKeyRelatedField, RelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.settings import api_settings
+
+# Built field maps per serializer class (+ variant); see CachedFieldsMixin
+_field_cache = {}
+
+
+class CachedFieldsMixin:
+    """
+    Build a ModelSerializer's field map once per process
+
+    ModelSerializer.get_fields() introspects the model, builds every field
+    from scratch and deep-copies the declared ones for each serializer
+    instance. The built map is cached here, keyed on get_field_cache_key(),
+    and each instance receives a copy of it.
+
+    Copies stay necessary: fields get bound to their parent serializer, and
+    context-dependent fields (image URLs, method fields) must read this
+    instance's request. Leaf fields are copied shallowly (the cached ones are
+    never bound, so there is no state to leak); nested serializers and
+    fields with children are still deep-copied.
+    """
+
+    def get_field_cache_key(self):
+        return type(self)
+
+    def get_fields(self):
+        key = self.get_field_cache_key()
+        fields = _field_cache.get(key)
+        if fields is None:
+            fields = _field_cache[key] = super().get_fields()
+        return {name: _clone_field(field) for name, field in fields.items()}
+
+
+def _clone_field(field):
+    if isinstance(field, BaseSerializer) or hasattr(field, 'child') or hasattr(field, 'child_relation'):
+        return copy.deepcopy(field)
+    return copy.copy(field)
+
+
+def clear_field_cache():
+    _field_cache.clear()
+
+
+class UnsupportedField(Exception):
+    """
+    A serializer field ValuesRenderer cannot reproduce from values() rows
+    """
+
+
+# Fields whose to_representation() returns the DB value unchanged
+_PASSTHROUGH_FIELDS = (
+    drf_fields.BooleanField,
+    drf_fields.CharField,
+    drf_fields.ChoiceField,
+    drf_fields.IntegerField,
+)
+
+
+class ValuesRenderer:
+    """
+    Render a serializer's output from queryset.values() rows
+
+    The regular path builds a model instance per row (plus one per joined
+    relation) and walks every field's get_attribute()/to_representation().
+    Here the serializer's field map is compiled once into a list of
+    (name, accessor) steps over a flat values() row:
+
+        - plain columns: the field's own to_representation() (skipped for
+          fields that return the DB value unchanged)
+        - nested serializers: their steps over the '<source>__' columns
+        - primary key relations: the '<fk>' column as is
+        - SerializerMethodFields: from the serializer's values_method_fields
+          ({name: (columns, function(*column_values))})
+
+    The field map is the serializer instance's (role, ?fields=, ?expand=
+    already applied) so the rendered output is the same as serializer.data.
+    Anything else raises UnsupportedField; use ValuesRenderer.compile() to
+    get None instead and fall back to the serializer.
+    """
+
+    def __init__(self, serializer, extra_columns=()):
+        self._columns = list(extra_columns)
+        self._steps = self._compile(serializer, '')
+        self.columns = list(dict.fromkeys(self._columns))
+
+    @classmethod
+    def compile(cls, serializer, extra_columns=()):
+        try:
+            return cls(serializer, extra_columns)
+        except UnsupportedField:
+            return None
+
+    def render(self, row):
+        return {name: accessor(row) for name, accessor in self._steps}
+
+    def render_many(self, rows):
+        steps = self._steps
+        return [{name: accessor(row) for name, accessor in steps} for row in rows]
+
+    def _compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        method_fields = getattr(serializer, 'values_method_fields', {})
+        steps = []
+
+        for field in serializer._readable_fields:
+            if isinstance(field, drf_fields.SerializerMethodField):
+                if field.field_name not in method_fields:
+                    raise UnsupportedField(field.field_name)
+                columns, function = method_fields[field.field_name]
+                keys = [prefix + column for column in columns]
+                self._columns.extend(keys)
+                steps.append((field.field_name, _method_accessor(keys, function)))
+                continue
+
+            if field.source == '*' or '.' in field.source:
+                raise UnsupportedField(field.field_name)
+            key = prefix + field.source
+
+            if isinstance(field, BaseSerializer):
+                if isinstance(field, ListSerializer):
+                    raise UnsupportedField(field.field_name)
+                pk_key = f'{key}__{field.Meta.model._meta.pk.attname}'
+                self._columns.append(pk_key)
+                nested_steps = self._compile(field, key + '__')
+                steps.append((field.field_name, _nested_accessor(pk_key, nested_steps)))
+                continue
+
+            model_field = _concrete_field(model, field.source, field.field_name)
+            self._columns.append(key)
+
+            if isinstance(field, RelatedField):
+                if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field is not None:
+                    raise UnsupportedField(field.field_name)
+                steps.append((field.field_name, itemgetter(key)))
+            elif isinstance(field, drf_fields.FileField):
+                steps.append((field.field_name, _file_accessor(key, model_field, field.to_representation)))
+            elif type(field) is drf_fields.DateTimeField:
+                steps.append((field.field_name, _datetime_accessor(key, field)))
+            elif type(field) in _PASSTHROUGH_FIELDS:
+                steps.append((field.field_name, itemgetter(key)))
+            else:
+                steps.append((field.field_name, _value_accessor(key, field.to_representation)))
+
+        return steps
+
+
+def _concrete_field(model, name, field_name):
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise UnsupportedField(field_name)
+    if not model_field.concrete or model_field.many_to_many:
+        raise UnsupportedField(field_name)
+    return model_field
+
+
+def _value_accessor(key, to_representation):
+    def accessor(row):
+        value = row[key]
+        return None if value is None else to_representation(value)
+    return accessor
+
+
+def _datetime_accessor(key, field):
+    """
+    DateTimeField.to_representation() with the output timezone looked up
+    once instead of per value (aware ISO 8601 values; anything else goes
+    through the field)
+    """
+    to_representation = field.to_representation
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return _value_accessor(key, to_representation)
+
+    def accessor(row):
+        value = row[key]
+        if value is None or value.utcoffset() is None:
+            return None if value is None else to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return accessor
+
+
+def _file_accessor(key, model_field, to_representation):
+    # values() gives the stored name; the field wants a FieldFile for .url
+    def accessor(row):
+        name = row[key]
+        if name is None:
+            return None
+        return to_representation(FieldFile(None, model_field, name))
+    return accessor
+
+
+def _method_accessor(keys, function):
+    def accessor(row):
+        return function(*[row[key] for key in keys])
+    return accessor
+
+
+def _nested_accessor(pk_key, steps):
+    def accessor(row):
+        if row[pk_key] is None:
+            return None
+        return {name: step(row) for name, step in steps}
+    return accessor
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'cars',
     'reservations',
     'users',
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it times the whole stack (car_rental/metrics.py)
+    'car_rental.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +94,69 @@ DATABASES = {
     }
 }
 
+# Optional read replica (car_rental/db_router.py): safe-method API reads go
+# to REPLICA_DATABASE, writes and a user's reads right after their own
+# write (REPLICA_STICKY_SECONDS) stay on default. The 'replica' alias is
+# always declared (on the primary when DB_REPLICA_HOST is unset) but only
+# routed to when DB_REPLICA_HOST is set; tests mirror it to default and
+# turn routing on with override_settings(REPLICA_DATABASE='replica').
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': DB_REPLICA_HOST or DATABASES['default']['HOST'],
+    'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+
+REPLICA_DATABASE = 'replica' if DB_REPLICA_HOST else None
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+DATABASE_ROUTERS = ['car_rental.db_router.PrimaryReplicaRouter']
+
+
+# Cache
+# Redis in production (REDIS_CACHE_URL), local memory otherwise (tests, dev)
+
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL')
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a serialized car list/detail payload stays cached
+CAR_CACHE_TIMEOUT = int(os.environ.get('CAR_CACHE_TIMEOUT', 300))
+# Seconds a catalog version key lives (cars/cache.py); expiry only costs misses
+CAR_CACHE_VERSION_TIMEOUT = int(os.environ.get('CAR_CACHE_VERSION_TIMEOUT', 24 * 60 * 60))
+
+# Seconds a car's computed rate calendar stays cached (cars/pricing.py)
+PRICING_CACHE_TIMEOUT = int(os.environ.get('PRICING_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# In-process price quote memo (cars/quotes.py): entries per process, seconds
+QUOTE_CACHE_SIZE = int(os.environ.get('QUOTE_CACHE_SIZE', 10000))
+QUOTE_CACHE_TTL = int(os.environ.get('QUOTE_CACHE_TTL', 300))
+
+# Per-view latency / SQL metrics on /metrics (car_rental/metrics.py);
+# False removes the middleware and the endpoint
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+# Bearer token for scraping /metrics; without it only staff sessions can
+# read the endpoint
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Render list endpoints from values() rows (car_rental/listing.py);
+# False falls back to the model serializers
+VALUES_LIST_RENDERING = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -140,6 +206,8 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'car_rental.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 20,
     'DEFAULT_THROTTLE_CLASSES': (
         'rest_framework.throttling.AnonRateThrottle',
         'rest_framework.throttling.UserRateThrottle',
@@ -184,4 +252,16 @@ CELERY_BEAT_SCHEDULE = {
         "task": "reservations.tasks.cleanup_expired_reservations",
         "schedule": crontab(hour=1, minute=0),  # 01:00
     },
-}
\ No newline at end of file
+    "cleanup_expired_pending_reservations": {
+        "task": "reservations.tasks.cleanup_expired_pending_reservations",
+        "schedule": crontab(),  # every minute
+        # A run queued while workers were down is superseded by the next one
+        "options": {"expires": 60},
+    },
+}
+# Rows per transaction in cleanup_expired_reservations (reservations/tasks.py)
+CLEANUP_CHUNK_SIZE = int(os.environ.get("CLEANUP_CHUNK_SIZE", 1000))
+
+# Minutes a new pending reservation has to be paid before
+# cleanup_expired_pending_reservations cancels it
+PAYMENT_WINDOW_MINUTES = int(os.environ.get("PAYMENT_WINDOW_MINUTES", 30))
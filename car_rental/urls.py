@@ -20,18 +20,21 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import routers
 from cars.views import CarViewSet
-from reservations.views import ReservationViewSet
+from reservations.views import ReportViewSet, ReservationViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from users.views import CustomTokenObtainPairView  
+from car_rental.metrics import metrics_view
 
 router = routers.DefaultRouter()
 router.register(r'cars', CarViewSet, basename='car')
 router.register(r'reservations', ReservationViewSet, basename='reservation')
+router.register(r'reports', ReportViewSet, basename='report')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
+    path('api/async/cars/', include('cars.async_urls')),
     path('api-auth/', include('rest_framework.urls')),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -41,6 +44,10 @@ urlpatterns = [
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
 ]
 
+# Prometheus metrics (METRICS_ENABLED)
+if getattr(settings, 'METRICS_ENABLED', True):
+    urlpatterns.append(path('metrics', metrics_view, name='metrics'))
+
 # Static files için
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
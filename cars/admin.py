@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Car
+from .models import Car, RateRule
 
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
@@ -20,4 +20,31 @@ class CarAdmin(admin.ModelAdmin):
         }),
     )
     search_help_text = "Search by brand, model, year, or color"
-    empty_value_display = "N/A"
\ No newline at end of file
+    empty_value_display = "N/A"
+
+
+@admin.register(RateRule)
+class RateRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'car', 'brand', 'start_date', 'end_date', 'weekdays', 'rate', 'multiplier', 'priority', 'is_active')
+    list_filter = ('is_active', 'brand')
+    search_fields = ('name', 'brand', 'car__brand', 'car__model')
+    list_editable = ('is_active',)
+    list_select_related = ('car',)
+    ordering = ('priority', 'id')
+    readonly_fields = ('created_at', 'updated_at')
+    fieldsets = (
+        (None, {
+            'fields': ('name', 'is_active', 'priority')
+        }),
+        ('Applies to', {
+            'fields': ('car', 'brand', 'start_date', 'end_date', 'weekdays')
+        }),
+        ('Adjustment', {
+            'fields': ('rate', 'multiplier')
+        }),
+        ('Dates', {
+            'fields': ('created_at', 'updated_at')
+        }),
+    )
+    search_help_text = "Search by rule name, brand or car"
+    empty_value_display = "All"
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CarsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cars'
+
+    def ready(self):
+        """
+        Called when Django starts
+        Loads and activates signals
+        """
+        import cars.signals
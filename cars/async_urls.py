@@ -0,0 +1,9 @@
+from django.urls import path
+from .async_views import car_available, car_detail, car_list, car_quote
+
+urlpatterns = [
+    path('', car_list, name='async-car-list'),
+    path('available/', car_available, name='async-car-available'),
+    path('<int:pk>/', car_detail, name='async-car-detail'),
+    path('<int:pk>/quote/', car_quote, name='async-car-quote'),
+]
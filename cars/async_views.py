@@ -0,0 +1,89 @@
+"""
+Async Car API Views
+ASGI versions of the read-heavy car endpoints
+
+Provides:
+    - GET /api/async/cars/ → List all cars
+    - GET /api/async/cars/{id}/ → Retrieve car details
+    - GET /api/async/cars/available/?start=YYYY-MM-DD&end=YYYY-MM-DD → Cars free for the given dates
+    - GET /api/async/cars/{id}/quote/?start=YYYY-MM-DD&end=YYYY-MM-DD → Price quote for a stay
+
+Same payloads, pagination, authentication and throttling as CarViewSet, but
+each view awaits its queries (aget, async for) instead of holding a worker
+thread. Under an ASGI server (uvicorn car_rental.asgi:application, see the
+README) one process keeps many of these requests in flight while the
+database answers; under WSGI they still work, one request per thread.
+
+Not covered: the catalog cache and conditional GET of CarViewSet (these
+views always read the database) and writes, which stay on /api/cars/.
+"""
+from rest_framework import status
+from rest_framework.settings import api_settings
+
+from car_rental.async_api import async_read_view, json_response
+from car_rental.listing import get_values_renderer
+from .models import Car
+from .quotes import aget_quote, check_quote_dates
+from .serializers import CarSerializer
+from .views import CarViewSet, available_cars, parse_stay
+
+NOT_FOUND = {'detail': 'No Car matches the given query.'}
+
+
+async def _list_response(request, queryset):
+    """
+    Paginated list of queryset, rendered from values() rows when possible
+    (see ValuesListMixin.list_response)
+    """
+    context = {'request': request}
+    renderer = get_values_renderer(CarSerializer(context=context), CarViewSet.values_list_columns)
+    rows = queryset.values(*renderer.columns) if renderer is not None else queryset
+
+    def render(items):
+        if renderer is not None:
+            return renderer.render_many(items)
+        return CarSerializer(items, many=True, context=context).data
+
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    page = await paginator.apaginate_queryset(rows, request)
+    if page is None:
+        return json_response(render([row async for row in rows]))
+    return json_response(paginator.get_paginated_response(render(page)).data)
+
+
+@async_read_view
+async def car_list(request):
+    return await _list_response(request, Car.objects.all())
+
+
+@async_read_view
+async def car_detail(request, pk):
+    try:
+        car = await Car.objects.aget(pk=pk)
+    except Car.DoesNotExist:
+        return json_response(NOT_FOUND, status.HTTP_404_NOT_FOUND)
+    return json_response(CarSerializer(car, context={'request': request}).data)
+
+
+@async_read_view
+async def car_available(request):
+    try:
+        start, end = parse_stay(request.query_params)
+    except ValueError as exc:
+        return json_response({'detail': str(exc)}, status.HTTP_400_BAD_REQUEST)
+    return await _list_response(request, available_cars(Car.objects.all(), start, end))
+
+
+@async_read_view
+async def car_quote(request, pk):
+    try:
+        start, end = parse_stay(request.query_params)
+        check_quote_dates(start, end)
+    except ValueError as exc:
+        return json_response({'detail': str(exc)}, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        quote = await aget_quote(pk, start, end)
+    except Car.DoesNotExist:
+        return json_response(NOT_FOUND, status.HTTP_404_NOT_FOUND)
+    return json_response(quote)
@@ -0,0 +1,128 @@
+"""
+Car Catalog Cache
+Read-through cache for the serialized car list/detail payloads
+
+Keys are versioned instead of deleted:
+    - cars:list:version        → bumped on any car change
+    - cars:detail:{id}:version → bumped only when that car changes
+Old entries are never read again and expire after CAR_CACHE_TIMEOUT.
+Version keys expire too (CAR_CACHE_VERSION_TIMEOUT: detail URLs can carry
+any id) and restart at a fresh value, never at one already handed out.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_VERSION_KEY = 'cars:list:version'
+DETAIL_VERSION_KEY = 'cars:detail:{pk}:version'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _timeout():
+    return getattr(settings, 'CAR_CACHE_TIMEOUT', 300)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_cache_stats():
+    """
+    Hit/miss counters of this process
+
+    Returns:
+        dict: hits, misses
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def _version_timeout():
+    return getattr(settings, 'CAR_CACHE_VERSION_TIMEOUT', 24 * 60 * 60)
+
+
+def _fresh_version():
+    # Past any value of an earlier, expired or evicted incarnation of the
+    # key (whose entries may still be cached)
+    return time.time_ns() // 1000
+
+
+def get_version(version_key, timeout=None):
+    """
+    Current value of a version key, created when missing
+
+    Args:
+        timeout: Lifetime of a created key (default CAR_CACHE_VERSION_TIMEOUT)
+    """
+    if timeout is None:
+        timeout = _version_timeout()
+    return cache.get_or_set(version_key, _fresh_version, timeout=timeout)
+
+
+def bump_version(version_key, timeout=None):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # Key missing (expired, evicted or never read): any new value invalidates
+        if timeout is None:
+            timeout = _version_timeout()
+        cache.set(version_key, _fresh_version(), timeout=timeout)
+
+
+def _uri_hash(request):
+    # Absolute URI: payload holds absolute image/next links
+    return hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def car_list_key(request):
+    version = get_version(LIST_VERSION_KEY)
+    return f'cars:list:{version}:{_uri_hash(request)}'
+
+
+def car_detail_key(request, pk):
+    version = get_version(DETAIL_VERSION_KEY.format(pk=pk))
+    return f'cars:detail:{pk}:{version}:{_uri_hash(request)}'
+
+
+def get_cached(key):
+    """
+    Cached payload for key, or None on a miss (hit/miss counted)
+    """
+    payload = cache.get(key)
+    _record('misses' if payload is None else 'hits')
+    return payload
+
+
+def set_cached(key, payload):
+    cache.set(key, payload, timeout=_timeout())
+
+
+def invalidate_cars(car_ids):
+    """
+    Invalidate the list payloads and the detail payloads of the given cars
+    once the current transaction commits (so no reader can re-cache the old
+    row in between).
+    """
+    car_ids = set(car_ids)
+    if not car_ids:
+        return
+
+    def bump():
+        bump_version(LIST_VERSION_KEY)
+        for pk in car_ids:
+            bump_version(DETAIL_VERSION_KEY.format(pk=pk))
+
+    transaction.on_commit(bump)
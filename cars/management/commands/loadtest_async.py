@@ -0,0 +1,258 @@
+"""
+Concurrency load test: sync car endpoints under WSGI against their async
+versions under ASGI
+
+Usage:
+    python manage.py loadtest_async --endpoint available --latency-ms 50
+    python manage.py loadtest_async --endpoint quote --concurrency 100 --requests 1000 --wsgi-workers 8
+
+Both paths are driven in-process, without sockets, so only the request
+handling is compared:
+    - wsgi: /api/cars/... through WSGIHandler on --wsgi-workers threads,
+      i.e. that many sync workers (gunicorn -w N, or threads)
+    - asgi: /api/async/cars/... through the ASGI application on one event
+      loop, i.e. a single uvicorn worker
+--concurrency clients each send their share of --requests back to back.
+
+Every SQL query is delayed by --latency-ms (a connection execute wrapper)
+to model a database across the network. Each request carries its own
+query string, dates and client address, so the catalog cache, the quote
+memo and the anonymous throttle see every request as new and both paths
+always reach the database.
+
+Needs committed data and one database connection per request in flight:
+missing cars (up to --cars) are created for the run and deleted after.
+"""
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from statistics import quantiles
+
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from cars.models import Car
+from cars.quotes import memo as quote_memo
+
+ENDPOINTS = ('list', 'detail', 'available', 'quote')
+
+
+def latency_wrapper(seconds):
+    """
+    execute_wrapper that sleeps before every query (in the calling thread,
+    as a network round trip would block it)
+    """
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = "Compare throughput of the sync (WSGI) and async (ASGI) car endpoints under DB latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=ENDPOINTS, default="available")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--wsgi-workers", type=int, default=4)
+        parser.add_argument("--latency-ms", type=float, default=50.0)
+        parser.add_argument("--cars", type=int, default=50, help="Cars in the catalog during the run")
+
+    def _target(self, endpoint, index, car_ids):
+        """
+        (path below /cars/, query string) of request number index
+        """
+        car_id = car_ids[index % len(car_ids)]
+        start = date.today() + timedelta(days=1 + index // 300)
+        end = start + timedelta(days=1 + index % 300)
+        bust = f"lt={self.run_id}-{index}"
+        if endpoint == 'list':
+            return '', bust
+        if endpoint == 'detail':
+            return f'{car_id}/', bust
+        if endpoint == 'available':
+            return 'available/', f'start={start}&end={end}&{bust}'
+        return f'{car_id}/quote/', f'start={start}&end={end}&{bust}'
+
+    def _client_address(self, index):
+        index += self.address_offset
+        return f'10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}'
+
+    def _wsgi_call(self, handler, path, query, address):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost',
+            'REMOTE_ADDR': address,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': self.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = int(status.split()[0])
+
+        body = handler(environ, start_response)
+        try:
+            b''.join(body)
+        finally:
+            # Sends request_finished: closes the thread's DB connection
+            body.close()
+        return result['status']
+
+    def _run_wsgi(self, endpoint, car_ids, options):
+        handler = WSGIHandler()
+        workers = ThreadPoolExecutor(max_workers=options['wsgi_workers'])
+        timings, statuses = [], []
+
+        def client(indexes):
+            for index in indexes:
+                path, query = self._target(endpoint, index, car_ids)
+                started = time.perf_counter()
+                status = workers.submit(
+                    self._wsgi_call, handler, f'/api/cars/{path}', query, self._client_address(index)
+                ).result()
+                timings.append(time.perf_counter() - started)
+                statuses.append(status)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as clients:
+            list(clients.map(client, self._shares(options)))
+        elapsed = time.perf_counter() - started
+        workers.shutdown()
+        return elapsed, timings, statuses
+
+    async def _asgi_call(self, application, path, query, address):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'root_path': '',
+            'query_string': query.encode(),
+            'headers': [(b'host', b'localhost')],
+            'client': (address, 50000),
+            'server': ('localhost', 80),
+        }
+        result = {}
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                result['status'] = message['status']
+
+        await application(scope, receive, send)
+        return result['status']
+
+    async def _asgi_clients(self, application, endpoint, car_ids, options):
+        timings, statuses = [], []
+
+        async def client(indexes):
+            for index in indexes:
+                path, query = self._target(endpoint, index, car_ids)
+                started = time.perf_counter()
+                status = await self._asgi_call(
+                    application, f'/api/async/cars/{path}', query, self._client_address(index)
+                )
+                timings.append(time.perf_counter() - started)
+                statuses.append(status)
+
+        await asyncio.gather(*(client(indexes) for indexes in self._shares(options)))
+        return timings, statuses
+
+    def _run_asgi(self, endpoint, car_ids, options):
+        application = get_asgi_application()
+        started = time.perf_counter()
+        timings, statuses = asyncio.run(self._asgi_clients(application, endpoint, car_ids, options))
+        return time.perf_counter() - started, timings, statuses
+
+    def _shares(self, options):
+        """
+        Request indexes of each client
+        """
+        clients = options['concurrency']
+        return [range(client, options['requests'], clients) for client in range(clients)]
+
+    def _report(self, name, elapsed, timings, statuses):
+        errors = sum(1 for status in statuses if status != 200)
+        cuts = quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        throughput = len(timings) / elapsed
+        self.stdout.write(
+            f"{name:>5}: {len(timings)} requests in {elapsed:.2f}s  {throughput:.0f} req/s  "
+            f"p50 {cuts[49] * 1000:.0f}ms  p95 {cuts[94] * 1000:.0f}ms  errors {errors}"
+        )
+        return throughput, errors
+
+    def _ensure_cars(self, count):
+        missing = count - Car.objects.count()
+        if missing <= 0:
+            return []
+        created = Car.objects.bulk_create([
+            Car(brand="Loadtest", model=f"Loadtest {index}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for index in range(missing)
+        ])
+        return [car.pk for car in created]
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['wsgi_workers'] < 1:
+            raise CommandError("--requests, --concurrency and --wsgi-workers must be positive")
+
+        self.run_id = uuid.uuid4().hex[:8]
+        self.address_offset = 0
+        endpoint = options['endpoint']
+        created = self._ensure_cars(options['cars'])
+        car_ids = list(Car.objects.order_by('id').values_list('id', flat=True)[:options['cars']])
+        if not car_ids:
+            raise CommandError("No cars to test against")
+
+        wrapper = latency_wrapper(options['latency_ms'] / 1000)
+
+        def install(sender, connection, **kwargs):
+            if wrapper not in connection.execute_wrappers:
+                connection.execute_wrappers.append(wrapper)
+
+        connection.close()
+        connection_created.connect(install)
+        self.stdout.write(
+            f"{endpoint}: {options['requests']} requests, {options['concurrency']} clients, "
+            f"{options['latency_ms']:g}ms per query, {options['wsgi_workers']} WSGI workers"
+        )
+        try:
+            quote_memo.clear()
+            wsgi_throughput, wsgi_errors = self._report('wsgi', *self._run_wsgi(endpoint, car_ids, options))
+            quote_memo.clear()
+            self.address_offset = options['requests']
+            asgi_throughput, asgi_errors = self._report('asgi', *self._run_asgi(endpoint, car_ids, options))
+        finally:
+            connection_created.disconnect(install)
+            connection.close()
+            if created:
+                Car.objects.filter(pk__in=created).delete()
+
+        self.stdout.write(f"async speedup x{asgi_throughput / wsgi_throughput:.2f}")
+        if wsgi_errors or asgi_errors:
+            raise CommandError("Some requests did not return 200")
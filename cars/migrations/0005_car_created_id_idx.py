@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0004_rename_daily_price_car_daily_rate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['-created_at', 'id'], name='car_created_id_idx'),
+        ),
+    ]
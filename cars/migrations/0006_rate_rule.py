@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0005_car_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('brand', models.CharField(blank=True, max_length=100, verbose_name='Brand')),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='Start Date')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='End Date')),
+                ('weekdays', models.CharField(blank=True, help_text='Digits 0-6 (Monday = 0), e.g. 56 for weekends. Blank: every day.', max_length=7, verbose_name='Weekdays')),
+                ('rate', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Daily Rate (USD)')),
+                ('multiplier', models.DecimalField(decimal_places=3, default=1, max_digits=5, verbose_name='Multiplier')),
+                ('priority', models.IntegerField(default=0, verbose_name='Priority')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('car', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rate_rules', to='cars.car', verbose_name='Vehicle')),
+            ],
+            options={
+                'verbose_name': 'Rate Rule',
+                'verbose_name_plural': 'Rate Rules',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
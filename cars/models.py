@@ -1,6 +1,29 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 
+
+# Rental rules on the raw status flags, shared by Car and the values() list path
+def can_be_rented(in_fleet, is_rented, is_damaged, is_maintenance):
+    return (in_fleet and 
+            not is_rented and 
+            not is_damaged and 
+            not is_maintenance)
+
+
+def rental_status(in_fleet, is_rented, is_damaged, is_maintenance):
+    if not can_be_rented(in_fleet, is_rented, is_damaged, is_maintenance):
+        if is_maintenance:
+            return "In Maintenance - Not Available"
+        elif is_damaged:
+            return "Damaged - Not Available"
+        elif is_rented:
+            return "Rented - Not Available"
+        else:
+            return "Not Available"
+    else:
+        return "Available for Rental"
+
+
 class Car(models.Model):
         
     # Vehicle information
@@ -44,16 +67,17 @@ class Car(models.Model):
         verbose_name = "Vehicle"
         verbose_name_plural = "Vehicles"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['-created_at', 'id'], name='car_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.brand} {self.model} ({self.year})"
     
     # BUSINESS LOGIC METHODS
     def can_be_rented(self):
-        return (self.in_fleet and 
-                not self.is_rented and 
-                not self.is_damaged and 
-                not self.is_maintenance)
+        return can_be_rented(self.in_fleet, self.is_rented, self.is_damaged, self.is_maintenance)
     
     def get_status(self):
         if self.is_maintenance:
@@ -66,17 +90,7 @@ class Car(models.Model):
             return "Available"
     
     def get_rental_status(self):
-        if not self.can_be_rented():
-            if self.is_maintenance:
-                return "In Maintenance - Not Available"
-            elif self.is_damaged:
-                return "Damaged - Not Available"
-            elif self.is_rented:
-                return "Rented - Not Available"
-            else:
-                return "Not Available"
-        else:
-            return "Available for Rental"
+        return rental_status(self.in_fleet, self.is_rented, self.is_damaged, self.is_maintenance)
         
     def get_daily_rate_display(self):
         return f"${self.daily_rate:.2f}"
@@ -97,4 +111,84 @@ class Car(models.Model):
         Save with validation
         """
         self.clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class RateRule(models.Model):
+    """
+    Rate calendar rule: adjusts the daily rate of a car, a brand or the
+    whole fleet on the days it covers
+
+    Scope (most specific first):
+        - car: only this car
+        - brand: every car of the brand (the vehicle class)
+        - neither: every car
+
+    Days covered: start_date..end_date inclusive (open-ended when blank),
+    restricted to weekdays when set ("56" = Saturday and Sunday, Monday = 0).
+
+    Pricing a day (see cars/pricing.py):
+        - rate: replaces the car's daily_rate (highest priority wins)
+        - multiplier: all matching rules multiply (season × weekend × demand)
+    """
+    name = models.CharField(max_length=100, verbose_name="Name")
+    
+    # Scope
+    car = models.ForeignKey(
+        Car, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='rate_rules', verbose_name="Vehicle"
+    )
+    brand = models.CharField(max_length=100, blank=True, verbose_name="Brand")
+    
+    # Days
+    start_date = models.DateField(null=True, blank=True, verbose_name="Start Date")
+    end_date = models.DateField(null=True, blank=True, verbose_name="End Date")
+    weekdays = models.CharField(
+        max_length=7, blank=True, verbose_name="Weekdays",
+        help_text="Digits 0-6 (Monday = 0), e.g. 56 for weekends. Blank: every day."
+    )
+    
+    # Adjustment
+    rate = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True,
+        verbose_name="Daily Rate (USD)"
+    )
+    multiplier = models.DecimalField(
+        max_digits=5, decimal_places=3, default=1, verbose_name="Multiplier"
+    )
+    priority = models.IntegerField(default=0, verbose_name="Priority")
+    is_active = models.BooleanField(default=True, verbose_name="Active")
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
+    
+    class Meta:
+        verbose_name = "Rate Rule"
+        verbose_name_plural = "Rate Rules"
+        ordering = ['priority', 'id']
+    
+    def __str__(self):
+        scope = self.car or self.brand or "All vehicles"
+        return f"{self.name} ({scope})"
+    
+    def get_weekdays(self):
+        return [int(day) for day in self.weekdays]
+    
+    def clean(self):
+        if self.car_id and self.brand:
+            raise ValidationError("A rule applies to a car or a brand, not both")
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValidationError("Start date must not be after end date")
+        if any(day not in "0123456" for day in self.weekdays):
+            raise ValidationError("Weekdays must be digits from 0 (Monday) to 6 (Sunday)")
+        if self.rate is not None and self.rate <= 0:
+            raise ValidationError("Daily rate must be greater than 0!")
+        if self.multiplier is not None and self.multiplier <= 0:
+            raise ValidationError("Multiplier must be greater than 0!")
+    
+    def save(self, *args, **kwargs):
+        """
+        Save with validation
+        """
+        self.clean()
+        super().save(*args, **kwargs)
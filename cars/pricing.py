@@ -0,0 +1,186 @@
+"""
+Pricing Engine
+Day-by-day stay prices from the rate calendar (RateRule)
+
+A car's calendar is a NumPy array of daily rates in cents, one per
+calendar year. It is built from a single query for the active rules that
+can touch the car in that year, with one vectorized pass per rule over the
+year's days, and cached under versioned keys (as in cars/cache.py):
+    - pricing:rules:version    → bumped when any rate rule changes
+    - pricing:car:{id}:version → bumped when the car changes (daily_rate)
+Version keys live as long as the calendars (PRICING_CACHE_TIMEOUT): quotes
+read them for the requested id before the car is loaded.
+Pricing a stay is then a slice and a sum over the cached arrays.
+
+A stay is charged per night: start_date up to (not including) end_date,
+like Reservation.get_duration_days().
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from car_rental.db_router import primary_reads
+from .cache import bump_version, get_version
+from .models import RateRule
+
+RULES_VERSION_KEY = 'pricing:rules:version'
+CAR_VERSION_KEY = 'pricing:car:{pk}:version'
+
+CENT = Decimal('0.01')
+# RateRule.multiplier has 3 decimal places
+MULTIPLIER_PLACES = 3
+MULTIPLIER_SCALE = 10 ** MULTIPLIER_PLACES
+
+
+def _timeout():
+    return getattr(settings, 'PRICING_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def pricing_version(car_id):
+    """
+    Changes whenever a price of the car may have changed
+    """
+    keys = (RULES_VERSION_KEY, CAR_VERSION_KEY.format(pk=car_id))
+    # One round trip when both versions exist (the usual case)
+    found = cache.get_many(keys)
+    return '.'.join(str(found.get(key) or get_version(key, _timeout())) for key in keys)
+
+
+def invalidate_rules():
+    """
+    Drop every cached calendar once the current transaction commits
+    """
+    transaction.on_commit(lambda: bump_version(RULES_VERSION_KEY, _timeout()))
+
+
+def invalidate_car_pricing(car_ids):
+    """
+    Drop the cached calendars of the given cars once the current
+    transaction commits
+    """
+    car_ids = set(car_ids)
+    if not car_ids:
+        return
+
+    def bump():
+        for pk in car_ids:
+            bump_version(CAR_VERSION_KEY.format(pk=pk), _timeout())
+
+    transaction.on_commit(bump)
+
+
+def build_calendar(car, year):
+    """
+    Daily rates of the car for a calendar year, in cents
+
+    Rules are applied in priority order (more specific scope first on
+    ties): a rule's rate replaces the day's base rate, its multiplier
+    scales it. The loop runs over rules, each one a mask over all days.
+    Money stays exact: base rates are integer cents and multipliers
+    integers in thousandths (MULTIPLIER_SCALE), so each day is rounded to
+    the cent once (ROUND_HALF_UP), after the last rule.
+
+    Returns:
+        numpy.ndarray: int64, one entry per day of the year
+    """
+    first = date(year, 1, 1)
+    last = date(year, 12, 31)
+    days = 366 if calendar.isleap(year) else 365
+
+    rules = (
+        RateRule.objects
+        .filter(is_active=True)
+        .filter(Q(car_id=car.pk) | Q(car__isnull=True, brand__in=['', car.brand]))
+        .filter(Q(start_date__isnull=True) | Q(start_date__lte=last))
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=first))
+        .order_by('priority', F('car').asc(nulls_first=True), 'brand', 'id')
+    )
+
+    offsets = np.arange(days)
+    weekdays = (first.weekday() + offsets) % 7
+    base = np.full(days, _to_cents(car.daily_rate), dtype=np.int64)
+    # Python ints (object dtype): stacked multipliers outgrow int64
+    factor = np.ones(days, dtype=object)
+    scale = 1
+
+    for rule in rules:
+        mask = np.ones(days, dtype=bool)
+        if rule.start_date is not None:
+            mask &= offsets >= (rule.start_date - first).days
+        if rule.end_date is not None:
+            mask &= offsets <= (rule.end_date - first).days
+        if rule.weekdays:
+            mask &= np.isin(weekdays, rule.get_weekdays())
+        if rule.rate is not None:
+            base[mask] = _to_cents(rule.rate)
+        multiplier = int(Decimal(rule.multiplier).scaleb(MULTIPLIER_PLACES))
+        if multiplier != MULTIPLIER_SCALE:
+            factor[mask] *= multiplier
+            factor[~mask] *= MULTIPLIER_SCALE
+            scale *= MULTIPLIER_SCALE
+
+    # Rates are never negative: floor((x + 1/2)) is ROUND_HALF_UP
+    return ((2 * base.astype(object) * factor + scale) // (2 * scale)).astype(np.int64)
+
+
+def get_calendar(car, year):
+    """
+    Cached build_calendar()
+    """
+    key = f'pricing:calendar:{car.pk}:{year}:{pricing_version(car.pk)}'
+    rates = cache.get(key)
+    if rates is None:
+        # Cached under the current version: built from the primary
+        with primary_reads():
+            rates = build_calendar(car, year)
+        cache.set(key, rates, timeout=_timeout())
+    return rates
+
+
+def _to_cents(amount):
+    return int(Decimal(amount).scaleb(2))
+
+
+def _cents(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def price_stay(car, start_date, end_date):
+    """
+    Price a stay from the car's rate calendar
+
+    Returns:
+        dict: total, days, daily_rate (stay average) and daily
+        ([{date, rate}] per charged night)
+
+    Raises:
+        ValueError: end_date not after start_date
+    """
+    if end_date <= start_date:
+        raise ValueError("Start date must be before end date")
+
+    parts = []
+    day = start_date
+    while day < end_date:
+        stop = min(end_date, date(day.year + 1, 1, 1))
+        first = date(day.year, 1, 1)
+        parts.append(get_calendar(car, day.year)[(day - first).days:(stop - first).days])
+        day = stop
+    rates = np.concatenate(parts)
+
+    total = _cents(rates.sum())
+    return {
+        'total': total,
+        'days': len(rates),
+        'daily_rate': (total / len(rates)).quantize(CENT),
+        'daily': [
+            {'date': start_date + timedelta(days=index), 'rate': _cents(rate)}
+            for index, rate in enumerate(rates.tolist())
+        ],
+    }
@@ -0,0 +1,167 @@
+"""
+Price Quotes
+Memoized stay quotes for GET /api/cars/{id}/quote/
+
+Quotes are requested far more often than bookings are made, so a finished
+payload is kept in a per-process LRU memo keyed on
+(car, start, end, pricing_version(car)). The version (one cache round
+trip) changes whenever the car or any rate rule changes (cars/pricing.py),
+so a stale quote is never served: its key is simply not asked for again
+and it ages out. A memo hit touches neither the database nor the calendar.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from car_rental.db_router import primary_reads
+from reservations.models import cancellation_schedule
+from .models import Car
+from .pricing import CENT, price_stay, pricing_version
+
+# Longest stay a quote is computed for, in nights
+MAX_QUOTE_DAYS = 366
+
+
+class QuoteMemo:
+    """
+    Thread-safe LRU mapping with a per-entry time to live
+
+    Args:
+        maxsize: Entries kept; the least recently used goes first
+        ttl: Seconds an entry is served after it was stored
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Stored value for key, or None (missing or expired)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, size
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+memo = QuoteMemo(
+    maxsize=getattr(settings, 'QUOTE_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'QUOTE_CACHE_TTL', 300),
+)
+
+
+def check_quote_dates(start_date, end_date):
+    """
+    Raises:
+        ValueError: Stay starts in the past or exceeds MAX_QUOTE_DAYS
+    """
+    if start_date < date.today():
+        raise ValueError("Start date cannot be in the past.")
+    if (end_date - start_date).days > MAX_QUOTE_DAYS:
+        raise ValueError(f"Quotes cover at most {MAX_QUOTE_DAYS} days.")
+
+
+def _money(value):
+    # Same "123.45" strings as the serializers' DecimalFields
+    return str(value.quantize(CENT))
+
+
+def build_quote(car, start_date, end_date):
+    """
+    Quote for renting car from start_date to end_date
+
+    Returns:
+        dict: car, start_date, end_date, days, daily_rate (stay average),
+        total, daily ([{date, rate}] per charged night) and
+        cancellation_schedule (fee per notice tier, see CANCELLATION_TIERS)
+    """
+    price = price_stay(car, start_date, end_date)
+    return {
+        'car': car.pk,
+        'start_date': start_date,
+        'end_date': end_date,
+        'days': price['days'],
+        'daily_rate': _money(price['daily_rate']),
+        'total': _money(price['total']),
+        'daily': [
+            {'date': night['date'], 'rate': _money(night['rate'])}
+            for night in price['daily']
+        ],
+        'cancellation_schedule': [
+            {**tier, 'fee': _money(tier['fee'])}
+            for tier in cancellation_schedule(start_date, price['total'])
+        ],
+    }
+
+
+def get_quote(car_id, start_date, end_date, load_car):
+    """
+    Memoized build_quote()
+
+    Args:
+        car_id: Primary key of the car
+        start_date / end_date: Stay dates (already validated)
+        load_car: Callable returning the Car; only called on a memo miss
+            (may raise, e.g. Http404)
+    """
+    key = (car_id, start_date, end_date, pricing_version(car_id))
+    quote = memo.get(key)
+    if quote is None:
+        with primary_reads():
+            quote = build_quote(load_car(), start_date, end_date)
+        memo.set(key, quote)
+    return quote
+
+
+async def aget_quote(car_id, start_date, end_date):
+    """
+    get_quote() for async views: the car is read with aget(), the calendar
+    lookups run in a worker thread
+
+    Raises:
+        Car.DoesNotExist: Unknown car (on a memo miss)
+    """
+    key = (car_id, start_date, end_date, await sync_to_async(pricing_version)(car_id))
+    quote = memo.get(key)
+    if quote is None:
+        with primary_reads():
+            car = await Car.objects.aget(pk=car_id)
+            quote = await sync_to_async(build_quote)(car, start_date, end_date)
+        memo.set(key, quote)
+    return quote
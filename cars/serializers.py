@@ -3,9 +3,17 @@ Car Serializers
 Converts Car model to/from JSON format
 """
 from rest_framework import serializers
-from .models import Car
+from car_rental.serializers import CachedFieldsMixin
+from .models import Car, can_be_rented, rental_status
 
-class CarSerializer(serializers.ModelSerializer):
+
+def _rental_status_from_flags(*flags):
+    return {
+        'available': can_be_rented(*flags),
+        'status': rental_status(*flags)
+    }
+
+class CarSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Car model
     
@@ -15,6 +23,14 @@ class CarSerializer(serializers.ModelSerializer):
         - rental_status: Custom method field (can_be_rented status)
     """
     rental_status = serializers.SerializerMethodField()
+
+    # Method fields for the values() list path (see ValuesRenderer)
+    values_method_fields = {
+        'rental_status': (
+            ('in_fleet', 'is_rented', 'is_damaged', 'is_maintenance'),
+            _rental_status_from_flags,
+        ),
+    }
     
     class Meta:
         model = Car
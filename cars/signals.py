@@ -0,0 +1,54 @@
+"""
+Django Signals for Car catalog
+Invalidate cached car payloads and price calendars when a car or a rate
+rule changes
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import invalidate_cars
+from .models import Car, RateRule
+from .pricing import invalidate_car_pricing, invalidate_rules
+
+
+@receiver(post_save, sender=Car)
+def invalidate_car_cache_on_save(sender, instance, **kwargs):
+    """
+    Drop cached list/detail payloads and price calendars of the saved car
+
+    Args:
+        sender: Car model class
+        instance: The saved car
+        **kwargs: Additional arguments
+    """
+    invalidate_cars([instance.pk])
+    invalidate_car_pricing([instance.pk])
+
+
+@receiver(post_delete, sender=Car)
+def invalidate_car_cache_on_delete(sender, instance, **kwargs):
+    """
+    Drop cached list/detail payloads, price calendars and quotes of the
+    deleted car
+
+    Args:
+        sender: Car model class
+        instance: The deleted car
+        **kwargs: Additional arguments
+    """
+    invalidate_cars([instance.pk])
+    invalidate_car_pricing([instance.pk])
+
+
+@receiver(post_save, sender=RateRule)
+@receiver(post_delete, sender=RateRule)
+def invalidate_calendars_on_rule_change(sender, instance, **kwargs):
+    """
+    Any rule can touch many cars: drop every cached calendar
+
+    Args:
+        sender: RateRule model class
+        instance: The saved or deleted rule
+        **kwargs: Additional arguments
+    """
+    invalidate_rules()
@@ -1,8 +1,24 @@
-from decimal import Decimal
+from datetime import date, datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-from .models import Car
+from car_rental.db_router import PIN_KEY
+from reservations.models import Reservation
+from users.models import UserProfile
+from .cache import DETAIL_VERSION_KEY, get_cache_stats, reset_cache_stats
+from .models import Car, RateRule
+from .pricing import price_stay, pricing_version
+from .quotes import memo as quote_memo
 
 
 class CarModelTests(TestCase):
@@ -61,4 +77,546 @@ class CarModelTests(TestCase):
             is_maintenance=False,
         )
         with self.assertRaises(ValidationError):
-            car.clean() # Validation only: we call clean() directly (no save) to check if the conditions in the model are met.
\ No newline at end of file
+            car.clean() # Validation only: we call clean() directly (no save) to check if the conditions in the model are met.
+
+
+class CarAvailabilityAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="renter", password="pass1234")
+        UserProfile.objects.create(
+            user=self.user,
+            phone="5550002222",
+            address="Main St 2",
+            city="Istanbul",
+            state="TR",
+            zip_code="34000",
+            license_number="LIC-456",
+            date_of_birth="1990-01-01",
+            is_verified=True,
+            is_active=True,
+        )
+        self.booked_car = self._create_car("Toyota", "Corolla")
+        self.free_car = self._create_car("Honda", "Civic")
+        self.damaged_car = self._create_car("Ford", "Focus", is_damaged=True)
+
+        self.start = (timezone.now() + timedelta(days=5)).date()
+        self.end = self.start + timedelta(days=3)
+        Reservation.objects.create(
+            user=self.user,
+            car=self.booked_car,
+            start_date=self.start,
+            end_date=self.end,
+            daily_rate=Decimal("100.00"),
+            status="confirmed",
+        )
+
+    def _create_car(self, brand, model, **kwargs):
+        return Car.objects.create(
+            brand=brand,
+            model=model,
+            year=2020,
+            color="White",
+            daily_rate=Decimal("100.00"),
+            **kwargs,
+        )
+
+    def _available_ids(self, start, end):
+        response = self.client.get(
+            "/api/cars/available/", {"start": start.isoformat(), "end": end.isoformat()}
+        )
+        self.assertEqual(response.status_code, 200)
+        return {car["id"] for car in response.data["results"]}
+
+    def test_overlapping_reservation_excludes_car(self):
+        ids = self._available_ids(self.start + timedelta(days=1), self.end + timedelta(days=2))
+        self.assertEqual(ids, {self.free_car.id})
+
+    def test_non_overlapping_dates_include_car(self):
+        start = self.end + timedelta(days=1)
+        ids = self._available_ids(start, start + timedelta(days=2))
+        self.assertEqual(ids, {self.booked_car.id, self.free_car.id})
+
+    def test_cancelled_reservation_does_not_block(self):
+        Reservation.objects.filter(car=self.booked_car).update(status="cancelled")
+        ids = self._available_ids(self.start, self.end)
+        self.assertEqual(ids, {self.booked_car.id, self.free_car.id})
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(
+                "/api/cars/available/",
+                {"start": self.start.isoformat(), "end": self.end.isoformat()},
+            )
+
+    def test_invalid_dates(self):
+        response = self.client.get("/api/cars/available/", {"start": "bad"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            "/api/cars/available/",
+            {"start": self.end.isoformat(), "end": self.start.isoformat()},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CarCatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.client = APIClient()
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"),
+        )
+        self.other_car = Car.objects.create(
+            brand="Honda", model="Civic", year=2021, color="Black",
+            daily_rate=Decimal("120.00"),
+        )
+
+    def test_list_served_from_cache(self):
+        first = self.client.get("/api/cars/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/cars/")
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(get_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_car_save_invalidates_list_and_detail(self):
+        self.client.get("/api/cars/")
+        self.client.get(f"/api/cars/{self.car.pk}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.daily_rate = Decimal("150.00")
+            self.car.save()
+
+        response = self.client.get("/api/cars/")
+        rates = {car["id"]: car["daily_rate"] for car in response.data["results"]}
+        self.assertEqual(rates[self.car.pk], "150.00")
+        response = self.client.get(f"/api/cars/{self.car.pk}/")
+        self.assertEqual(response.data["daily_rate"], "150.00")
+
+    def test_detail_invalidation_is_per_car(self):
+        self.client.get(f"/api/cars/{self.other_car.pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.save()
+        with self.assertNumQueries(0):
+            self.client.get(f"/api/cars/{self.other_car.pk}/")
+
+    def test_reservation_status_flip_invalidates(self):
+        user = User.objects.create_user(username="cached", password="pass1234")
+        UserProfile.objects.create(
+            user=user,
+            phone="5550005555",
+            address="Main St 5",
+            city="Istanbul",
+            state="TR",
+            zip_code="34000",
+            license_number="LIC-555",
+            date_of_birth="1990-01-01",
+            is_verified=True,
+            is_active=True,
+        )
+        response = self.client.get(f"/api/cars/{self.car.pk}/")
+        self.assertTrue(response.data["rental_status"]["available"])
+
+        start = timezone.localdate() + timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(
+                user=user,
+                car=self.car,
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                daily_rate=Decimal("100.00"),
+            )
+
+        response = self.client.get(f"/api/cars/{self.car.pk}/")
+        self.assertFalse(response.data["rental_status"]["available"])
+
+    def test_missing_car_not_cached(self):
+        self.assertEqual(self.client.get("/api/cars/999999/").status_code, 404)
+        self.assertEqual(self.client.get("/api/cars/999999/").status_code, 404)
+
+    def test_version_keys_expire(self):
+        with mock.patch("cars.cache.cache.get_or_set", wraps=cache.get_or_set) as get_or_set:
+            self.client.get("/api/cars/999999/")
+            self.client.get("/api/cars/")
+        self.assertEqual(get_or_set.call_count, 2)
+        for call in get_or_set.call_args_list:
+            self.assertEqual(call.kwargs["timeout"], settings.CAR_CACHE_VERSION_TIMEOUT)
+
+    def test_expired_version_does_not_serve_old_payload(self):
+        self.client.get(f"/api/cars/{self.car.pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.color = "Red"
+            self.car.save()
+        # The bumped version expires while the old payload is still cached
+        cache.delete(DETAIL_VERSION_KEY.format(pk=self.car.pk))
+        response = self.client.get(f"/api/cars/{self.car.pk}/")
+        self.assertEqual(response.data["color"], "Red")
+
+    def test_cache_stats_admin_only(self):
+        self.assertIn(self.client.get("/api/cars/cache-stats/").status_code, (401, 403))
+        admin = User.objects.create_user(username="admin", password="pass1234", is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get("/api/cars/cache-stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {"hits", "misses", "quotes"})
+
+    def test_cached_list_not_modified_without_queries(self):
+        etag = self.client.get("/api/cars/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/cars/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_changes_with_car(self):
+        response = self.client.get(f"/api/cars/{self.car.pk}/")
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.color = "Red"
+            self.car.save()
+        response = self.client.get(f"/api/cars/{self.car.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["color"], "Red")
+
+
+class CarValuesListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"), image="cars/corolla.jpg",
+        )
+        Car.objects.create(
+            brand="Honda", model="Civic", year=2021, color="Black",
+            daily_rate=Decimal("120.50"), is_damaged=True,
+        )
+        Car.objects.create(
+            brand="Ford", model="Focus", year=2019, color="Blue",
+            daily_rate=Decimal("90.00"), in_fleet=False,
+        )
+
+    def _content(self, url, values_rendering):
+        cache.clear()
+        with override_settings(VALUES_LIST_RENDERING=values_rendering):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_values_rendering_matches_serializer(self):
+        start = timezone.localdate() + timedelta(days=1)
+        urls = [
+            "/api/cars/",
+            "/api/cars/?page_size=2",
+            f"/api/cars/available/?start={start}&end={start + timedelta(days=3)}",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self._content(url, True), self._content(url, False))
+
+    def test_next_page_from_values_rows(self):
+        first = self.client.get("/api/cars/?page_size=2")
+        second = self.client.get(first.data["next"])
+        ids = [car["id"] for car in first.data["results"] + second.data["results"]]
+        self.assertEqual(sorted(ids), sorted(Car.objects.values_list("id", flat=True)))
+
+
+class PricingEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"),
+        )
+        self.other = Car.objects.create(
+            brand="Honda", model="Civic", year=2021, color="Black",
+            daily_rate=Decimal("80.00"),
+        )
+
+    def _rates(self, car, start, nights):
+        quote = price_stay(car, start, start + timedelta(days=nights))
+        return [day["rate"] for day in quote["daily"]]
+
+    def test_base_rate_without_rules(self):
+        quote = price_stay(self.car, date(2030, 3, 4), date(2030, 3, 7))
+        self.assertEqual(quote["total"], Decimal("300.00"))
+        self.assertEqual(quote["days"], 3)
+        self.assertEqual(quote["daily_rate"], Decimal("100.00"))
+        self.assertEqual(quote["daily"][0], {"date": date(2030, 3, 4), "rate": Decimal("100.00")})
+
+    def test_rules_stack_by_scope_and_priority(self):
+        # 2030-06-07 is a Friday
+        RateRule.objects.create(name="Summer", start_date=date(2030, 6, 1), end_date=date(2030, 8, 31),
+                                multiplier=Decimal("1.500"))
+        RateRule.objects.create(name="Weekend", weekdays="56", multiplier=Decimal("1.100"))
+        RateRule.objects.create(name="Toyota promo", brand="Toyota", rate=Decimal("90.00"))
+        RateRule.objects.create(name="Corolla launch", car=self.car, rate=Decimal("95.00"))
+        RateRule.objects.create(name="Retired", multiplier=Decimal("9.000"), is_active=False)
+
+        # Car rule beats brand rule on equal priority; multipliers stack
+        self.assertEqual(
+            self._rates(self.car, date(2030, 6, 7), 3),
+            [Decimal("142.50"), Decimal("156.75"), Decimal("156.75")],
+        )
+        self.assertEqual(self._rates(self.other, date(2030, 5, 31), 2), [Decimal("80.00"), Decimal("132.00")])
+
+        RateRule.objects.create(name="Brand override", brand="Toyota", rate=Decimal("70.00"), priority=5)
+        cache.clear()
+        self.assertEqual(self._rates(self.car, date(2030, 5, 29), 1), [Decimal("70.00")])
+
+    def test_stacked_multipliers_match_decimal_total(self):
+        RateRule.objects.create(name="Toyota promo", brand="Toyota", rate=Decimal("10.00"))
+        RateRule.objects.create(name="Summer", start_date=date(2030, 6, 1), end_date=date(2030, 8, 31),
+                                multiplier=Decimal("1.015"))
+        RateRule.objects.create(name="Weekend", weekdays="56", multiplier=Decimal("1.100"))
+        RateRule.objects.create(name="Low demand", start_date=date(2030, 6, 10), multiplier=Decimal("0.955"))
+
+        start = date(2030, 6, 5)
+        expected = Decimal("0")
+        for offset in range(14):
+            day = start + timedelta(days=offset)
+            rate = Decimal("10.00") * Decimal("1.015")
+            if day.weekday() >= 5:
+                rate *= Decimal("1.100")
+            if day >= date(2030, 6, 10):
+                rate *= Decimal("0.955")
+            expected += rate.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+        quote = price_stay(self.car, start, start + timedelta(days=14))
+        # 10.00 × 1.015 × 1.100 = 11.165 rounds up, not to 11.16
+        self.assertEqual(quote["daily"][3]["rate"], Decimal("11.17"))
+        self.assertEqual(quote["total"], expected)
+
+    def test_stay_across_new_year(self):
+        RateRule.objects.create(name="New year", start_date=date(2031, 1, 1), end_date=date(2031, 1, 1),
+                                rate=Decimal("200.00"))
+        quote = price_stay(self.car, date(2030, 12, 30), date(2031, 1, 2))
+        self.assertEqual(quote["total"], Decimal("400.00"))
+        self.assertEqual(quote["daily_rate"], Decimal("133.33"))
+
+    def test_calendar_cached_per_year(self):
+        with self.assertNumQueries(1):
+            price_stay(self.car, date(2030, 3, 1), date(2030, 3, 10))
+        with self.assertNumQueries(0):
+            price_stay(self.car, date(2030, 7, 1), date(2030, 7, 3))
+
+    def test_rule_change_invalidates(self):
+        price_stay(self.car, date(2030, 3, 1), date(2030, 3, 2))
+        version = pricing_version(self.car.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            RateRule.objects.create(name="Spring", rate=Decimal("120.00"))
+        self.assertNotEqual(pricing_version(self.car.pk), version)
+        self.assertEqual(self._rates(self.car, date(2030, 3, 1), 1), [Decimal("120.00")])
+
+    def test_daily_rate_change_invalidates(self):
+        price_stay(self.car, date(2030, 3, 1), date(2030, 3, 2))
+        other_version = pricing_version(self.other.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.daily_rate = Decimal("110.00")
+            self.car.save()
+        self.assertEqual(self._rates(self.car, date(2030, 3, 1), 1), [Decimal("110.00")])
+        self.assertEqual(pricing_version(self.other.pk), other_version)
+
+    def test_rule_validation(self):
+        invalid = [
+            {"car": self.car, "brand": "Toyota"},
+            {"start_date": date(2030, 2, 1), "end_date": date(2030, 1, 1)},
+            {"weekdays": "7"},
+            {"multiplier": Decimal("0")},
+        ]
+        for fields in invalid:
+            with self.subTest(fields=fields):
+                with self.assertRaises(ValidationError):
+                    RateRule.objects.create(name="Invalid", **fields)
+
+
+class CarQuoteAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        quote_memo.clear()
+        self.client = APIClient()
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"),
+        )
+        self.start = date.today() + timedelta(days=10)
+        self.end = self.start + timedelta(days=3)
+
+    def _quote(self, car=None, start=None, end=None):
+        car = car or self.car
+        start = start or self.start
+        end = end or self.end
+        return self.client.get(f"/api/cars/{car.pk}/quote/?start={start}&end={end}")
+
+    def test_quote_payload(self):
+        response = self._quote()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], "300.00")
+        self.assertEqual(response.data["days"], 3)
+        self.assertEqual(response.data["daily"][0], {"date": self.start, "rate": "100.00"})
+
+        start_dt = timezone.make_aware(datetime.combine(self.start, time.min))
+        self.assertEqual(
+            response.data["cancellation_schedule"],
+            [
+                {"notice_hours": 48, "cancel_before": start_dt - timedelta(hours=48), "fee": "0.00"},
+                {"notice_hours": 24, "cancel_before": start_dt - timedelta(hours=24), "fee": "150.00"},
+                {"notice_hours": 0, "cancel_before": start_dt, "fee": "300.00"},
+            ],
+        )
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_repeated_quote_served_from_memo(self):
+        self._quote()
+        with self.assertNumQueries(0):
+            response = self._quote()
+        self.assertEqual(response.data["total"], "300.00")
+        self.assertEqual(quote_memo.stats()["hits"], 1)
+
+    def test_daily_rate_change_invalidates_quote(self):
+        self._quote()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.daily_rate = Decimal("120.00")
+            self.car.save()
+        self.assertEqual(self._quote().data["total"], "360.00")
+
+    def test_rate_rule_change_invalidates_quote(self):
+        self._quote()
+        with self.captureOnCommitCallbacks(execute=True):
+            RateRule.objects.create(name="Promo", car=self.car, rate=Decimal("90.00"))
+        self.assertEqual(self._quote().data["total"], "270.00")
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(f"/api/cars/{self.car.pk}/quote/").status_code, 400)
+        self.assertEqual(self._quote(end=self.start).status_code, 400)
+        self.assertEqual(self._quote(start=date.today() - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self._quote(end=self.start + timedelta(days=400)).status_code, 400)
+
+    def test_unknown_car_not_found(self):
+        with mock.patch("cars.cache.cache.get_or_set", wraps=cache.get_or_set) as get_or_set:
+            response = self.client.get(f"/api/cars/999999/quote/?start={self.start}&end={self.end}")
+        self.assertEqual(response.status_code, 404)
+        # The version keys read for the unknown id expire
+        self.assertTrue(get_or_set.called)
+        for call in get_or_set.call_args_list:
+            self.assertEqual(call.kwargs["timeout"], settings.PRICING_CACHE_TIMEOUT)
+
+
+class CarAsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        quote_memo.clear()
+        self.client = APIClient()
+        self.cars = [
+            Car.objects.create(
+                brand="Toyota", model=f"Model {index}", year=2020, color="White",
+                daily_rate=Decimal("100.00"),
+            )
+            for index in range(3)
+        ]
+        self.start = date.today() + timedelta(days=10)
+        self.end = self.start + timedelta(days=3)
+
+    def _both(self, path):
+        sync = self.client.get(f"/api/cars/{path}")
+        cache.clear()
+        quote_memo.clear()
+        asynchronous = self.client.get(f"/api/async/cars/{path}")
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        # Same bytes, up to the path in next/previous links
+        self.assertEqual(asynchronous.content.replace(b"/api/async/", b"/api/"), sync.content)
+        return asynchronous
+
+    def test_list_matches_sync_view(self):
+        response = self._both("?page_size=2")
+        self.assertEqual(len(response.json()["results"]), 2)
+        cursor = response.json()["next"].split("?", 1)[1]
+        self.assertEqual(len(self._both(f"?{cursor}").json()["results"]), 1)
+
+    def test_detail_matches_sync_view(self):
+        self._both(f"{self.cars[0].pk}/")
+        self.assertEqual(self._both("999999/").status_code, 404)
+
+    def test_available_matches_sync_view(self):
+        user = User.objects.create_user(username="driver", password="pass1234")
+        UserProfile.objects.create(
+            user=user, phone="5550000000", address="Street 1", city="Istanbul",
+            state="Istanbul", zip_code="34000", license_number="ASYNC1",
+            date_of_birth=date(1990, 1, 1), is_verified=True,
+        )
+        Reservation.objects.create(
+            user=user, car=self.cars[0], start_date=self.start, end_date=self.end,
+            daily_rate=Decimal("100.00"), status="confirmed",
+        )
+        response = self._both(f"available/?start={self.start}&end={self.end}")
+        self.assertNotIn(self.cars[0].pk, [car["id"] for car in response.json()["results"]])
+        self.assertEqual(self._both(f"available/?start={self.end}&end={self.start}").status_code, 400)
+
+    def test_quote_matches_sync_view(self):
+        response = self._both(f"{self.cars[0].pk}/quote/?start={self.start}&end={self.end}")
+        self.assertEqual(response.json()["total"], "300.00")
+        self.assertEqual(self._both(f"999999/quote/?start={self.start}&end={self.end}").status_code, 404)
+
+    def test_read_only(self):
+        response = self.client.post("/api/async/cars/", {})
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(REPLICA_DATABASE="replica")
+class ReplicaRoutingTests(TransactionTestCase):
+    # The replica alias mirrors default in tests: where a read went is told
+    # by the connection that ran its queries
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        quote_memo.clear()
+        self.client = APIClient()
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White", daily_rate=Decimal("100.00"),
+        )
+        self.admin = User.objects.create_user(username="admin", password="pass1234", is_staff=True)
+        start = date.today() + timedelta(days=10)
+        self.available = f"available/?start={start}&end={start + timedelta(days=2)}"
+
+    def _read_aliases(self, url):
+        """
+        Database aliases that ran queries for a GET of url
+        """
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {alias for alias, queries in (("default", primary), ("replica", replica)) if len(queries)}
+
+    def _available_aliases(self, prefix="/api/cars/"):
+        return self._read_aliases(f"{prefix}{self.available}")
+
+    def test_safe_reads_use_replica(self):
+        self.assertEqual(self._available_aliases(), {"replica"})
+        self.assertEqual(self._available_aliases("/api/async/cars/"), {"replica"})
+
+    def test_cached_payloads_built_from_primary(self):
+        self.assertEqual(self._read_aliases(f"/api/cars/{self.car.pk}/"), {"default"})
+
+    def test_writer_reads_primary_for_sticky_window(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(f"/api/cars/{self.car.pk}/", {"color": "Red"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self._available_aliases(), {"default"})
+        self.assertEqual(self._available_aliases("/api/async/cars/"), {"default"})
+
+        # Other users are not pinned
+        self.client.force_authenticate(None)
+        self.assertEqual(self._available_aliases(), {"replica"})
+
+        # Window over
+        cache.delete(PIN_KEY.format(pk=self.admin.pk))
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self._available_aliases(), {"replica"})
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_no_replica_configured(self):
+        self.assertEqual(self._available_aliases(), {"default"})
@@ -2,12 +2,67 @@
 Car API Views
 Provides REST API endpoints for Car model
 """
+from django.db.models import Exists, OuterRef
+from django.http import Http404
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_http_date_safe
 from rest_framework import viewsets
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from car_rental.conditional import ConditionalGetMixin
+from car_rental.db_router import ReplicaReadMixin, primary_reads
+from car_rental.listing import ValuesListMixin
+from .cache import car_detail_key, car_list_key, get_cache_stats, get_cached, set_cached
 from .permissions import IsAdminOrReadOnly
+from .quotes import check_quote_dates, get_quote, memo as quote_memo
 from .models import Car
 from .serializers import CarSerializer
+from reservations.models import LIVE_STATUSES, Reservation
 
-class CarViewSet(viewsets.ModelViewSet):
+
+def parse_stay(params):
+    """
+    start / end query params (YYYY-MM-DD) of the availability and quote
+    endpoints
+
+    Returns:
+        tuple: (start, end) dates
+
+    Raises:
+        ValueError: Missing, malformed or inverted dates (message for a 400)
+    """
+    start = parse_date(params.get("start") or "")
+    end = parse_date(params.get("end") or "")
+
+    if start is None or end is None:
+        raise ValueError("Both start and end dates are required (YYYY-MM-DD).")
+    if start >= end:
+        raise ValueError("Start date must be before end date.")
+    return start, end
+
+
+def available_cars(queryset, start, end):
+    """
+    Operational cars of queryset with no live reservation overlapping
+    [start, end], as a single NOT EXISTS subquery
+    """
+    # Same overlap rule as Reservation.check_date_conflict
+    overlapping = Reservation.objects.filter(
+        car=OuterRef('pk'),
+        status__in=LIVE_STATUSES,
+        start_date__lte=end,
+        end_date__gte=start,
+    )
+    return queryset.filter(
+        in_fleet=True,
+        is_damaged=False,
+        is_maintenance=False,
+    ).filter(~Exists(overlapping))
+
+
+class CarViewSet(ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     API endpoint for Car model
     
@@ -17,12 +72,116 @@ class CarViewSet(viewsets.ModelViewSet):
         - GET /api/cars/{id}/ → Retrieve car details
         - PUT /api/cars/{id}/ → Update car
         - DELETE /api/cars/{id}/ → Delete car
+        - GET /api/cars/available/?start=YYYY-MM-DD&end=YYYY-MM-DD → Cars free for the given dates
+        - GET /api/cars/{id}/quote/?start=YYYY-MM-DD&end=YYYY-MM-DD → Price quote for a stay
+        - GET /api/cars/cache-stats/ → Catalog cache hit/miss counters (admin)
     
     Permissions:
         - Read: Anyone (authenticated or not)
         - Write: Only admin users
+
+    Lists (list, available) are rendered from values() rows, see
+    car_rental/listing.py. Async versions of the read endpoints are in
+    cars/async_views.py (/api/async/cars/).
+
+    Caching:
+        - List and detail payloads are served from the catalog cache
+          (see cars/cache.py), invalidated on car changes
+        - The ETag (and Last-Modified of details) is cached with the
+          payload: a matching If-None-Match gets a 304 without touching the
+          database
+        - Other safe-method reads may go to the read replica
+          (car_rental/db_router.py); cache fills read the primary
+        - Quotes are memoized per process (see cars/quotes.py)
     """
     queryset = Car.objects.all()
     serializer_class = CarSerializer
     permission_classes = [IsAdminOrReadOnly]
-    
+
+    def _cached_response(self, request, key, build_response):
+        """
+        Serve a cached {data, etag, last_modified} entry (304 when the client
+        copy matches, without touching the database), or build the response
+        from the primary and cache it.
+        """
+        entry = get_cached(key)
+        if entry is None:
+            # Cached under the current version: built from the primary
+            with primary_reads():
+                response = build_response()
+            if response.status_code == status.HTTP_200_OK:
+                set_cached(key, {
+                    'etag': response['ETag'],
+                    'last_modified': parse_http_date_safe(response.get('Last-Modified')),
+                    'data': response.data,
+                })
+            return response
+
+        etag, last_modified = entry['etag'], entry['last_modified']
+        not_modified = self.get_not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(Response(entry['data']), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        return self._cached_response(
+            request,
+            car_list_key(request),
+            lambda: self.list_response(queryset),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            request,
+            car_detail_key(request, kwargs[self.lookup_field]),
+            lambda: super(CarViewSet, self).retrieve(request, *args, **kwargs),
+        )
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """
+        List operational cars with no live reservation overlapping [start, end].
+
+        Uses a single NOT EXISTS subquery instead of checking cars one by one,
+        so the global is_rented flag is not consulted.
+        """
+        try:
+            start, end = parse_stay(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return self.list_response(available_cars(self.get_queryset(), start, end))
+
+    @action(detail=True, methods=['get'])
+    def quote(self, request, pk=None):
+        """
+        Price a stay without creating a reservation: total, per-night
+        breakdown and cancellation fee schedule.
+
+        Served from the quote memo when the car's prices have not changed;
+        the car is only loaded on a miss. Availability is not checked.
+        """
+        try:
+            car_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+
+        try:
+            start, end = parse_stay(request.query_params)
+            check_quote_dates(start, end)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(get_quote(car_id, start, end, self.get_object))
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Catalog cache and quote memo hit/miss counters of this process
+        """
+        return Response(
+            {**get_cache_stats(), 'quotes': quote_memo.stats()},
+            status=status.HTTP_200_OK,
+        )
@@ -61,16 +61,15 @@ class ReservationAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         """
         Override save_model to automatically fill daily_rate and total_amount
+        (rate calendar, see cars/pricing.py)
         Validates status transitions and business rules
         """
-        # Auto-fill daily_rate from selected car
-        if obj.car:
-            obj.daily_rate = obj.car.daily_rate
-        
-        # Auto-calculate total_amount
-        if obj.start_date and obj.end_date and obj.daily_rate:
-            duration = (obj.end_date - obj.start_date).days
-            obj.total_amount = obj.daily_rate * duration
+        # Price from the car's rate calendar (new booking, or car/dates changed)
+        repriced = {'car', 'start_date', 'end_date'} & set(form.changed_data)
+        if obj.car_id and obj.start_date and obj.end_date and (not change or repriced):
+            if obj.start_date < obj.end_date:
+                obj.daily_rate = None
+                obj.apply_pricing()
         
         # STATUS MANAGEMENT
         if change:  # Updating existing reservation
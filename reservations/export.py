@@ -0,0 +1,128 @@
+"""
+Reservation Export
+Streams reservations as CSV or NDJSON in constant memory
+
+Rows are read with values_list().iterator(chunk_size=...) (a server-side
+cursor on PostgreSQL) and turned into text one row at a time, so neither
+the queryset cache nor the output is ever held in full. Shared by
+ReservationViewSet.export and the export_reservations command.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .models import Reservation
+
+FORMATS = ('csv', 'ndjson')
+
+# (output name, values_list path)
+COLUMNS = (
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('car_id', 'car_id'),
+    ('car_brand', 'car__brand'),
+    ('car_model', 'car__model'),
+    ('start_date', 'start_date'),
+    ('end_date', 'end_date'),
+    ('daily_rate', 'daily_rate'),
+    ('total_amount', 'total_amount'),
+    ('status', 'status'),
+    ('payment_status', 'payment_status'),
+    ('payment_method', 'payment_method'),
+    ('paid_at', 'paid_at'),
+    ('cancellation_fee', 'cancellation_fee'),
+    ('cancellation_date', 'cancellation_date'),
+    ('refund_amount', 'refund_amount'),
+    ('refunded_at', 'refunded_at'),
+    ('created_at', 'created_at'),
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_filters(start=None, end=None, status=None):
+    """
+    Validate export filters (raw strings, e.g. from the query string)
+
+    - start / end: YYYY-MM-DD bounds on start_date (inclusive)
+    - status: Comma-separated statuses
+
+    Returns:
+        dict: Keyword arguments for export_queryset()
+
+    Raises:
+        ValueError: Invalid date or status
+    """
+    filters = {}
+    for name, raw in (('start', start), ('end', end)):
+        if raw:
+            value = parse_date(raw)
+            if value is None:
+                raise ValueError(f"{name} must be a date (YYYY-MM-DD).")
+            filters[name] = value
+    if filters.get('start') and filters.get('end') and filters['start'] > filters['end']:
+        raise ValueError("start must not be after end.")
+
+    if status:
+        statuses = {item.strip() for item in status.split(',') if item.strip()}
+        unknown = statuses - {code for code, _ in Reservation.STATUS_CHOICES}
+        if unknown:
+            raise ValueError(f"Unknown statuses: {', '.join(sorted(unknown))}")
+        filters['statuses'] = sorted(statuses)
+    return filters
+
+
+def export_queryset(start=None, end=None, statuses=None):
+    """
+    Filtered export rows as tuples, in id order
+    """
+    queryset = Reservation.objects.order_by('id')
+    if start is not None:
+        queryset = queryset.filter(start_date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(start_date__lte=end)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset.values_list(*[path for _, path in COLUMNS])
+
+
+class _Echo:
+    """
+    File-like object for csv.writer: write() returns the line instead of
+    buffering it
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(queryset, output_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the export as text, one line at a time
+
+    Args:
+        queryset: export_queryset() result
+        output_format: 'csv' or 'ndjson'
+        chunk_size: Rows fetched per round trip
+    """
+    names = [name for name, _ in COLUMNS]
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    if output_format == 'ndjson':
+        encoder = DjangoJSONEncoder()
+        for row in rows:
+            yield encoder.encode(dict(zip(names, row))) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
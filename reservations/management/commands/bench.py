@@ -0,0 +1,289 @@
+"""
+End-to-end benchmark of the key API paths and periodic tasks
+
+Usage:
+    python manage.py bench --output bench.json
+    python manage.py bench --cars 10000 --users 100000 --reservations 1000000 --keepdb
+    python manage.py bench --baseline bench.json --threshold 1.25
+
+Runs against its own test database (test_<NAME>, created and dropped like
+manage.py test; --keepdb keeps it and reuses the data on the next run with
+the same volumes). The dataset is generated and loaded with COPY (see
+reservations.seeding), then each path is timed in-process through the
+Django test client (the whole middleware/DRF stack, no sockets):
+    - car_list: GET /api/cars/ (catalog cache cold)
+    - reservation_list_staff / reservation_list_customer: GET /api/reservations/
+    - reservation_create: POST /api/reservations/ by a customer (validation
+      and the date conflict check included)
+    - reservation_cancel: POST /api/reservations/{id}/cancel/ by the owner
+    - activate_todays_reservations, complete_ended_reservations,
+      cleanup_expired_reservations, cleanup_expired_pending_reservations:
+      the Celery tasks, called in-process
+The cache is cleared before every iteration (cold catalog, fresh throttles)
+and writes are rolled back, so every iteration sees the same data.
+
+Results (median, p95, min, mean in ms, queries per call) are printed and,
+with --output, written as JSON. With --baseline (an earlier --output file)
+the command fails when a path's median grew by more than --threshold
+times (and by more than --min-delta-ms, to ignore noise on fast paths).
+"""
+import json
+import platform
+import time
+from datetime import timedelta
+from statistics import mean, median, quantiles
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from car_rental.metrics import QueryCollector
+from cars.models import Car
+from reservations import tasks
+from reservations.models import Reservation
+from reservations.seeding import DEFAULT_BATCH_SIZE, seed_dataset
+
+STAFF_USERNAME = 'bench_staff'
+
+ISOLATED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+    }
+}
+
+
+def summarize(timings, queries):
+    """
+    Returns:
+        dict: Statistics of timings (seconds), in milliseconds
+    """
+    p95 = quantiles(timings, n=20)[18] if len(timings) > 1 else timings[0]
+    return {
+        'iterations': len(timings),
+        'median_ms': round(median(timings) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'mean_ms': round(mean(timings) * 1000, 3),
+        'queries': queries,
+    }
+
+
+def find_regressions(results, baseline, threshold, min_delta_ms=0.0):
+    """
+    Paths whose median grew past threshold × the baseline median
+
+    Args:
+        results / baseline: {path: summarize() dict}
+        threshold: Allowed ratio (1.25: up to 25% slower)
+        min_delta_ms: Growth in ms below which a path never regresses
+
+    Returns:
+        list: (path, baseline median, median, ratio), paths missing from
+        either side are skipped
+    """
+    regressions = []
+    for path, result in results.items():
+        before = baseline.get(path)
+        if before is None or not before['median_ms']:
+            continue
+        ratio = result['median_ms'] / before['median_ms']
+        if ratio > threshold and result['median_ms'] - before['median_ms'] > min_delta_ms:
+            regressions.append((path, before['median_ms'], result['median_ms'], ratio))
+    return regressions
+
+
+class Command(BaseCommand):
+    help = "Seed a dataset and time the key API paths and Celery tasks, optionally against a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=10000, help="Customers, each with a profile")
+        parser.add_argument("--reservations", type=int, default=100000)
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+        parser.add_argument("--threshold", type=float, default=1.25)
+        parser.add_argument("--min-delta-ms", type=float, default=1.0)
+        parser.add_argument("--keepdb", action="store_true", help="Keep (and reuse) the benchmark database")
+
+    def _seeded(self, options):
+        return (
+            Car.objects.count() == options['cars']
+            and User.objects.filter(username__startswith='seed_user_').count() == options['users']
+            and Reservation.objects.count() == options['reservations']
+        )
+
+    def _seed(self, options):
+        if self._seeded(options):
+            self.stdout.write("Reusing the seeded dataset")
+            return
+        if Car.objects.exists() or User.objects.exists():
+            call_command('flush', interactive=False, verbosity=0)
+        self.stdout.write(
+            f"Seeding {options['cars']} cars, {options['users']} users, "
+            f"{options['reservations']} reservations"
+        )
+        started = time.perf_counter()
+        seed_dataset(
+            options['cars'], options['users'], options['reservations'],
+            batch_size=options['batch_size'], seed=options['seed'],
+            log=lambda message: self.stdout.write(f"  {message}"),
+        )
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    def _paths(self):
+        """
+        {name: (callable, expected status or None)}
+        """
+        today = timezone.localdate()
+        staff, _ = User.objects.get_or_create(
+            username=STAFF_USERNAME, defaults={'is_staff': True, 'password': '!'}
+        )
+        target = (
+            Reservation.objects
+            .filter(
+                status='confirmed', start_date__gt=today + timedelta(days=2),
+                user__is_active=True, user__userprofile__is_verified=True,
+                user__userprofile__is_active=True,
+            )
+            .order_by('id')
+            .first()
+        )
+        car = (
+            Car.objects
+            .filter(in_fleet=True, is_damaged=False, is_maintenance=False)
+            .order_by('id')
+            .first()
+        )
+        if target is None or car is None:
+            raise CommandError("Dataset too small: needs a future confirmed reservation and an operational car")
+
+        # Past the end of the car's history: nothing to conflict with
+        last_end = Reservation.objects.filter(car=car).aggregate(last=Max('end_date'))['last'] or today
+        start = max(last_end, today) + timedelta(days=30)
+        new_stay = {'car': car.pk, 'start_date': str(start), 'end_date': str(start + timedelta(days=3))}
+
+        staff_client = APIClient()
+        staff_client.force_authenticate(staff)
+        customer_client = APIClient()
+        customer_client.force_authenticate(target.user)
+
+        return {
+            'car_list': (lambda: customer_client.get('/api/cars/'), 200),
+            'reservation_list_staff': (lambda: staff_client.get('/api/reservations/'), 200),
+            'reservation_list_customer': (lambda: customer_client.get('/api/reservations/'), 200),
+            'reservation_create': (
+                lambda: customer_client.post('/api/reservations/', new_stay, format='json'), 201
+            ),
+            'reservation_cancel': (
+                lambda: customer_client.post(f'/api/reservations/{target.pk}/cancel/', {}, format='json'), 200
+            ),
+            'activate_todays_reservations': (tasks.activate_todays_reservations, None),
+            'complete_ended_reservations': (tasks.complete_ended_reservations, None),
+            'cleanup_expired_reservations': (tasks.cleanup_expired_reservations, None),
+            'cleanup_expired_pending_reservations': (tasks.cleanup_expired_pending_reservations, None),
+        }
+
+    def _call(self, name, run, expected):
+        cache.clear()
+        with transaction.atomic():
+            started = time.perf_counter()
+            outcome = run()
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        if expected is not None and outcome.status_code != expected:
+            raise CommandError(f"{name}: expected {expected}, got {outcome.status_code}")
+        return elapsed
+
+    def _time(self, name, run, expected, options):
+        # The test client resets connection.queries on every request:
+        # count through an execute wrapper instead
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            self._call(name, run, expected)
+        for _ in range(options['warmup'] - 1):
+            self._call(name, run, expected)
+        timings = [self._call(name, run, expected) for _ in range(options['iterations'])]
+        return summarize(timings, collector.count)
+
+    def _report(self, results, baseline):
+        self.stdout.write(f"{'path':<38} {'median':>9} {'p95':>9} {'min':>9} {'queries':>8}")
+        for name, result in results.items():
+            line = (
+                f"{name:<38} {result['median_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms "
+                f"{result['min_ms']:>7.2f}ms {result['queries']:>8}"
+            )
+            before = baseline.get(name)
+            if before and before['median_ms']:
+                line += f"  x{result['median_ms'] / before['median_ms']:.2f} vs baseline"
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 1:
+            raise CommandError("--iterations and --warmup must be positive")
+        for volume in ('cars', 'users', 'reservations'):
+            if options[volume] < 1:
+                raise CommandError(f"--{volume} must be positive")
+
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as handle:
+                    baseline = json.load(handle)['results']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            with override_settings(CACHES=ISOLATED_CACHES):
+                self._seed(options)
+                results = {
+                    name: self._time(name, run, expected, options)
+                    for name, (run, expected) in self._paths().items()
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self._report(results, baseline)
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'cars': options['cars'],
+                'users': options['users'],
+                'reservations': options['reservations'],
+                'seed': options['seed'],
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        regressions = find_regressions(results, baseline, options['threshold'], options['min_delta_ms'])
+        if regressions:
+            raise CommandError("Regressions past x{:.2f}: {}".format(
+                options['threshold'],
+                ", ".join(
+                    f"{path} {before:.2f}ms -> {after:.2f}ms (x{ratio:.2f})"
+                    for path, before, after, ratio in regressions
+                ),
+            ))
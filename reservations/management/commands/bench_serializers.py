@@ -0,0 +1,175 @@
+"""
+Serializer micro-benchmark
+
+Usage:
+    python manage.py bench_serializers --rows 10000
+    python manage.py bench_serializers --list-sizes 1000 10000 100000
+
+--rows works on unsaved in-memory objects, so no database rows are needed.
+--list-sizes seeds that many reservations inside a transaction (rolled back
+afterwards) and times the list path: model instances + ReservationSerializer
+against values() rows + ValuesRenderer, both rendered to JSON.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from car_rental.serializers import ValuesRenderer, clear_field_cache
+from cars.models import Car
+from reservations.models import Reservation
+from reservations.serializers import ReservationSerializer
+
+
+def build_reservations(rows):
+    """
+    Unsaved reservations with their car and user attached (pk set by hand)
+    """
+    now = timezone.now()
+    cars = [
+        Car(
+            id=index + 1, brand="Brand", model=f"Model {index}", year=2020,
+            color="White", daily_rate=Decimal("100.00"), created_at=now, updated_at=now,
+        )
+        for index in range(100)
+    ]
+    users = [
+        User(id=index + 1, username=f"user{index}", email=f"user{index}@example.com")
+        for index in range(100)
+    ]
+    start = date(2030, 1, 1)
+    return [
+        Reservation(
+            id=index + 1,
+            user=users[index % len(users)],
+            car=cars[index % len(cars)],
+            start_date=start + timedelta(days=index % 300),
+            end_date=start + timedelta(days=index % 300 + 3),
+            daily_rate=Decimal("100.00"),
+            total_amount=Decimal("300.00"),
+            status="confirmed",
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(rows)
+    ]
+
+
+def make_context(is_staff):
+    request = Request(APIRequestFactory().get("/api/reservations/"))
+    request.user = User(id=999, username="bench", is_staff=is_staff)
+    return {"request": request}
+
+
+def seed_reservations(rows):
+    """
+    Saved reservations for the list benchmark (bulk inserts, no signals).
+    Finished rentals only, back to back per car, so nothing is live.
+    """
+    users = User.objects.bulk_create([
+        User(username=f"bench_user_{index}", email=f"bench{index}@example.com")
+        for index in range(100)
+    ])
+    cars = Car.objects.bulk_create([
+        Car(brand="Brand", model=f"Bench {index}", year=2020, color="White",
+            daily_rate=Decimal("100.00"))
+        for index in range(100)
+    ])
+    start = date(2000, 1, 1)
+    Reservation.objects.bulk_create(
+        (
+            Reservation(
+                user=users[index % len(users)],
+                car=cars[index % len(cars)],
+                start_date=start + timedelta(days=(index // len(cars)) * 4),
+                end_date=start + timedelta(days=(index // len(cars)) * 4 + 3),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("300.00"),
+                status="completed",
+            )
+            for index in range(rows)
+        ),
+        batch_size=5000,
+    )
+
+
+class Command(BaseCommand):
+    help = "Time ReservationSerializer setup per instance, with and without the field map cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument(
+            "--list-sizes", type=int, nargs="*", default=[],
+            help="Also time the list path at these row counts (e.g. 1000 10000 100000)",
+        )
+
+    def _serialize_each(self, reservations, context, cached):
+        started = time.perf_counter()
+        output = []
+        for reservation in reservations:
+            if not cached:
+                # Old behaviour: full field construction for every instance
+                clear_field_cache()
+            output.append(ReservationSerializer(reservation, context=context).data)
+        return time.perf_counter() - started, output
+
+    def _render_list(self, context, values):
+        queryset = Reservation.objects.order_by("-created_at", "id")
+        started = time.perf_counter()
+        if values:
+            renderer = ValuesRenderer(ReservationSerializer(context=context), ("id", "created_at"))
+            data = renderer.render_many(queryset.values(*renderer.columns))
+        else:
+            instances = queryset.select_related("car", "user")
+            data = ReservationSerializer(instances, many=True, context=context).data
+        body = JSONRenderer().render(data)
+        return time.perf_counter() - started, body
+
+    def _bench_list(self, rows):
+        with transaction.atomic():
+            seed_reservations(rows)
+            for role, is_staff in (("customer", False), ("staff", True)):
+                context = make_context(is_staff)
+                serializer_time, serializer_body = self._render_list(context, values=False)
+                values_time, values_body = self._render_list(context, values=True)
+
+                if values_body != serializer_body:
+                    self.stderr.write(self.style.ERROR(f"{role}: values() output differs"))
+                    raise SystemExit(1)
+
+                self.stdout.write(
+                    f"{role:>8}: list of {rows} rows  "
+                    f"serializer {serializer_time:.3f}s  values {values_time:.3f}s  "
+                    f"speedup x{serializer_time / values_time:.2f}  JSON identical"
+                )
+            transaction.set_rollback(True)
+
+    def handle(self, *args, **options):
+        reservations = build_reservations(options["rows"])
+
+        for role, is_staff in (("customer", False), ("staff", True)):
+            context = make_context(is_staff)
+            uncached_time, uncached_output = self._serialize_each(reservations, context, cached=False)
+            cached_time, cached_output = self._serialize_each(reservations, context, cached=True)
+
+            if cached_output != uncached_output:
+                self.stderr.write(self.style.ERROR(f"{role}: cached output differs"))
+                raise SystemExit(1)
+
+            rows = len(reservations)
+            self.stdout.write(
+                f"{role:>8}: {rows} serializers  "
+                f"uncached {uncached_time:.3f}s ({uncached_time / rows * 1e6:.0f}us/row)  "
+                f"cached {cached_time:.3f}s ({cached_time / rows * 1e6:.0f}us/row)  "
+                f"speedup x{uncached_time / cached_time:.2f}  output identical"
+            )
+
+        for rows in options["list_sizes"]:
+            self._bench_list(rows)
@@ -0,0 +1,52 @@
+"""
+Reservation export
+
+Usage:
+    python manage.py export_reservations --format csv --start 2025-01-01 --end 2025-01-31 > january.csv
+    python manage.py export_reservations --format ndjson --status completed,cancelled --output out.ndjson
+
+Same rows and filters as GET /api/reservations/export/, written line by
+line (constant memory).
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.export import DEFAULT_CHUNK_SIZE, FORMATS, export_queryset, parse_filters, stream_rows
+
+
+class Command(BaseCommand):
+    help = "Export reservations as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--start", help="Earliest start_date (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Latest start_date (YYYY-MM-DD)")
+        parser.add_argument("--status", help="Comma-separated statuses")
+        parser.add_argument("--output", help="File to write (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(
+                start=options["start"], end=options["end"], status=options["status"]
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        lines = stream_rows(
+            export_queryset(**filters), options["format"], chunk_size=options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                written = self._write(output, lines)
+            if options["format"] == "csv":
+                written -= 1  # header
+            self.stderr.write(self.style.SUCCESS(f"Exported {written} reservations to {options['output']}"))
+        else:
+            self._write(self.stdout, lines)
+
+    def _write(self, output, lines):
+        written = 0
+        for line in lines:
+            output.write(line)
+            written += 1
+        return written
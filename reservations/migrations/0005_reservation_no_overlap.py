@@ -0,0 +1,65 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:08
+
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+import reservations.models
+
+LIVE_STATUSES = ('pending', 'confirmed', 'active')
+
+# Overlapping pairs listed in the error
+REPORTED_PAIRS = 50
+
+
+def check_no_overlaps(apps, schema_editor):
+    """
+    Stop before AddConstraint when live reservations already overlap: list
+    the pairs (the constraint would fail with only the first one)
+    """
+    Reservation = apps.get_model('reservations', 'Reservation')
+    table = schema_editor.quote_name(Reservation._meta.db_table)
+    # Inclusive ranges, like the constraint: a stay ending on a day
+    # overlaps one starting that day
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT a.car_id, a.id, b.id
+            FROM {table} a
+            JOIN {table} b
+              ON b.car_id = a.car_id
+             AND b.id > a.id
+             AND b.start_date <= a.end_date
+             AND a.start_date <= b.end_date
+            WHERE a.status IN %s AND b.status IN %s
+            ORDER BY a.car_id, a.id, b.id
+            """,
+            [LIVE_STATUSES, LIVE_STATUSES],
+        )
+        pairs = cursor.fetchall()
+    if pairs:
+        listed = ', '.join(
+            f"car {car_id}: {first} & {second}" for car_id, first, second in pairs[:REPORTED_PAIRS]
+        )
+        more = f" (and {len(pairs) - REPORTED_PAIRS} more)" if len(pairs) > REPORTED_PAIRS else ""
+        raise RuntimeError(
+            f"Cannot add reservation_no_overlap: live (pending, confirmed, active) "
+            f"reservations overlap on the same car, {len(pairs)} pair(s): {listed}{more}. "
+            f"Cancel or move one reservation of each pair, then run the migration again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_reservation_deposit_amount_reservation_paid_at_and_more'),
+    ]
+
+    operations = [
+        # Needed for the '=' operator on car_id inside a GiST index
+        BtreeGistExtension(),
+        migrations.RunPython(check_no_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['pending', 'confirmed', 'active'])), expressions=[('car', '='), (reservations.models.DateRange('start_date', 'end_date', models.Value('[]')), '&&')], name='reservation_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0007_reservation_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['start_date'], include=('car', 'status', 'total_amount', 'cancellation_fee', 'refund_amount'), name='res_start_report_idx'),
+        ),
+    ]
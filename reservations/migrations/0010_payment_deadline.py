@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:29
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_payment_deadline(apps, schema_editor):
+    # Pending, unpaid rows created before the field existed get the deadline
+    # they would have been given, so the cleanup task also cancels the
+    # stale ones
+    Reservation = apps.get_model('reservations', 'Reservation')
+    window = timedelta(minutes=getattr(settings, 'PAYMENT_WINDOW_MINUTES', 30))
+    Reservation.objects.using(schema_editor.connection.alias).filter(
+        status='pending', payment_status='unpaid', payment_deadline__isnull=True,
+    ).update(payment_deadline=models.F('created_at') + window)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0009_cleanup_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='payment_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'payment_deadline'], name='res_status_deadline_idx'),
+        ),
+        migrations.RunPython(backfill_payment_deadline, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,98 @@
-from datetime import date, datetime, time
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.backends.postgresql.psycopg_any import DateRange as DateRangeValue
+from django.db.models import Exists, OuterRef, Q, Value
 from django.utils import timezone
 
+from cars.cache import invalidate_cars
 from cars.models import Car
+from cars.pricing import price_stay
+
+# Statuses that keep a car blocked for the reservation's dates
+LIVE_STATUSES = ['pending', 'confirmed', 'active']
+
+OVERLAP_CONSTRAINT_NAME = 'reservation_no_overlap'
+
+# Cancellation fee tiers, first match wins:
+# (minimum hours of notice before the start, share of the total charged)
+CANCELLATION_TIERS = (
+    (48, Decimal('0.00')),
+    (24, Decimal('0.50')),
+    (0, Decimal('1')),
+)
+
+
+class DateRange(models.Func):
+    """
+    daterange(start, end, bounds) SQL function
+    Used for the rental period in the overlap constraint and conflict check
+    """
+    function = 'daterange'
+    output_field = DateRangeField()
+
+
+def rental_period(start_date='start_date', end_date='end_date'):
+    """
+    Rental period as an inclusive daterange: a booking ending on a day
+    conflicts with one starting on that same day.
+    """
+    return DateRange(start_date, end_date, Value('[]'))
+
+
+def payment_window():
+    """
+    Time a new pending reservation has to be paid
+    """
+    return timedelta(minutes=getattr(settings, 'PAYMENT_WINDOW_MINUTES', 30))
+
+
+def rental_start(start_date):
+    """
+    Start of the rental as an aware datetime (midnight of start_date)
+    """
+    start_dt = datetime.combine(start_date, time.min)
+    if timezone.is_naive(start_dt):
+        start_dt = timezone.make_aware(start_dt, timezone.get_current_timezone())
+    return start_dt
+
+
+def cancellation_fee_for(total, hours_to_start):
+    """
+    Fee for cancelling a booking of the given total with hours_to_start
+    hours of notice (CANCELLATION_TIERS)
+    """
+    for min_hours, share in CANCELLATION_TIERS:
+        if hours_to_start >= min_hours:
+            return total * share if share else Decimal('0.00')
+    return total
+
+
+def cancellation_schedule(start_date, total):
+    """
+    Fee for cancelling at each point before the start
+
+    Returns:
+        list: One dict per tier: notice_hours, cancel_before (the tier
+        applies until this moment) and fee
+    """
+    start_dt = rental_start(start_date)
+    return [
+        {
+            'notice_hours': min_hours,
+            'cancel_before': start_dt - timedelta(hours=min_hours),
+            'fee': cancellation_fee_for(total, min_hours),
+        }
+        for min_hours, _ in CANCELLATION_TIERS
+    ]
+
 
 class Reservation(models.Model):
     """
@@ -14,15 +100,17 @@ class Reservation(models.Model):
     
     TODO (Week 3 - Celery Automation):
     ═══════════════════════════════════════════════════════════════
-    [ ] Add payment_deadline field (DateTimeField)
-        - Auto-set to created_at + 30 minutes for pending reservations
-        - Example: payment_deadline = models.DateTimeField(null=True, blank=True)
+    [x] Add payment_deadline field (DateTimeField)
+        - Set to creation time + PAYMENT_WINDOW_MINUTES (30) for new
+          pending reservations (backfilled for existing unpaid ones),
+          cleared when paid
     
-    [ ] Implement Celery periodic task: cleanup_expired_pending_reservations()
-        - Runs every 5 minutes
-        - Find: status='pending' AND created_at < (now - 30min)
+    [x] Implement Celery periodic task: cleanup_expired_pending_reservations()
+        - Runs every minute
+        - Find: status='pending' AND unpaid AND payment_deadline < now
+          (res_status_deadline_idx)
         - Action: Auto-cancel + set cancellation_reason='Payment timeout'
-        - Signal will auto-update: car.is_rented = False
+        - Recomputes car.is_rented in the same transaction
     
     [ ] Add email notification: "Payment timeout - Reservation cancelled"
     
@@ -111,6 +199,9 @@ class Reservation(models.Model):
     deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     remaining_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     paid_at = models.DateTimeField(null=True, blank=True)
+    # Unpaid pending reservations are auto-cancelled after this
+    # (tasks.cleanup_expired_pending_reservations)
+    payment_deadline = models.DateTimeField(null=True, blank=True)
 
     # Refund info
     refund_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -126,6 +217,49 @@ class Reservation(models.Model):
         verbose_name = "Reservation"
         verbose_name_plural = "Reservations"
         ordering = ['-created_at']
+        indexes = [
+            # Conflict / availability checks: live reservations of a car by dates
+            models.Index(
+                fields=['car', 'start_date', 'end_date'],
+                condition=Q(status__in=LIVE_STATUSES),
+                name='res_live_car_dates_idx',
+            ),
+            # activate_todays_reservations
+            models.Index(fields=['status', 'start_date'], name='res_status_start_idx'),
+            # complete_ended_reservations
+            models.Index(fields=['status', 'end_date'], name='res_status_end_idx'),
+            # cleanup_expired_pending_reservations
+            models.Index(fields=['status', 'payment_deadline'], name='res_status_deadline_idx'),
+            # cleanup_expired_reservations: overdue live reservations in
+            # (end_date, id) keyset order
+            models.Index(
+                fields=['end_date', 'id'],
+                condition=Q(status__in=LIVE_STATUSES),
+                name='res_live_end_id_idx',
+            ),
+            # ReservationViewSet.get_queryset for regular users, in keyset order
+            models.Index(fields=['user', '-created_at', 'id'], name='res_user_created_id_idx'),
+            # Keyset pagination order for the staff list
+            models.Index(fields=['-created_at', 'id'], name='res_created_id_idx'),
+            # Revenue report windows: index-only scans over start_date
+            models.Index(
+                fields=['start_date'],
+                include=['car', 'status', 'total_amount', 'cancellation_fee', 'refund_amount'],
+                name='res_start_report_idx',
+            ),
+        ]
+        constraints = [
+            # Same car cannot be live-booked for overlapping dates, even when
+            # two requests pass check_date_conflict at the same time.
+            ExclusionConstraint(
+                name=OVERLAP_CONSTRAINT_NAME,
+                expressions=[
+                    ('car', RangeOperators.EQUAL),
+                    (rental_period(), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(status__in=LIVE_STATUSES),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.car.brand} {self.car.model} ({self.start_date} to {self.end_date})"
@@ -137,6 +271,21 @@ class Reservation(models.Model):
     def get_total_amount(self):
         return self.daily_rate * self.get_duration_days()
     
+    def apply_pricing(self):
+        """
+        Fill daily_rate and total_amount
+
+        - daily_rate given (agreed flat rate): daily_rate × days
+        - no daily_rate: priced night by night from the car's rate calendar
+          (cars/pricing.py); daily_rate becomes the stay's average
+        """
+        if self.daily_rate is None:
+            quote = price_stay(self.car, self.start_date, self.end_date)
+            self.daily_rate = quote['daily_rate']
+            self.total_amount = quote['total']
+        else:
+            self.total_amount = self.get_total_amount()
+    
     def get_status_display(self):
         return dict(self.STATUS_CHOICES).get(self.status, 'Unknown')
     
@@ -154,31 +303,46 @@ class Reservation(models.Model):
     
     # BUSINESS LOGIC: Date conflict check
     
+    def get_conflicting_reservations(self):
+        """
+        Live reservations of the same car overlapping this one's dates
+        Single probe on the reservation_no_overlap GiST index
+        """
+        return (
+            Reservation.objects
+            .annotate(period=rental_period())
+            .filter(
+                car_id=self.car_id,
+                status__in=LIVE_STATUSES,
+                period__overlap=DateRangeValue(self.start_date, self.end_date, '[]'),
+            )
+            .exclude(pk=self.pk)  # Exclude current reservation (for updates)
+        )
+
     def check_date_conflict(self):
         """
         Check if there's any date conflict with existing reservations
         Same car cannot be rented for overlapping dates
         """
-        # Find all reservations for the same car
-        overlapping = Reservation.objects.filter(
-            car=self.car,
-            status__in=['pending', 'confirmed', 'active']
-        ).exclude(pk=self.pk)  # Exclude current reservation (for updates)
-        
-        # Check each reservation for date overlap
-        for reservation in overlapping:
-            # Date overlap logic:
-            # - New start date is before existing end date AND
-            # - New end date is after existing start date
-            if (self.start_date <= reservation.end_date and 
-                self.end_date >= reservation.start_date):
-                raise ValidationError(
-                    f"This car is already reserved from {reservation.start_date} to {reservation.end_date}"
-                )
+        conflict = self.get_conflicting_reservations().only('start_date', 'end_date').first()
+        if conflict is not None:
+            raise ValidationError(
+                f"This car is already reserved from {conflict.start_date} to {conflict.end_date}"
+            )
     
     
     # Model validation
     def clean(self):
+        self.clean_booking_rules()
+        
+        # Check for date conflicts (same car, overlapping dates)
+        self.check_date_conflict()
+    
+    def clean_booking_rules(self):
+        """
+        Everything clean() checks except date conflicts
+        (clean_batch() checks those for a whole batch at once)
+        """
         # Basic field validations
         if self.start_date >= self.end_date:
             raise ValidationError("Start date must be before end date")
@@ -219,15 +383,150 @@ class Reservation(models.Model):
                 raise ValidationError("Car is damaged and cannot be rented!")
             if self.car.is_maintenance:
                 raise ValidationError("Car is under maintenance and cannot be rented!")
-        
-        # Check for date conflicts (same car, overlapping dates)
-        self.check_date_conflict()
     
+    @classmethod
+    def clean_batch(cls, reservations):
+        """
+        clean() for a batch of new reservations in a fixed number of queries
+
+        - users (with profiles) and cars: one query each
+        - conflicts with stored reservations: one range query, probing each
+          car over the span of its dates in the batch
+        - overlaps between reservations of the batch: checked in memory,
+          earlier items win
+
+        Returns:
+            dict: index in reservations → ValidationError, for failing items
+        """
+        errors = {}
+        users = User.objects.select_related('userprofile').in_bulk(
+            {reservation.user_id for reservation in reservations}
+        )
+        cars = Car.objects.in_bulk({reservation.car_id for reservation in reservations})
+
+        valid = []
+        for index, reservation in enumerate(reservations):
+            if reservation.user_id not in users:
+                errors[index] = ValidationError(
+                    {'user': f'Invalid pk "{reservation.user_id}" - object does not exist.'}
+                )
+                continue
+            if reservation.car_id not in cars:
+                errors[index] = ValidationError(
+                    {'car': f'Invalid pk "{reservation.car_id}" - object does not exist.'}
+                )
+                continue
+            reservation.user = users[reservation.user_id]
+            reservation.car = cars[reservation.car_id]
+            try:
+                reservation.clean_booking_rules()
+            except ValidationError as exc:
+                errors[index] = exc
+                continue
+            valid.append((index, reservation))
+
+        spans = {}
+        for _, reservation in valid:
+            low, high = spans.get(reservation.car_id, (reservation.start_date, reservation.end_date))
+            spans[reservation.car_id] = (
+                min(low, reservation.start_date),
+                max(high, reservation.end_date),
+            )
+
+        # car_id → [(start_date, end_date, batch index or None for stored rows)]
+        booked = defaultdict(list)
+        if spans:
+            probes = Q()
+            for car_id, (low, high) in spans.items():
+                probes |= Q(car_id=car_id, period__overlap=DateRangeValue(low, high, '[]'))
+            stored = (
+                cls.objects
+                .annotate(period=rental_period())
+                .filter(probes, status__in=LIVE_STATUSES)
+                .values_list('car_id', 'start_date', 'end_date')
+            )
+            for car_id, start_date, end_date in stored:
+                booked[car_id].append((start_date, end_date, None))
+
+        for index, reservation in valid:
+            for start_date, end_date, batch_index in booked[reservation.car_id]:
+                # Inclusive ranges, same rule as the overlap constraint
+                if start_date <= reservation.end_date and end_date >= reservation.start_date:
+                    if batch_index is None:
+                        message = f"This car is already reserved from {start_date} to {end_date}"
+                    else:
+                        message = (
+                            f"This car is already reserved from {start_date} to {end_date} "
+                            f"by item {batch_index} of this batch"
+                        )
+                    errors[index] = ValidationError(message)
+                    break
+            else:
+                if reservation.status in LIVE_STATUSES:
+                    booked[reservation.car_id].append(
+                        (reservation.start_date, reservation.end_date, index)
+                    )
+
+        return errors
+
+    @classmethod
+    def create_batch(cls, reservations):
+        """
+        Validate a batch with clean_batch() and insert it all or nothing:
+        one bulk INSERT and one car status refresh, in one transaction.
+
+        Returns:
+            dict: index → ValidationError (nothing was created unless empty)
+        """
+        errors = cls.clean_batch(reservations)
+        if errors:
+            return errors
+
+        for reservation in reservations:
+            if not reservation.total_amount:
+                reservation.apply_pricing()
+            reservation.start_payment_window()
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(reservations)
+                # bulk_create sends no post_save: refresh the cars directly
+                refresh_car_rental_status({reservation.car_id for reservation in reservations})
+        except IntegrityError as exc:
+            if OVERLAP_CONSTRAINT_NAME not in str(exc):
+                raise
+            for reservation in reservations:
+                reservation.pk = None
+            # A concurrent booking won the race: report it per item if possible
+            errors = cls.clean_batch(reservations)
+            return errors or {
+                index: ValidationError("This car is already reserved for the selected dates")
+                for index in range(len(reservations))
+            }
+        return {}
+    
+    def start_payment_window(self):
+        """
+        Give a new pending reservation payment_window() to be paid
+        """
+        if self.status == 'pending' and self.payment_deadline is None:
+            self.payment_deadline = timezone.now() + payment_window()
+
     def save(self, *args, **kwargs):
         self.clean()
         if not self.total_amount:
-            self.total_amount = self.get_total_amount()
-        super().save(*args, **kwargs)
+            self.apply_pricing()
+        if not self.pk:
+            self.start_payment_window()
+        try:
+            # Savepoint so a constraint error doesn't break an outer transaction
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            if OVERLAP_CONSTRAINT_NAME not in str(exc):
+                raise
+            # A concurrent booking won the race: report it like clean() would
+            self.check_date_conflict()
+            raise ValidationError("This car is already reserved for the selected dates")
         
     def get_cancellation_fee(self):
         """
@@ -239,27 +538,15 @@ class Reservation(models.Model):
         if self.status not in ['pending', 'confirmed']:
             return None  # iptal edilemez
 
-        now = timezone.now()
-        start_dt = datetime.combine(self.start_date, time.min)
-
-        # timezone aware yap
-        if timezone.is_naive(start_dt):
-            start_dt = timezone.make_aware(start_dt, timezone.get_current_timezone())
-
-        hours_to_start = (start_dt - now).total_seconds() / 3600
+        hours_to_start = (rental_start(self.start_date) - timezone.now()).total_seconds() / 3600
 
         # toplam tutarı bul
         total = self.total_amount or self.get_total_amount()
         if total is None:
             return None
 
-        if hours_to_start >= 48:
-            return Decimal('0.00')
-        elif hours_to_start >= 24:
-            return total * Decimal('0.50')
-        else:
-            return total
-            
+        return cancellation_fee_for(total, hours_to_start)
+
     def get_refund_amount(self):
         if self.cancellation_fee is None:
             return None
@@ -267,4 +554,45 @@ class Reservation(models.Model):
         if total is None:
             return None
         refund = total - self.cancellation_fee
-        return max(refund, Decimal('0.00'))      
\ No newline at end of file
+        return max(refund, Decimal('0.00'))
+
+
+class TaskCheckpoint(models.Model):
+    """
+    Progress of a long-running task, committed together with each chunk of
+    work so a restarted worker resumes after the last committed chunk
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Task Checkpoint"
+        verbose_name_plural = "Task Checkpoints"
+
+    def __str__(self):
+        return self.name
+
+
+def refresh_car_rental_status(car_ids):
+    """
+    Recompute Car.is_rented for the given cars in one UPDATE:
+    a car is rented while it has any live reservation.
+    Only cars whose flag actually flips are written (and uncached).
+
+    Returns:
+        int: Number of cars whose is_rented changed
+    """
+    car_ids = set(car_ids)
+    if not car_ids:
+        return 0
+    live = Reservation.objects.filter(car=OuterRef('pk'), status__in=LIVE_STATUSES)
+    changed = (
+        Car.objects
+        .filter(pk__in=car_ids)
+        .exclude(is_rented=Exists(live))
+        .update(is_rented=Exists(live), updated_at=timezone.now())
+    )
+    if changed:
+        invalidate_cars(car_ids)
+    return changed
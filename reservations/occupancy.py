@@ -0,0 +1,199 @@
+"""
+Fleet Occupancy
+Cars × days occupancy grid for planning, built with NumPy
+
+Live reservations overlapping the window are loaded once as three integer
+arrays (car row, first day, last day, as offsets from the window start,
+computed by PostgreSQL). The grid is filled with a difference array: +1 on
+each interval's first day, -1 after its last day, cumulative sum along the
+days. Metrics and payload encodings work on whole-matrix operations too;
+no Python loop runs per reservation or per day.
+
+A car counts as occupied on every day from start_date to end_date
+inclusive, the same rule as the availability check and the overlap
+constraint.
+"""
+import base64
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import F, Func, IntegerField, Value
+
+from cars.models import Car
+from .models import LIVE_STATUSES, Reservation
+
+ENCODINGS = ('bitmap', 'rle')
+
+
+class DayOffset(Func):
+    """
+    date - date in PostgreSQL: whole days, as an integer
+    """
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+
+def load_intervals(start, days):
+    """
+    Fleet and live reservation intervals overlapping [start, start + days)
+
+    Returns:
+        tuple: (car_ids, brands, interval_car_ids, first_days, last_days),
+        NumPy arrays; days are offsets from start (may fall outside the
+        window, clipped later)
+    """
+    cars = list(Car.objects.order_by('id').values_list('id', 'brand'))
+    car_ids = np.fromiter((car_id for car_id, _ in cars), dtype=np.int64, count=len(cars))
+    brands = np.array([brand for _, brand in cars], dtype=object)
+
+    window_end = start + timedelta(days=days - 1)
+    rows = (
+        Reservation.objects
+        .filter(status__in=LIVE_STATUSES, start_date__lte=window_end, end_date__gte=start)
+        .annotate(
+            first_day=DayOffset(F('start_date'), Value(start)),
+            last_day=DayOffset(F('end_date'), Value(start)),
+        )
+        .values_list('car_id', 'first_day', 'last_day')
+    )
+    intervals = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+    return car_ids, brands, intervals[:, 0], intervals[:, 1], intervals[:, 2]
+
+
+def occupancy_matrix(car_ids, interval_car_ids, first_days, last_days, days):
+    """
+    Boolean matrix, one row per car (car_ids order, sorted), one column per day
+
+    Args:
+        car_ids: Sorted car ids
+        interval_car_ids / first_days / last_days: One entry per interval,
+            inclusive day offsets
+        days: Window length
+    """
+    rows = np.searchsorted(car_ids, interval_car_ids)
+    first = np.clip(first_days, 0, days)
+    stop = np.clip(last_days + 1, 0, days)
+    keep = (first < stop) & (rows < len(car_ids))
+    keep[keep] &= car_ids[rows[keep]] == interval_car_ids[keep]
+    rows, first, stop = rows[keep], first[keep], stop[keep]
+
+    # np.add.at accumulates repeated (row, day) pairs, unlike fancy indexing
+    changes = np.zeros((len(car_ids), days + 1), dtype=np.int32)
+    np.add.at(changes, (rows, first), 1)
+    np.add.at(changes, (rows, stop), -1)
+    return np.cumsum(changes[:, :days], axis=1) > 0
+
+
+def _runs(matrix):
+    """
+    Runs of True in every row
+
+    Returns:
+        tuple: (rows, first_days, lengths), row-major order
+    """
+    padded = np.zeros((matrix.shape[0], matrix.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = matrix
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, stops = np.nonzero(edges == -1)
+    return rows, starts, stops - starts
+
+
+def encode_bitmap(matrix):
+    """
+    One base64 string per car: the row packed 8 days per byte, day 0 in
+    the most significant bit of the first byte
+    """
+    packed = np.packbits(matrix, axis=1)
+    return [base64.b64encode(row.tobytes()).decode('ascii') for row in packed]
+
+
+def encode_runs(matrix):
+    """
+    One list of [first_day, length] occupied runs per car
+    """
+    rows, starts, lengths = _runs(matrix)
+    bounds = np.searchsorted(rows, np.arange(matrix.shape[0] + 1))
+    pairs = np.stack([starts, lengths], axis=1).tolist()
+    return [pairs[bounds[index]:bounds[index + 1]] for index in range(matrix.shape[0])]
+
+
+def car_metrics(matrix):
+    """
+    Returns:
+        dict: Per-car arrays: occupied_days, longest_idle (longest run of
+        free days) and idle_streaks (number of free runs)
+    """
+    occupied_days = matrix.sum(axis=1)
+    rows, _, lengths = _runs(~matrix)
+    longest_idle = np.zeros(matrix.shape[0], dtype=np.int64)
+    np.maximum.at(longest_idle, rows, lengths)
+    idle_streaks = np.bincount(rows, minlength=matrix.shape[0])
+    return {
+        'occupied_days': occupied_days,
+        'longest_idle': longest_idle,
+        'idle_streaks': idle_streaks,
+    }
+
+
+def brand_metrics(matrix, brands):
+    """
+    Returns:
+        list: Per brand: cars, occupancy ratio over the window, and the peak
+        day (highest share of the brand's cars occupied)
+    """
+    names, codes = np.unique(brands.astype(str), return_inverse=True)
+    # Group the rows by brand, then sum each group's block of rows
+    order = np.argsort(codes, kind='stable')
+    cars = np.bincount(codes, minlength=len(names))
+    bounds = np.concatenate(([0], np.cumsum(cars)[:-1]))
+    daily = np.add.reduceat(matrix[order].astype(np.int64), bounds, axis=0)
+    share = daily / cars[:, None]
+    peak_days = share.argmax(axis=1)
+    return [
+        {
+            'brand': str(name),
+            'cars': int(cars[index]),
+            'ratio': round(float(share[index].mean()), 4),
+            'peak_day': int(peak_days[index]),
+            'peak_occupancy': round(float(share[index, peak_days[index]]), 4),
+        }
+        for index, name in enumerate(names)
+    ]
+
+
+def occupancy_report(start, days=90, encoding='bitmap'):
+    """
+    Occupancy grid of the whole fleet for [start, start + days)
+
+    Returns:
+        dict: start, days, encoding, per-car rows (grid + metrics),
+        per-brand metrics and the fleet's daily occupied car counts
+    """
+    car_ids, brands, interval_car_ids, first_days, last_days = load_intervals(start, days)
+    matrix = occupancy_matrix(car_ids, interval_car_ids, first_days, last_days, days)
+
+    grid = encode_bitmap(matrix) if encoding == 'bitmap' else encode_runs(matrix)
+    metrics = {name: values.tolist() for name, values in car_metrics(matrix).items()}
+    cars = [
+        {
+            'car_id': car_id,
+            'brand': brand,
+            'occupied_days': metrics['occupied_days'][index],
+            'ratio': round(metrics['occupied_days'][index] / days, 4),
+            'longest_idle': metrics['longest_idle'][index],
+            'idle_streaks': metrics['idle_streaks'][index],
+            'occupancy': grid[index],
+        }
+        for index, (car_id, brand) in enumerate(zip(car_ids.tolist(), brands.tolist()))
+    ]
+
+    return {
+        'start': start,
+        'days': days,
+        'encoding': encoding,
+        'cars': cars,
+        'brands': brand_metrics(matrix, brands) if len(car_ids) else [],
+        'fleet_daily': matrix.sum(axis=0).tolist(),
+    }
@@ -10,4 +10,4 @@ class IsAdminOrOwner(BasePermission):
         return request.user and request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or obj.user == request.user
\ No newline at end of file
+        return request.user.is_staff or obj.user_id == request.user.id
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Reservation Reports
+Revenue and utilization figures, aggregated in the database
+
+Every sum, grouping and date difference below is computed by PostgreSQL
+(Sum, TruncMonth, end_date - start_date); Python only formats the grouped
+rows. Nothing here calls get_total_amount() / get_duration_days().
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncMonth
+
+from cars.models import Car
+from .models import Reservation
+
+# Grouping columns; cars are grouped by id alone (no join) and labelled after
+REVENUE_GROUPS = {
+    'month': ('month',),
+    'car': ('car_id',),
+    'brand': ('car__brand',),
+}
+
+# Reservations that occupied (or still occupy) their car
+OCCUPYING_STATUSES = ['pending', 'confirmed', 'active', 'completed']
+
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    # Same "123.45" strings as the serializers' DecimalFields
+    return str(value.quantize(CENT))
+
+
+def revenue_report(group_by='month', start=None, end=None):
+    """
+    Revenue per month, car or brand
+
+    Args:
+        group_by: 'month' (of start_date), 'car' or 'brand'
+        start / end: Optional inclusive bounds on start_date
+
+    Returns:
+        list: One dict per group: reservations, booked (total_amount of
+        non-cancelled reservations), cancellation_fees, refunds and
+        net = booked + cancellation_fees
+
+    A refund only ever pays back a cancelled reservation's total minus its
+    fee: the part kept is the fee, already in net, so refunds are reported
+    but not subtracted.
+    """
+    queryset = Reservation.objects.all()
+    if start is not None:
+        queryset = queryset.filter(start_date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(start_date__lte=end)
+    if group_by == 'month':
+        queryset = queryset.annotate(month=TruncMonth('start_date'))
+
+    group_fields = REVENUE_GROUPS[group_by]
+    # COUNT(*) rather than COUNT(id): every column read here is in
+    # res_start_report_idx, so windows are index-only scans
+    rows = list(
+        queryset
+        .values(*group_fields)
+        .annotate(
+            reservations=Count('*'),
+            booked=Coalesce(Sum('total_amount', filter=~Q(status='cancelled')), ZERO),
+            cancellation_fees=Coalesce(Sum('cancellation_fee'), ZERO),
+            refunds=Coalesce(Sum('refund_amount'), ZERO),
+        )
+        .annotate(net=F('booked') + F('cancellation_fees'))
+        .order_by(*group_fields)
+    )
+
+    labels = {}
+    if group_by == 'car':
+        labels = {
+            car_id: {'brand': brand, 'model': model}
+            for car_id, brand, model in Car.objects.filter(
+                pk__in=[row['car_id'] for row in rows]
+            ).values_list('id', 'brand', 'model')
+        }
+
+    return [
+        {
+            **{name.replace('car__', ''): row[name] for name in group_fields},
+            **labels.get(row.get('car_id'), {}),
+            'reservations': row['reservations'],
+            'booked': _money(row['booked']),
+            'cancellation_fees': _money(row['cancellation_fees']),
+            'refunds': _money(row['refunds']),
+            'net': _money(row['net']),
+        }
+        for row in rows
+    ]
+
+
+def utilization_report(start, end):
+    """
+    Booked days per car over the window start <= day < end
+
+    A reservation occupies its car from start_date up to end_date (the
+    nights it is charged for, as in days_count); only the part inside the
+    window counts: LEAST(end_date, end) - GREATEST(start_date, start).
+
+    Returns:
+        dict: window, per-car rows (every car, booked or not) and a fleet
+        total; ratio = booked_days / window days
+    """
+    window_days = (end - start).days
+    booked_days = ExpressionWrapper(
+        Least('end_date', Value(end)) - Greatest('start_date', Value(start)),
+        output_field=DurationField(),
+    )
+    booked = dict(
+        Reservation.objects
+        .filter(status__in=OCCUPYING_STATUSES, start_date__lt=end, end_date__gt=start)
+        .values('car_id')
+        .annotate(days=Sum(booked_days))
+        .values_list('car_id', 'days')
+    )
+
+    cars = []
+    total_days = 0
+    for car_id, brand, model in Car.objects.order_by('id').values_list('id', 'brand', 'model'):
+        days = booked.get(car_id, timedelta()).days
+        total_days += days
+        cars.append({
+            'car_id': car_id,
+            'brand': brand,
+            'model': model,
+            'booked_days': days,
+            'ratio': round(days / window_days, 4),
+        })
+
+    fleet_days = window_days * len(cars)
+    return {
+        'start': start,
+        'end': end,
+        'days': window_days,
+        'cars': cars,
+        'fleet': {
+            'cars': len(cars),
+            'booked_days': total_days,
+            'ratio': round(total_days / fleet_days, 4) if fleet_days else 0,
+        },
+    }
@@ -0,0 +1,480 @@
+"""
+Dataset Seeding
+Realistic synthetic fleets, customers and reservation histories
+
+Rows are generated in memory from a seeded random.Random as plain tuples
+and streamed into the database: COPY ... FROM STDIN on PostgreSQL,
+bulk_create in batches elsewhere (e.g. SQLite). No save(), clean() or
+signals run, so a million reservations load in well under a minute.
+
+The data follows simple but realistic distributions:
+    - fleet: mostly economy brands, newer cars more common, the daily rate
+      set by class and age
+    - customers: spread sign-up dates, ages 21-75, 90% verified; a minority
+      of frequent renters books most of the stays
+    - histories: per car, stays of 1-21 days (short ones most common) with
+      at least one free day in between (the overlap constraint treats
+      ranges as inclusive); busy cars have shorter gaps. About 80% of each
+      history is in the past:
+        - ended: completed, some cancelled, a few left pending/confirmed
+          (what cleanup_expired_reservations picks up)
+        - running today: active; those ending today are what
+          complete_ended_reservations picks up
+        - starting today: confirmed (activate_todays_reservations)
+        - future: confirmed or pending (unpaid, their payment deadline
+          long passed: what cleanup_expired_pending_reservations picks up)
+    - created_at: booked days to weeks ahead; paid_at, cancellation_date
+      and updated_at follow from it (COPY only: bulk_create stamps
+      auto_now_add fields with the current time)
+
+Primary keys of cars and users are drawn from their sequences up front,
+so profiles and reservations can reference them without reading back.
+"""
+import random
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import accumulate, islice
+from operator import getitem
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from cars.models import Car
+from users.models import UserProfile
+from .models import Reservation, payment_window, refresh_car_rental_status
+
+# brand: (models, weight in the fleet, premium)
+BRANDS = {
+    'Toyota': (('Corolla', 'Yaris', 'C-HR', 'RAV4'), 18, False),
+    'Renault': (('Clio', 'Megane', 'Captur'), 16, False),
+    'Fiat': (('Egea', '500', 'Doblo'), 16, False),
+    'Volkswagen': (('Polo', 'Golf', 'Passat', 'T-Roc'), 14, False),
+    'Hyundai': (('i20', 'i30', 'Tucson'), 12, False),
+    'Ford': (('Fiesta', 'Focus', 'Kuga'), 10, False),
+    'BMW': (('118i', '320i', 'X1'), 7, True),
+    'Mercedes': (('A180', 'C200', 'GLA'), 7, True),
+}
+COLORS = ('White', 'Black', 'Grey', 'Silver', 'Blue', 'Red')
+COLOR_WEIGHTS = (35, 20, 18, 14, 8, 5)
+CITIES = ('Istanbul', 'Ankara', 'Izmir', 'Antalya', 'Bursa', 'Adana')
+CITY_WEIGHTS = (40, 18, 14, 12, 9, 7)
+FIRST_NAMES = ('Ahmet', 'Ayse', 'Mehmet', 'Fatma', 'Can', 'Elif', 'Emre', 'Zeynep', 'Deniz', 'Selin')
+LAST_NAMES = ('Yilmaz', 'Kaya', 'Demir', 'Sahin', 'Celik', 'Yildiz', 'Aydin', 'Ozturk', 'Arslan', 'Dogan')
+
+# Stay length in days: short rentals dominate, a long tail of weeks
+STAY_DAYS = (1, 2, 3, 4, 5, 6, 7, 10, 14, 21)
+STAY_WEIGHTS = (14, 20, 18, 12, 9, 6, 10, 5, 4, 2)
+STAY_CUM_WEIGHTS = tuple(accumulate(STAY_WEIGHTS))
+MEAN_STAY_DAYS = sum(days * weight for days, weight in zip(STAY_DAYS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+
+PAYMENT_METHODS = ('credit_card', 'cash', 'bank_transfer')
+PAYMENT_CUM_WEIGHTS = tuple(accumulate((80, 12, 8)))
+PAYMENT_DELAYS = tuple(timedelta(minutes=minutes) for minutes in (5, 10, 15, 30))
+CANCELLATION_REASONS = ('Change of plans', 'Found a better price', 'Flight cancelled', '')
+
+CAR_COLUMNS = (
+    'id', 'brand', 'model', 'year', 'color', 'daily_rate',
+    'is_damaged', 'is_maintenance', 'created_at', 'updated_at',
+)
+USER_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'password', 'date_joined',
+)
+PROFILE_COLUMNS = (
+    'user_id', 'phone', 'address', 'city', 'state', 'zip_code', 'license_number',
+    'date_of_birth', 'is_verified', 'created_at', 'updated_at',
+)
+RESERVATION_COLUMNS = (
+    'user_id', 'car_id', 'start_date', 'end_date', 'daily_rate', 'total_amount', 'status',
+    'payment_status', 'payment_method', 'paid_at', 'cancellation_date', 'cancellation_fee',
+    'cancellation_reason', 'payment_deadline', 'created_at', 'updated_at',
+)
+
+DEFAULT_BATCH_SIZE = 5000
+COPY_BUFFER_SIZE = 1 << 20
+COPY_MEMO_SIZE = 100000
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Quarter hours from 09:00 to 21:00: timestamps repeat, which keeps
+# their COPY encoding cached
+DAY_SLOTS = tuple(time(9 + slot // 4, slot % 4 * 15) for slot in range(48))
+
+
+def _at(day, rng):
+    """
+    Aware datetime during the day (09:00-21:00)
+    """
+    return datetime.combine(day, DAY_SLOTS[int(rng.random() * 48)], tzinfo=dt_timezone.utc)
+
+
+def _copy_text(value):
+    """
+    value in COPY text format
+    """
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, str):
+        return (
+            value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r')
+        )
+    return str(value)
+
+
+class _EncodedValues(dict):
+    """
+    value → COPY text, filled on first use (bounded)
+    """
+
+    def __missing__(self, value):
+        if len(self) >= COPY_MEMO_SIZE:
+            self.clear()
+        text = self[value] = _copy_text(value)
+        return text
+
+
+class _CopyStream:
+    """
+    File-like COPY input encoding rows on demand, about one buffer at a time
+
+    Encoded values are cached per column: dates, amounts, statuses and
+    (quarter-hour) timestamps repeat across rows.
+    """
+
+    def __init__(self, rows, width, suffix):
+        self._rows = iter(rows)
+        self._encoded = [_EncodedValues() for _ in range(width)]
+        self._suffix = suffix
+        self._pending = b''
+        self.count = 0
+
+    def _line(self, row):
+        return '\t'.join(map(getitem, self._encoded, row)) + self._suffix
+
+    def read(self, size=COPY_BUFFER_SIZE):
+        if size is None or size < 0:
+            size = COPY_BUFFER_SIZE
+        lines, length = [], len(self._pending)
+        for row in self._rows:
+            line = self._line(row)
+            lines.append(line)
+            length += len(line)
+            self.count += 1
+            if length >= size:
+                break
+        data = self._pending + ''.join(lines).encode()
+        data, self._pending = data[:size], data[size:]
+        return data
+
+
+def _complete_columns(model, columns):
+    """
+    columns followed by every other concrete column of model (bar an
+    omitted primary key), with the value those take: the field default,
+    the current time for auto_now / auto_now_add
+
+    Returns:
+        tuple: (fields, constant values of the added fields)
+    """
+    now = timezone.now()
+    fields = [model._meta.get_field(name) for name in columns]
+    given = {field.attname for field in fields}
+    constants = []
+    for field in model._meta.concrete_fields:
+        if field.attname in given or field.primary_key:
+            continue
+        fields.append(field)
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            constants.append(now)
+        else:
+            constants.append(field.get_default())
+    return fields, tuple(constants)
+
+
+def allocate_ids(model, count, using=DEFAULT_DB_ALIAS):
+    """
+    count unused primary keys of model, taken from its sequence on
+    PostgreSQL (safe next to other writers), after the current maximum
+    elsewhere (call inside the transaction that inserts them)
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                [model._meta.db_table, model._meta.pk.column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    start = (model.objects.using(using).aggregate(last=Max('pk'))['last'] or 0) + 1
+    return list(range(start, start + count))
+
+
+def load_rows(model, columns, rows, batch_size=DEFAULT_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """
+    Insert rows (tuples of columns, attnames) into model's table: one
+    COPY FROM STDIN on PostgreSQL, bulk_create batches elsewhere. Columns
+    not given take their defaults; rows are consumed lazily.
+
+    Returns:
+        int: Rows inserted
+    """
+    fields, constants = _complete_columns(model, columns)
+    connection = connections[using]
+
+    if connection.vendor != 'postgresql':
+        names = [field.attname for field in fields]
+        count = 0
+        for batch in _batched(rows, batch_size):
+            model.objects.using(using).bulk_create(
+                [model(**dict(zip(names, row + constants))) for row in batch]
+            )
+            count += len(batch)
+        return count
+
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote(table), ', '.join(quote(field.column) for field in fields)
+    )
+    suffix = ''.join('\t' + _copy_text(value) for value in constants) + '\n'
+    stream = _CopyStream(rows, len(columns), suffix)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if model.objects.using(using).exists():
+            cursor.cursor.copy_expert(sql, stream, size=COPY_BUFFER_SIZE)
+        else:
+            with _indexes_deferred(cursor, table, quote):
+                cursor.cursor.copy_expert(sql, stream, size=COPY_BUFFER_SIZE)
+    return stream.count
+
+
+@contextmanager
+def _indexes_deferred(cursor, table, quote):
+    """
+    Drop the non-unique indexes, exclusion and foreign key constraints of
+    table and recreate them on exit
+
+    For loads into an empty table: building an index once over all rows
+    is much cheaper than updating it row by row, and a foreign key added
+    afterwards is checked with one join instead of a trigger per row.
+    Unique constraints stay. Run inside a transaction: on error the DDL is
+    rolled back with the rows.
+    """
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('f', 'x') ORDER BY conname",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT index.relname, pg_get_indexdef(index.oid) "
+        "FROM pg_index JOIN pg_class AS index ON index.oid = pg_index.indexrelid "
+        "WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisunique "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = pg_index.indexrelid) "
+        "ORDER BY index.relname",
+        [table],
+    )
+    indexes = cursor.fetchall()
+
+    for name, _ in constraints:
+        cursor.execute(f"ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(name)}")
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {quote(name)}")
+    yield
+    # One sort per index: keep it in memory (reset at commit)
+    cursor.execute("SET LOCAL maintenance_work_mem = '256MB'")
+    for _, definition in indexes:
+        cursor.execute(definition)
+    for name, definition in constraints:
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+
+
+def generate_cars(car_ids, rng, today):
+    brands = list(BRANDS)
+    brand_weights = [BRANDS[brand][1] for brand in brands]
+    years = list(range(today.year - 10, today.year + 1))
+    # Newer cars more common
+    year_weights = [1 + index for index in range(len(years))]
+    for car_id in car_ids:
+        brand = rng.choices(brands, brand_weights)[0]
+        models, _, premium = BRANDS[brand]
+        year = rng.choices(years, year_weights)[0]
+        base = rng.uniform(120, 220) if premium else rng.uniform(35, 90)
+        daily_rate = Decimal(round(base * (1 - 0.04 * (today.year - year)))).quantize(Decimal('0.01'))
+        created_at = _at(today - timedelta(days=rng.randrange(30, 365 * (today.year - year + 1))), rng)
+        yield (
+            car_id, brand, rng.choice(models), year, rng.choices(COLORS, COLOR_WEIGHTS)[0], daily_rate,
+            rng.random() < 0.01, rng.random() < 0.02, created_at, created_at,
+        )
+
+
+def generate_users(user_ids, rng, today):
+    for user_id in user_ids:
+        yield (
+            user_id,
+            f'seed_user_{user_id}',
+            f'seed_user_{user_id}@example.com',
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            # Unusable password: hashing a million passwords is not the point
+            '!',
+            _at(today - timedelta(days=rng.randrange(1, 365 * 3)), rng),
+        )
+
+
+def generate_profiles(user_ids, rng, today):
+    for user_id in user_ids:
+        city = rng.choices(CITIES, CITY_WEIGHTS)[0]
+        age = 21 + int(rng.triangular(0, 54, 12))
+        created_at = _at(today - timedelta(days=rng.randrange(1, 365 * 3)), rng)
+        yield (
+            user_id,
+            f'5{user_id:09d}',
+            f'{rng.randint(1, 200)} Seed Street',
+            city,
+            city,
+            f'{rng.randint(1000, 81999):05d}',
+            f'SEED{user_id:010d}',
+            today - timedelta(days=365 * age + rng.randrange(365)),
+            rng.random() < 0.9,
+            created_at,
+            created_at,
+        )
+
+
+def _ended_status(rng):
+    roll = rng.random()
+    if roll < 0.85:
+        return 'completed'
+    if roll < 0.97:
+        return 'cancelled'
+    return rng.choice(('pending', 'confirmed'))
+
+
+def generate_reservations(cars, user_ids, count, rng, today=None):
+    """
+    Reservation histories (RESERVATION_COLUMNS tuples), count spread
+    evenly over cars
+
+    Args:
+        cars: (car_id, daily_rate) pairs
+        user_ids: Customers to book for
+        count: Reservations in total
+    """
+    today = today or timezone.localdate()
+    # Nothing happened after the start of today (keeps the output a
+    # function of the seed and today)
+    now = datetime.combine(today, time(), tzinfo=dt_timezone.utc)
+    customers = len(user_ids)
+    window = payment_window()
+    total_weight = STAY_CUM_WEIGHTS[-1]
+    per_car, extra = divmod(count, len(cars))
+    for index, (car_id, daily_rate) in enumerate(cars):
+        stays = per_car + (1 if index < extra else 0)
+        totals = {days: daily_rate * days for days in STAY_DAYS}
+        # Mean free days between stays: busy cars ~1, quiet ones ~6
+        idle = rng.uniform(0.5, 5.5)
+        span = stays * (MEAN_STAY_DAYS + 1 + idle)
+        day = today - timedelta(days=int(span * 0.8) + rng.randrange(7))
+        for _ in range(stays):
+            days = STAY_DAYS[bisect(STAY_CUM_WEIGHTS, rng.random() * total_weight)]
+            start, end = day, day + timedelta(days=days)
+            # Skewed towards the first customers: frequent renters
+            user_id = user_ids[int(customers * rng.random() ** 2)]
+            booked = start - timedelta(days=min(int(rng.expovariate(1 / 12)), 180))
+            created_at = min(_at(booked, rng), now)
+
+            if end < today:
+                status = _ended_status(rng)
+            elif start < today:
+                status = 'active'
+            elif start == today:
+                status = 'confirmed'
+            else:
+                status = 'confirmed' if rng.random() < 0.8 else 'pending'
+
+            payment_method = paid_at = cancellation_date = cancellation_fee = None
+            cancellation_reason = ''
+            updated_at = created_at
+            if status in ('confirmed', 'active', 'completed'):
+                payment_method = PAYMENT_METHODS[bisect(PAYMENT_CUM_WEIGHTS, rng.random() * PAYMENT_CUM_WEIGHTS[-1])]
+                paid_at = updated_at = min(created_at + PAYMENT_DELAYS[int(rng.random() * 4)], now)
+            elif status == 'cancelled':
+                # Some day between booking and pick-up
+                cancelled = booked + timedelta(days=int((start - booked).days * rng.random()))
+                cancellation_date = updated_at = max(_at(cancelled, rng), created_at)
+                cancellation_fee = Decimal('0.00')
+                cancellation_reason = CANCELLATION_REASONS[int(rng.random() * 4)]
+            if status == 'completed':
+                updated_at = min(_at(end, rng), now)
+
+            yield (
+                user_id, car_id, start, end, daily_rate, totals[days], status,
+                'unpaid' if paid_at is None else 'paid', payment_method, paid_at,
+                cancellation_date, cancellation_fee, cancellation_reason,
+                created_at + window if status == 'pending' else None, created_at, updated_at,
+            )
+            day = end + timedelta(days=1 + int(rng.expovariate(1 / idle)))
+
+
+def seed_dataset(cars, users, reservations, batch_size=DEFAULT_BATCH_SIZE, seed=0, log=None,
+                 using=DEFAULT_DB_ALIAS):
+    """
+    Generate a dataset and load it in one transaction
+
+    Args:
+        cars / users / reservations: Row counts (every user gets a profile)
+        batch_size: Rows per INSERT when bulk_create is used
+        seed: Random seed; the same seed gives the same data
+        log: Optional callable for progress messages
+
+    Returns:
+        dict: Inserted row counts
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    today = timezone.localdate()
+
+    with transaction.atomic(using=using):
+        fleet = list(generate_cars(allocate_ids(Car, cars, using), rng, today))
+        load_rows(Car, CAR_COLUMNS, fleet, batch_size, using)
+        log(f'cars: {len(fleet)}')
+
+        user_ids = allocate_ids(User, users, using)
+        load_rows(User, USER_COLUMNS, generate_users(user_ids, rng, today), batch_size, using)
+        load_rows(UserProfile, PROFILE_COLUMNS, generate_profiles(user_ids, rng, today), batch_size, using)
+        log(f'users: {len(user_ids)} (with profiles)')
+
+        inserted = load_rows(
+            Reservation, RESERVATION_COLUMNS,
+            generate_reservations([(car[0], car[5]) for car in fleet], user_ids, reservations, rng, today),
+            batch_size, using,
+        )
+        log(f'reservations: {inserted}')
+
+        car_ids = [car[0] for car in fleet]
+        refresh_car_rental_status(car_ids)
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        # Fresh planner statistics for the new rows
+        with connection.cursor() as cursor:
+            for model in (Car, User, UserProfile, Reservation):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    return {'cars': len(fleet), 'users': len(user_ids), 'reservations': inserted}
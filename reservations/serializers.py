@@ -5,11 +5,12 @@ Converts Reservation model to/from JSON format
 
 from rest_framework import serializers
 from .models import Reservation
+from car_rental.serializers import CachedFieldsMixin
 from cars.serializers import CarSerializer
 from django.contrib.auth.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Basic User serializer
     Only show safe fields (no password!)
@@ -20,7 +21,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ("id", "username", "email", "first_name", "last_name")
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class ReservationSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Reservation model
 
@@ -29,12 +30,27 @@ class ReservationSerializer(serializers.ModelSerializer):
         - Nested user details (read-only)
         - Auto-calculated total_amount (read-only)
         - days_count: Custom calculated field
+
+    Sparse output (context, set by ReservationViewSet from the query string):
+        - fields: Set of field names to return (None → all)
+        - expand: Set of nested objects to embed, keys of EXPANDABLE
     """
 
+    # ?expand= name → nested serializer field
+    EXPANDABLE = {
+        "car": "car_details",
+        "user": "user_details",
+    }
+
     car_details = CarSerializer(source="car", read_only=True)
     user_details = UserSerializer(source="user", read_only=True)
     days_count = serializers.SerializerMethodField()
 
+    # Method fields for the values() list path (see ValuesRenderer)
+    values_method_fields = {
+        "days_count": (("start_date", "end_date"), lambda start, end: (end - start).days),
+    }
+
     class Meta:
         model = Reservation
         fields = "__all__"
@@ -48,44 +64,83 @@ class ReservationSerializer(serializers.ModelSerializer):
             "deposit_amount",
             "remaining_amount",
             "paid_at",
+            "payment_deadline",
             "refund_amount",
             "refund_reason",
             "refunded_at",
         )
 
+    # Fields a regular user can see but not set
+    CUSTOMER_READ_ONLY_FIELDS = (
+        "status",
+        "payment_status",
+        "payment_method",
+        "stripe_payment_id",
+        "deposit_amount",
+        "remaining_amount",
+        "paid_at",
+        "refund_amount",
+        "refund_reason",
+        "refunded_at",
+    )
+
     def __init__(self, *args, **kwargs):
         """
-        Customize serializer fields based on user role
+        Fields depend on user role
 
         - Admin: Can see and edit all fields (including user)
-        - Regular user: Cannot see/edit user field
+        - Regular user: Cannot see/edit user field, status and payment/refund
+          fields are read-only
         """
         super().__init__(*args, **kwargs)
 
-        # Get request from context
-        request = self.context.get("request")
+        self._apply_sparse_fields()
 
-        # If user is not admin → Hide user field from form
+    def get_role(self):
+        request = self.context.get("request")
         if request and not request.user.is_staff:
-            # Remove user field from form (user won't see dropdown)
-            self.fields.pop("user", None)
-            # Make status read-only for regular users (show in response, hide in form)
-            if "status" in self.fields:
-                self.fields["status"].read_only = True
-
-            for field in [
-                "payment_status",
-                "payment_method",
-                "stripe_payment_id",
-                "deposit_amount",
-                "remaining_amount",
-                "paid_at",
-                "refund_amount",
-                "refund_reason",
-                "refunded_at",
-            ]:
-                if field in self.fields:
-                    self.fields[field].read_only = True
+            return "customer"
+        return "staff"
+
+    def get_field_names(self, declared_fields, info):
+        field_names = super().get_field_names(declared_fields, info)
+        # Regular user: remove user field (user won't see dropdown)
+        if self.get_role() == "customer":
+            field_names = [name for name in field_names if name != "user"]
+        return field_names
+
+    def get_extra_kwargs(self):
+        extra_kwargs = super().get_extra_kwargs()
+        if self.get_role() == "customer":
+            for field_name in self.CUSTOMER_READ_ONLY_FIELDS:
+                extra_kwargs.setdefault(field_name, {})["read_only"] = True
+        return extra_kwargs
+
+    def get_field_cache_key(self):
+        # Staff and customer field maps are built once each and reused
+        return (type(self), self.get_role())
+
+    def _apply_sparse_fields(self):
+        """
+        Drop nested objects that were not expanded and, if a field list was
+        requested, every field outside it.
+        """
+        expand = self.context.get("expand", set(self.EXPANDABLE))
+        for name, field_name in self.EXPANDABLE.items():
+            if name not in expand:
+                self.fields.pop(field_name, None)
+
+        requested = self.context.get("fields")
+        if requested is None:
+            return
+
+        unknown = requested - set(self.fields) - set(self.EXPANDABLE.values())
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}"}
+            )
+        for field_name in set(self.fields) - requested:
+            self.fields.pop(field_name)
 
     def get_days_count(self, obj):
         """
@@ -95,3 +150,28 @@ class ReservationSerializer(serializers.ModelSerializer):
             int: Number of days
         """
         return obj.get_duration_days()
+
+
+class ReservationBulkItemSerializer(serializers.ModelSerializer):
+    """
+    One item of POST /api/reservations/bulk/
+
+    Field parsing only: car and user are plain ids, resolved and checked for
+    the whole batch by Reservation.clean_batch(). Regular users cannot set
+    user or status (same as ReservationSerializer).
+    """
+
+    user = serializers.IntegerField(source="user_id")
+    car = serializers.IntegerField(source="car_id")
+
+    class Meta:
+        model = Reservation
+        fields = ("user", "car", "start_date", "end_date", "daily_rate", "status")
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request and not request.user.is_staff:
+            fields.pop("user")
+            fields.pop("status")
+        return fields
@@ -3,73 +3,90 @@ Django Signals for Reservation System
 Automatically update car status based on reservation changes
 """
 
-from django.db.models.signals import post_save, pre_delete
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Reservation
+from .models import Reservation, refresh_car_rental_status
+
+
+# Car ids touched in the current transaction, per thread and DB alias
+_pending = threading.local()
+
+
+def _pending_car_ids(using):
+    if not hasattr(_pending, 'car_ids'):
+        _pending.car_ids = defaultdict(set)
+    return _pending.car_ids[using]
+
+
+def _flush_car_status(using):
+    """
+    Recompute is_rented for every car collected so far in one UPDATE.
+    Later callbacks of the same transaction find the set empty and do nothing.
+    """
+    car_ids = _pending_car_ids(using)
+    if not car_ids:
+        return
+    ids = list(car_ids)
+    car_ids.clear()
+    refresh_car_rental_status(ids)
+
+
+def schedule_car_status_refresh(car_id, using='default'):
+    """
+    Queue a car for is_rented recomputation when the current transaction
+    commits (immediately in autocommit mode).
+
+    N reservation saves in one transaction → one car UPDATE.
+    Ids left behind by a rolled back transaction are simply recomputed
+    on the next commit.
+    """
+    _pending_car_ids(using).add(car_id)
+    transaction.on_commit(lambda: _flush_car_status(using), using=using)
 
 
 @receiver(post_save, sender=Reservation)
-def update_car_status_on_save(sender, instance, created, **kwargs):
+def update_car_status_on_save(sender, instance, created, using, **kwargs):
     """
     Update car rental status when reservation is saved
-    
+
     Business Rules:
-    - status in ['pending', 'confirmed', 'active'] → car.is_rented = True
-    - status in ['completed', 'cancelled'] → car.is_rented = False
-    
-    TODO (Week 3 - Celery):
-    ───────────────────────────────────────────────────────────
-    Current: Manual status transitions
-    Future: Auto-cancel pending after 30min timeout (Celery task)
-    
-    This signal will automatically handle:
-    - Auto-cancelled pending → car.is_rented = False ✅
-    ───────────────────────────────────────────────────────────
-    
+    - car.is_rented = True while the car has any reservation in
+      ['pending', 'confirmed', 'active']
+    - otherwise car.is_rented = False
+
+    The car is recomputed from its live reservations on commit, so cancelling
+    one of two bookings keeps the car rented.
+
     Args:
         sender: Reservation model class
         instance: The saved reservation object
         created: Boolean - True if new reservation
+        using: Database alias
         **kwargs: Additional arguments
     """
-    if not instance.car:
-        return
-    
-    if instance.status in ['pending', 'confirmed', 'active']:
-        if not instance.car.is_rented:
-            instance.car.is_rented = True
-            instance.car.save(update_fields=['is_rented'])
-            print(f"🚗 Car {instance.car} is now RENTED (status: {instance.status})")
-
-    elif instance.status in ['completed', 'cancelled']:
-        if instance.car.is_rented:
-            instance.car.is_rented = False
-            instance.car.save(update_fields=['is_rented'])
-            print(f"🚗 Car {instance.car} is now AVAILABLE (status: {instance.status})")
-
-
-@receiver(pre_delete, sender=Reservation)
-def update_car_status_on_delete(sender, instance, **kwargs):
+    if instance.car_id:
+        schedule_car_status_refresh(instance.car_id, using)
+
+
+@receiver(post_delete, sender=Reservation)
+def update_car_status_on_delete(sender, instance, using, **kwargs):
     """
-    Make car available when reservation is deleted
-    
+    Recompute car status when reservation is deleted
+
     Args:
         sender: Reservation model class
-        instance: The reservation being deleted
+        instance: The deleted reservation
+        using: Database alias
         **kwargs: Additional arguments
     """
-    if instance.car and instance.car.is_rented:
-        instance.car.is_rented = False
-        instance.car.save(update_fields=['is_rented'])
-        print(f"🚗 Car {instance.car} is now AVAILABLE (reservation deleted)")       
-        
-        
-        
-        
-        
-        
-        
-        
+    if instance.car_id:
+        schedule_car_status_refresh(instance.car_id, using)
+
+
     #reservations/
     #models.py       → Database tabloları (Car, Reservation)
     #views.py        → Kullanıcı istekleri (HTTP request/response)
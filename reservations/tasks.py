@@ -1,68 +1,198 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
-from .models import Reservation
+from .models import LIVE_STATUSES, Reservation, TaskCheckpoint, refresh_car_rental_status
 
 
-@shared_task
-def activate_todays_reservations():
-    today = timezone.localdate()
-
-    reservations = Reservation.objects.filter(
-        status="confirmed",
-        start_date=today,
-    )
+def _bulk_set_status(new_status, where, params, extra_fields=None):
+    """
+    Move every reservation matching `where` to `new_status` in a single
+    UPDATE ... RETURNING, bypassing per-row save() and signals.
 
-    for reservation in reservations:
-        reservation.status = "active"
-        reservation.save(update_fields=["status"])
+    Returns:
+        list: car_id of each updated reservation (one entry per row)
+    """
+    assignments = ["status = %s", "updated_at = %s"]
+    values = [new_status, timezone.now()]
+    for column, value in (extra_fields or {}).items():
+        assignments.append(f"{column} = %s")
+        values.append(value)
 
-    return reservations.count()
+    sql = (
+        f"UPDATE {Reservation._meta.db_table} "
+        f"SET {', '.join(assignments)} "
+        f"WHERE {where} "
+        f"RETURNING car_id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values + list(params))
+        return [row[0] for row in cursor.fetchall()]
 
 
 @shared_task
-def complete_ended_reservations():
+def activate_todays_reservations():
     today = timezone.localdate()
 
-    reservations = Reservation.objects.filter(
-        status="active",
-        end_date=today,
-    )
-
-    for reservation in reservations:
-        reservation.status = "completed"
-        reservation.save(update_fields=["status"])
+    with transaction.atomic():
+        car_ids = _bulk_set_status(
+            "active",
+            "status = %s AND start_date = %s",
+            ["confirmed", today],
+        )
+        refresh_car_rental_status(car_ids)
 
-    return reservations.count()
+    return len(car_ids)
 
 
 @shared_task
-def cleanup_expired_reservations():
+def complete_ended_reservations():
     today = timezone.localdate()
 
-    # Active and past end_date -> completed
-    active_expired = Reservation.objects.filter(
-        status="active",
-        end_date__lt=today,
-    )
+    with transaction.atomic():
+        car_ids = _bulk_set_status(
+            "completed",
+            "status = %s AND end_date = %s",
+            ["active", today],
+        )
+        refresh_car_rental_status(car_ids)
 
-    for reservation in active_expired:
-        reservation.status = "completed"
-        reservation.save(update_fields=["status"])
+    return len(car_ids)
 
-    # Pending/confirmed and past end_date -> cancelled
-    pending_expired = Reservation.objects.filter(
-        status__in=["pending", "confirmed"],
-        end_date__lt=today,
-    )
 
-    for reservation in pending_expired:
-        reservation.status = "cancelled"
-        reservation.cancellation_date = timezone.now()
-        reservation.cancellation_reason = "Auto-cancelled: end date passed"
-        reservation.save(update_fields=["status", "cancellation_date", "cancellation_reason"])
+PAYMENT_TIMEOUT_REASON = "Payment timeout"
+
 
-    return {
-        "completed": active_expired.count(),
-        "cancelled": pending_expired.count(),
-    }
\ No newline at end of file
+@shared_task
+def cleanup_expired_pending_reservations():
+    """
+    Cancel pending reservations left unpaid past their payment_deadline
+
+    One UPDATE ... RETURNING over res_status_deadline_idx plus one car
+    refresh (none when nothing expired): cheap enough to run every minute.
+
+    Returns:
+        int: Reservations cancelled
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        car_ids = _bulk_set_status(
+            "cancelled",
+            "status = %s AND payment_deadline < %s AND payment_status = %s",
+            ["pending", now, "unpaid"],
+            extra_fields={
+                "cancellation_date": now,
+                "cancellation_reason": PAYMENT_TIMEOUT_REASON,
+            },
+        )
+        refresh_car_rental_status(car_ids)
+
+    return len(car_ids)
+
+
+CLEANUP_CHECKPOINT = "cleanup_expired_reservations"
+CLEANUP_REASON = "Auto-cancelled: end date passed"
+
+
+def _cleanup_chunk(cutoff, after, size):
+    """
+    Close the next `size` overdue live reservations past the keyset
+    position `after` ((end_date, id) or None) in one UPDATE ... RETURNING:
+    active -> completed, pending/confirmed -> cancelled.
+
+    Returns:
+        list: (end_date, id, car_id, new status) of each updated row
+    """
+    table = Reservation._meta.db_table
+    params = {
+        "live": tuple(LIVE_STATUSES),
+        "cutoff": cutoff,
+        "size": size,
+        "now": timezone.now(),
+        "reason": CLEANUP_REASON,
+    }
+    position = ""
+    if after is not None:
+        position = "AND (end_date, id) > (%(after_end)s, %(after_id)s)"
+        params["after_end"], params["after_id"] = after
+
+    sql = (
+        f"WITH chunk AS ("
+        f"  SELECT id FROM {table}"
+        f"  WHERE status IN %(live)s AND end_date < %(cutoff)s {position}"
+        f"  ORDER BY end_date, id LIMIT %(size)s FOR UPDATE"
+        f") "
+        f"UPDATE {table} AS reservation SET "
+        f"  status = CASE WHEN reservation.status = 'active' THEN 'completed' ELSE 'cancelled' END, "
+        f"  updated_at = %(now)s, "
+        f"  cancellation_date = CASE WHEN reservation.status = 'active' "
+        f"    THEN reservation.cancellation_date ELSE %(now)s END, "
+        f"  cancellation_reason = CASE WHEN reservation.status = 'active' "
+        f"    THEN reservation.cancellation_reason ELSE %(reason)s END "
+        f"FROM chunk WHERE reservation.id = chunk.id "
+        f"RETURNING reservation.end_date, reservation.id, reservation.car_id, reservation.status"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+@shared_task(bind=True)
+def cleanup_expired_reservations(self, chunk_size=None):
+    """
+    Close every live reservation whose end_date has passed, in chunks
+
+    Walks the overdue rows in (end_date, id) order (res_live_end_id_idx),
+    one transaction per chunk of CLEANUP_CHUNK_SIZE rows: the chunk's
+    updates, its cars' is_rented refresh and the keyset position in the
+    TaskCheckpoint row commit together. A killed worker loses at most the
+    chunk in flight and the next run resumes after the last committed one
+    (rather than rescanning index entries of rows already closed). The
+    checkpoint is dropped once the backlog is empty; a backlog that fits
+    in one chunk never writes one.
+
+    Reports PROGRESS ({completed, cancelled}) through the task state
+    after each chunk when run by a worker.
+
+    Returns:
+        dict: Rows completed and cancelled by this run (including the
+        chunks of an interrupted earlier attempt it resumed)
+    """
+    size = chunk_size or getattr(settings, "CLEANUP_CHUNK_SIZE", 1000)
+    cutoff = timezone.localdate().isoformat()
+
+    while True:
+        with transaction.atomic():
+            checkpoint = (
+                TaskCheckpoint.objects.select_for_update().filter(name=CLEANUP_CHECKPOINT).first()
+            )
+            state = checkpoint.state if checkpoint is not None else {}
+            if state.get("cutoff") != cutoff:
+                # First run today (or the backlog of another day): start over
+                state = {"cutoff": cutoff, "after": None, "completed": 0, "cancelled": 0}
+
+            rows = _cleanup_chunk(cutoff, state["after"], size)
+            refresh_car_rental_status([row[2] for row in rows])
+
+            for _, _, _, new_status in rows:
+                state[new_status] += 1
+            progress = {"completed": state["completed"], "cancelled": state["cancelled"]}
+
+            if len(rows) < size:
+                if checkpoint is not None:
+                    checkpoint.delete()
+            else:
+                last_end, last_id = max((end_date, row_id) for end_date, row_id, _, _ in rows)
+                state["after"] = [last_end.isoformat(), last_id]
+                if checkpoint is None:
+                    TaskCheckpoint.objects.create(name=CLEANUP_CHECKPOINT, state=state)
+                else:
+                    checkpoint.state = state
+                    checkpoint.save(update_fields=["state", "updated_at"])
+
+        if len(rows) < size:
+            return progress
+        if not self.request.called_directly:
+            self.update_state(state="PROGRESS", meta=progress)
@@ -1,13 +1,48 @@
-from datetime import timedelta
+import base64
+import csv
+import io
+import json
+import random
+import re
+import tempfile
+import threading
+from datetime import date, timedelta
 from decimal import Decimal
+from unittest import mock
+
+import numpy as np
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed, ValidationError
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Exists, OuterRef
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers as drf_serializers
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from django.utils import timezone
 
-from cars.models import Car
+from car_rental.metrics import MetricsMiddleware, registry as metrics_registry
+from car_rental.pagination import KeysetCursorPagination
+from car_rental.serializers import ValuesRenderer, clear_field_cache
+from cars.models import Car, RateRule
 from users.models import UserProfile
-from .models import Reservation
+from .management.commands.bench import find_regressions
+from .management.commands.bench_serializers import build_reservations, make_context
+from .serializers import ReservationSerializer
+from .models import LIVE_STATUSES, Reservation, TaskCheckpoint
+from .occupancy import car_metrics, encode_bitmap, encode_runs, occupancy_matrix
+from .seeding import generate_reservations, seed_dataset
+from .tasks import (
+    activate_todays_reservations,
+    cleanup_expired_pending_reservations,
+    cleanup_expired_reservations,
+    complete_ended_reservations,
+)
 
 
 class ReservationModelTests(TestCase):
@@ -60,6 +95,39 @@ class ReservationModelTests(TestCase):
         reservation = self._create_reservation(duration_days=3)
         self.assertEqual(reservation.get_total_amount(), Decimal("300.00"))
 
+    def test_save_prices_from_rate_calendar(self):
+        cache.clear()
+        start_date = timezone.localdate() + timedelta(days=3)
+        RateRule.objects.create(
+            name="Opening day", start_date=start_date, end_date=start_date, rate=Decimal("160.00")
+        )
+        reservation = Reservation.objects.create(
+            user=self.user, car=self.car,
+            start_date=start_date, end_date=start_date + timedelta(days=2),
+        )
+        self.assertEqual(reservation.total_amount, Decimal("260.00"))
+        self.assertEqual(reservation.daily_rate, Decimal("130.00"))
+
+        # An agreed flat rate is kept
+        flat = self._create_reservation(start_days=10, duration_days=2)
+        self.assertEqual(flat.total_amount, Decimal("200.00"))
+
+    @override_settings(PAYMENT_WINDOW_MINUTES=15)
+    def test_payment_deadline_set_for_new_pending(self):
+        before = timezone.now()
+        pending = self._create_reservation(status="pending")
+        confirmed = self._create_reservation(start_days=10, status="confirmed")
+
+        self.assertGreaterEqual(pending.payment_deadline, before + timedelta(minutes=15))
+        self.assertLessEqual(pending.payment_deadline, timezone.now() + timedelta(minutes=15))
+        self.assertIsNone(confirmed.payment_deadline)
+
+        # Not moved by later saves
+        deadline = pending.payment_deadline
+        pending.save()
+        pending.refresh_from_db()
+        self.assertEqual(pending.payment_deadline, deadline)
+
     def test_can_be_cancelled_status(self):
         pending = self._create_reservation(start_days=3, status="pending")
         confirmed = self._create_reservation(start_days=6, status="confirmed")
@@ -105,3 +173,1537 @@ class ReservationModelTests(TestCase):
         reservation.save(update_fields=["total_amount"])
 
         self.assertIsNone(reservation.get_refund_amount())
+
+
+class ReservationOverlapConstraintTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="racer", password="pass1234")
+        UserProfile.objects.create(
+            user=self.user,
+            phone="5550003333",
+            address="Main St 3",
+            city="Istanbul",
+            state="TR",
+            zip_code="34000",
+            license_number="LIC-789",
+            date_of_birth="1990-01-01",
+            is_verified=True,
+            is_active=True,
+        )
+        self.car = Car.objects.create(
+            brand="Toyota",
+            model="Corolla",
+            year=2020,
+            color="White",
+            daily_rate=Decimal("100.00"),
+        )
+        self.start = (timezone.now() + timedelta(days=5)).date()
+
+    def _create(self, start, end, status="pending"):
+        return Reservation.objects.create(
+            user=self.user,
+            car=self.car,
+            start_date=start,
+            end_date=end,
+            daily_rate=Decimal("100.00"),
+            status=status,
+        )
+
+    def test_overlap_rejected(self):
+        self._create(self.start, self.start + timedelta(days=3))
+        with self.assertRaisesMessage(ValidationError, "already reserved"):
+            self._create(self.start + timedelta(days=3), self.start + timedelta(days=5))
+
+    def test_cancelled_reservation_does_not_block(self):
+        self._create(self.start, self.start + timedelta(days=3), status="cancelled")
+        self._create(self.start, self.start + timedelta(days=3))
+
+    def test_concurrent_creates_only_one_succeeds(self):
+        # Both threads pass check_date_conflict before either inserts,
+        # so only the database constraint can stop the double booking.
+        barrier = threading.Barrier(2, timeout=10)
+        original_check = Reservation.check_date_conflict
+        local = threading.local()
+        results = []
+
+        def racing_check(reservation):
+            original_check(reservation)
+            # Only the pre-insert check waits; the loser re-checks after the
+            # constraint error to build its message.
+            if not getattr(local, "waited", False):
+                local.waited = True
+                barrier.wait()
+
+        def book(offset):
+            try:
+                self._create(
+                    self.start + timedelta(days=offset),
+                    self.start + timedelta(days=offset + 3),
+                )
+                results.append("created")
+            except ValidationError as exc:
+                results.append(" ".join(exc.messages))
+            finally:
+                connection.close()
+
+        with mock.patch.object(Reservation, "check_date_conflict", racing_check):
+            threads = [threading.Thread(target=book, args=(offset,)) for offset in (0, 1)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results.count("created"), 1)
+        self.assertEqual(len(results), 2)
+        self.assertIn("already reserved", [r for r in results if r != "created"][0])
+        self.assertEqual(Reservation.objects.filter(car=self.car).count(), 1)
+
+
+class ReservationQueryPlanTests(TestCase):
+    """
+    EXPLAIN the hot-path queries on a seeded table and check they hit the
+    intended indexes. Sequential scans are disabled for the transaction, so a
+    missing or unusable index shows up as a Seq Scan in the plan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(username=f"planner{i}", password="pass1234")
+            for i in range(20)
+        ]
+        cls.user = users[0]
+        cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for i in range(40)
+        ])
+        statuses = ["completed", "completed", "cancelled", "completed", "pending", "confirmed"]
+        base = timezone.localdate() - timedelta(days=200)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=users[(c + i) % len(users)],
+                car=car,
+                start_date=base + timedelta(days=i * 4),
+                end_date=base + timedelta(days=i * 4 + 3),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("300.00"),
+                status=statuses[i % len(statuses)],
+            )
+            for c, car in enumerate(cars)
+            for i in range(75)
+        ])
+        cls.car = cars[0]
+        with connection.cursor() as cursor:
+            # Distinct creation times, as in production (bulk_create stamps
+            # most rows with the same microsecond)
+            cursor.execute(
+                "UPDATE reservations_reservation SET created_at = now() - id * interval '1 minute'"
+            )
+            cursor.execute("ANALYZE reservations_reservation")
+            cursor.execute("ANALYZE cars_car")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan on reservations_reservation", plan)
+        self.assertIn("Index", plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_activate_todays_reservations_plan(self):
+        queryset = Reservation.objects.filter(status="confirmed", start_date=timezone.localdate())
+        self.assertUsesIndex(queryset, "res_status_start_idx")
+
+    def test_complete_and_cleanup_plans(self):
+        today = timezone.localdate()
+        self.assertUsesIndex(
+            Reservation.objects.filter(status="active", end_date=today), "res_status_end_idx"
+        )
+        self.assertUsesIndex(
+            Reservation.objects.filter(status__in=["pending", "confirmed"], end_date__lt=today),
+            "res_status_end_idx",
+        )
+
+    def test_user_reservation_list_plan(self):
+        queryset = Reservation.objects.filter(user=self.user).order_by("-created_at", "id")[:21]
+        self.assertUsesIndex(queryset, "res_user_created_id_idx")
+
+    def test_staff_reservation_list_plan(self):
+        queryset = Reservation.objects.order_by("-created_at", "id")[:21]
+        self.assertUsesIndex(queryset, "res_created_id_idx")
+
+    def test_deep_cursor_plan(self):
+        # The index scan starts at the cursor: rows before it are not read
+        # and discarded by the filter
+        ordered = Reservation.objects.order_by("-created_at", "id")
+        paginator = KeysetCursorPagination()
+        paginator.base_url = "http://testserver/api/reservations/"
+        for reverse, row in ((False, ordered[2500]), (True, ordered[200])):
+            cursor = Cursor(offset=0, reverse=reverse, position=paginator._get_position(row))
+            request = Request(APIRequestFactory().get(paginator.encode_cursor(cursor)))
+            queryset = paginator._page_queryset(Reservation.objects.all(), request)
+            plan = queryset.explain(analyze=True)
+            self.assertIn("res_created_id_idx", plan)
+            # At most the cursor row itself (created_at ties fall on it)
+            removed = re.findall(r"Rows Removed by Filter: (\d+)", plan)
+            self.assertLessEqual(sum(map(int, removed)), 1)
+            self.assertEqual(len(list(queryset)), paginator.page_size + 1)
+
+    def test_availability_plan(self):
+        start = timezone.localdate()
+        overlapping = Reservation.objects.filter(
+            car=OuterRef("pk"),
+            status__in=LIVE_STATUSES,
+            start_date__lte=start + timedelta(days=3),
+            end_date__gte=start,
+        )
+        self.assertUsesIndex(Car.objects.filter(~Exists(overlapping)), "res_live_car_dates_idx")
+
+    def test_date_conflict_plan(self):
+        # A car with a long live history: too many rows of its own to filter
+        # one by one, the check has to probe the date ranges
+        busy_car = Car.objects.create(
+            brand="Brand", model="Busy", year=2020, color="White", daily_rate=Decimal("100.00")
+        )
+        base = timezone.localdate() - timedelta(days=200)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=self.user,
+                car=busy_car,
+                start_date=base + timedelta(days=i * 2),
+                end_date=base + timedelta(days=i * 2),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("100.00"),
+                status="confirmed",
+            )
+            for i in range(300)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE reservations_reservation")
+
+        reservation = Reservation(
+            car=busy_car,
+            start_date=timezone.localdate(),
+            end_date=timezone.localdate() + timedelta(days=3),
+        )
+        self.assertUsesIndex(reservation.get_conflicting_reservations(), "reservation_no_overlap")
+
+
+class ReservationTaskTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="worker", password="pass1234")
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"), is_rented=True,
+        )
+        self.other_car = Car.objects.create(
+            brand="Honda", model="Civic", year=2021, color="Black",
+            daily_rate=Decimal("120.00"), is_rented=True,
+        )
+        self.today = timezone.localdate()
+
+    def _bulk(self, car, start_offset, end_offset, status):
+        # bulk_create skips clean(), so past dates can be seeded
+        return Reservation.objects.bulk_create([
+            Reservation(
+                user=self.user,
+                car=car,
+                start_date=self.today + timedelta(days=start_offset),
+                end_date=self.today + timedelta(days=end_offset),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("100.00") * (end_offset - start_offset),
+                status=status,
+            )
+        ])[0]
+
+    def test_activate_todays_reservations(self):
+        todays = self._bulk(self.car, 0, 2, "confirmed")
+        later = self._bulk(self.other_car, 3, 5, "confirmed")
+
+        # savepoint + UPDATE ... RETURNING + car refresh + release
+        with self.assertNumQueries(4):
+            self.assertEqual(activate_todays_reservations(), 1)
+
+        todays.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual(todays.status, "active")
+        self.assertEqual(later.status, "confirmed")
+        self.car.refresh_from_db()
+        self.assertTrue(self.car.is_rented)
+
+    def test_complete_ended_reservations(self):
+        ending = self._bulk(self.car, -2, 0, "active")
+        upcoming = self._bulk(self.car, 2, 4, "confirmed")
+        self._bulk(self.other_car, -3, 0, "active")
+
+        self.assertEqual(complete_ended_reservations(), 2)
+
+        ending.refresh_from_db()
+        self.assertEqual(ending.status, "completed")
+        # Car stays rented while another live reservation exists
+        self.car.refresh_from_db()
+        self.other_car.refresh_from_db()
+        self.assertTrue(self.car.is_rented)
+        self.assertFalse(self.other_car.is_rented)
+        upcoming.refresh_from_db()
+        self.assertEqual(upcoming.status, "confirmed")
+
+    def test_cleanup_expired_reservations_counts(self):
+        self._bulk(self.car, -10, -8, "active")
+        self._bulk(self.car, -7, -5, "active")
+        self._bulk(self.other_car, -10, -8, "pending")
+        self._bulk(self.other_car, -7, -5, "confirmed")
+        self._bulk(self.other_car, -4, -2, "completed")
+
+        # savepoint + two UPDATE ... RETURNING + one car refresh + release
+        with self.assertNumQueries(5):
+            result = cleanup_expired_reservations()
+
+        self.assertEqual(result, {"completed": 2, "cancelled": 2})
+        cancelled = Reservation.objects.filter(status="cancelled")
+        self.assertEqual(cancelled.count(), 2)
+        for reservation in cancelled:
+            self.assertEqual(reservation.cancellation_reason, "Auto-cancelled: end date passed")
+            self.assertIsNotNone(reservation.cancellation_date)
+        self.car.refresh_from_db()
+        self.other_car.refresh_from_db()
+        self.assertFalse(self.car.is_rented)
+        self.assertFalse(self.other_car.is_rented)
+
+        # Second run has nothing left to do
+        self.assertEqual(cleanup_expired_reservations(), {"completed": 0, "cancelled": 0})
+
+    def test_cleanup_expired_pending_reservations(self):
+        now = timezone.now()
+        expired = self._bulk(self.car, 3, 5, "pending")
+        waiting = self._bulk(self.car, 7, 9, "pending")
+        paid = self._bulk(self.other_car, 3, 5, "pending")
+        confirmed = self._bulk(self.other_car, 7, 9, "confirmed")
+        Reservation.objects.filter(pk__in=[expired.pk, paid.pk, confirmed.pk]).update(
+            payment_deadline=now - timedelta(minutes=1)
+        )
+        Reservation.objects.filter(pk=waiting.pk).update(payment_deadline=now + timedelta(minutes=10))
+        Reservation.objects.filter(pk=paid.pk).update(payment_status="paid")
+
+        # savepoint + UPDATE ... RETURNING + car refresh + release
+        with self.assertNumQueries(4):
+            self.assertEqual(cleanup_expired_pending_reservations(), 1)
+
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, "cancelled")
+        self.assertEqual(expired.cancellation_reason, "Payment timeout")
+        self.assertIsNotNone(expired.cancellation_date)
+        for reservation, status in ((waiting, "pending"), (paid, "pending"), (confirmed, "confirmed")):
+            reservation.refresh_from_db()
+            self.assertEqual(reservation.status, status)
+        # Still rented: waiting is live
+        self.car.refresh_from_db()
+        self.assertTrue(self.car.is_rented)
+
+        Reservation.objects.filter(pk=waiting.pk).update(payment_deadline=now - timedelta(minutes=1))
+        self.assertEqual(cleanup_expired_pending_reservations(), 1)
+        self.car.refresh_from_db()
+        self.assertFalse(self.car.is_rented)
+
+        # Nothing expired: the UPDATE only
+        with self.assertNumQueries(3):
+            self.assertEqual(cleanup_expired_pending_reservations(), 0)
+
+    def _overdue_backlog(self):
+        self._bulk(self.car, -20, -18, "active")
+        self._bulk(self.car, -16, -14, "confirmed")
+        self._bulk(self.car, -12, -10, "active")
+        self._bulk(self.other_car, -20, -18, "pending")
+        self._bulk(self.other_car, -9, -7, "active")
+
+    def test_cleanup_in_chunks(self):
+        self._overdue_backlog()
+
+        result = cleanup_expired_reservations(chunk_size=2)
+
+        self.assertEqual(result, {"completed": 3, "cancelled": 2})
+        self.assertFalse(Reservation.objects.filter(status__in=LIVE_STATUSES).exists())
+        self.assertFalse(TaskCheckpoint.objects.exists())
+        self.car.refresh_from_db()
+        self.assertFalse(self.car.is_rented)
+
+    def test_cleanup_resumes_after_interrupted_run(self):
+        self._overdue_backlog()
+
+        with mock.patch(
+            "reservations.tasks.refresh_car_rental_status", side_effect=[0, RuntimeError("killed")]
+        ):
+            with self.assertRaises(RuntimeError):
+                cleanup_expired_reservations(chunk_size=2)
+
+        # First chunk (the two oldest by end_date) committed, second rolled back
+        self.assertEqual(Reservation.objects.filter(status__in=LIVE_STATUSES).count(), 3)
+        checkpoint = TaskCheckpoint.objects.get(name="cleanup_expired_reservations")
+        self.assertEqual(checkpoint.state["completed"] + checkpoint.state["cancelled"], 2)
+
+        # Resumes after the checkpoint and reports the whole backlog
+        self.assertEqual(cleanup_expired_reservations(chunk_size=2), {"completed": 3, "cancelled": 2})
+        self.assertFalse(TaskCheckpoint.objects.exists())
+
+    def test_cleanup_reports_progress(self):
+        self._overdue_backlog()
+
+        with mock.patch.object(cleanup_expired_reservations, "update_state") as update_state:
+            result = cleanup_expired_reservations.apply(kwargs={"chunk_size": 2}).get()
+
+        self.assertEqual(result, {"completed": 3, "cancelled": 2})
+        self.assertEqual(update_state.call_count, 2)
+        update_state.assert_called_with(state="PROGRESS", meta={"completed": 2, "cancelled": 2})
+
+
+class CarStatusSignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="signals", password="pass1234")
+        UserProfile.objects.create(
+            user=self.user,
+            phone="5550004444",
+            address="Main St 4",
+            city="Istanbul",
+            state="TR",
+            zip_code="34000",
+            license_number="LIC-321",
+            date_of_birth="1990-01-01",
+            is_verified=True,
+            is_active=True,
+        )
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"),
+        )
+        self.start = timezone.localdate() + timedelta(days=5)
+
+    def _create(self, start_offset, status="confirmed"):
+        return Reservation.objects.create(
+            user=self.user,
+            car=self.car,
+            start_date=self.start + timedelta(days=start_offset),
+            end_date=self.start + timedelta(days=start_offset + 2),
+            daily_rate=Decimal("100.00"),
+            status=status,
+        )
+
+    def _car_updates(self, queries):
+        return [q for q in queries if q["sql"].startswith('UPDATE "cars_car"')]
+
+    def test_car_rented_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create(0)
+        self.car.refresh_from_db()
+        self.assertTrue(self.car.is_rented)
+
+    def test_cancelling_one_of_two_keeps_car_rented(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._create(0)
+            self._create(10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status = "cancelled"
+            first.save()
+        self.car.refresh_from_db()
+        self.assertTrue(self.car.is_rented)
+
+    def test_delete_last_reservation_frees_car(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = self._create(0)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.delete()
+        self.car.refresh_from_db()
+        self.assertFalse(self.car.is_rented)
+
+    def test_many_saves_in_one_transaction_update_car_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for offset in (0, 5, 10, 15):
+                        self._create(offset)
+        self.assertEqual(len(self._car_updates(queries.captured_queries)), 1)
+        self.car.refresh_from_db()
+        self.assertTrue(self.car.is_rented)
+
+
+class ReservationAPIQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        cls.customer = User.objects.create_user(username="customer", password="pass1234")
+        cls.other = User.objects.create_user(username="other", password="pass1234")
+        cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for i in range(10)
+        ])
+        start = timezone.localdate() + timedelta(days=5)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.customer if i % 2 else cls.other,
+                car=car,
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("200.00"),
+                status="cancelled" if i % 3 == 0 else "confirmed",
+                cancelled_by=cls.staff if i % 3 == 0 else None,
+            )
+            for i, car in enumerate(cars)
+        ])
+        cls.own_reservation = Reservation.objects.filter(user=cls.customer).first()
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_list_query_count_staff(self):
+        client = self._client(self.staff)
+        # Page only: the ETag is built from its rows
+        with self.assertNumQueries(1):
+            response = client.get("/api/reservations/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_list_query_count_customer(self):
+        client = self._client(self.customer)
+        # Page only: the ETag is built from its rows
+        with self.assertNumQueries(1):
+            response = client.get("/api/reservations/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_retrieve_query_count_staff(self):
+        client = self._client(self.staff)
+        with self.assertNumQueries(1):
+            response = client.get(f"/api/reservations/{self.own_reservation.pk}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_query_count_customer(self):
+        client = self._client(self.customer)
+        with self.assertNumQueries(1):
+            response = client.get(f"/api/reservations/{self.own_reservation.pk}/")
+        self.assertEqual(response.status_code, 200)
+
+
+class ReservationPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="pager", password="pass1234", is_staff=True)
+        cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for i in range(25)
+        ])
+        start = timezone.localdate() + timedelta(days=5)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.staff,
+                car=car,
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("200.00"),
+            )
+            for car in cars
+        ])
+        # Ties on created_at must not duplicate or drop rows between pages
+        same_time = timezone.now()
+        Reservation.objects.filter(pk__in=list(
+            Reservation.objects.values_list("pk", flat=True)[:10]
+        )).update(created_at=same_time)
+        cls.expected_ids = list(
+            Reservation.objects.order_by("-created_at", "id").values_list("id", flat=True)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_walk_pages_forward_and_back(self):
+        seen = []
+        pages = []
+        url = "/api/reservations/?page_size=7"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, self.expected_ids)
+        self.assertIsNone(pages[0]["previous"])
+
+        # Previous link of the last page returns the page before it
+        response = self.client.get(pages[-1]["previous"])
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [item["id"] for item in pages[-2]["results"]],
+        )
+
+    def test_page_size_is_capped(self):
+        response = self.client.get("/api/reservations/?page_size=100000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 25)
+
+        response = self.client.get("/api/reservations/")
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_deep_page_query_has_no_offset(self):
+        first = self.client.get("/api/reservations/?page_size=5")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+        page_queries = [q["sql"] for q in queries.captured_queries if "LIMIT" in q["sql"]]
+        self.assertEqual(len(page_queries), 1)
+        self.assertNotIn("OFFSET", page_queries[0])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/reservations/?cursor=garbage")
+        self.assertEqual(response.status_code, 404)
+
+
+class ReservationConditionalGetTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username="poller", password="pass1234")
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White",
+            daily_rate=Decimal("100.00"),
+        )
+        start = timezone.localdate() + timedelta(days=5)
+        self.reservation = Reservation.objects.bulk_create([
+            Reservation(
+                user=self.customer,
+                car=self.car,
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("200.00"),
+                status="confirmed",
+            )
+        ])[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.url = f"/api/reservations/{self.reservation.pk}/"
+
+    def test_retrieve_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+
+        with mock.patch("reservations.views.ReservationViewSet.get_serializer") as get_serializer:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        get_serializer.assert_not_called()
+
+    def test_retrieve_modified_after_change(self):
+        etag = self.client.get(self.url)["ETag"]
+        Reservation.objects.filter(pk=self.reservation.pk).update(
+            cancellation_reason="changed", updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_car_change_invalidates_reservation_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.car.daily_rate = Decimal("110.00")
+        self.car.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_not_modified(self):
+        etag = self.client.get("/api/reservations/")["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/reservations/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        start = timezone.localdate() + timedelta(days=20)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=self.customer, car=self.car, start_date=start,
+                end_date=start + timedelta(days=1), daily_rate=Decimal("100.00"),
+            )
+        ])
+        response = self.client.get("/api/reservations/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_sends_etag_only(self):
+        response = self.client.get("/api/reservations/")
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        # A page can change without any timestamp moving forward
+        response = self.client.get(
+            "/api/reservations/", HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_on_delete(self):
+        start = timezone.localdate() + timedelta(days=20)
+        older = Reservation.objects.bulk_create([
+            Reservation(
+                user=self.customer, car=self.car, start_date=start,
+                end_date=start + timedelta(days=1), daily_rate=Decimal("100.00"),
+            )
+        ])[0]
+        Reservation.objects.filter(pk=older.pk).update(
+            created_at=self.reservation.created_at - timedelta(days=1)
+        )
+        etag = self.client.get("/api/reservations/")["ETag"]
+
+        # No timestamp moves forward, the page still changes
+        older.delete()
+        response = self.client.get("/api/reservations/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.reservation.pk])
+
+    def test_list_etag_follows_expanded_car(self):
+        etag = self.client.get("/api/reservations/?expand=car")["ETag"]
+        Car.objects.filter(pk=self.car.pk).update(
+            daily_rate=Decimal("110.00"), updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.get("/api/reservations/?expand=car", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_per_user(self):
+        etag = self.client.get(self.url)["ETag"]
+        staff = User.objects.create_user(username="boss", password="pass1234", is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ReservationSparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(username="calendar", password="pass1234")
+        cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for i in range(3)
+        ])
+        start = timezone.localdate() + timedelta(days=5)
+        cls.reservations = Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.customer,
+                car=car,
+                start_date=start,
+                end_date=start + timedelta(days=2),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("200.00"),
+                status="confirmed",
+            )
+            for car in cars
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def _page_sql(self, queries):
+        return [q["sql"] for q in queries.captured_queries if "LIMIT" in q["sql"]][0]
+
+    def test_default_output_embeds_car_and_user(self):
+        response = self.client.get("/api/reservations/")
+        row = response.data["results"][0]
+        self.assertIn("car_details", row)
+        self.assertIn("user_details", row)
+
+    def test_fields_only_returns_requested_fields_without_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/reservations/?fields=id,start_date,end_date,days_count")
+        self.assertEqual(response.status_code, 200)
+        for row in response.data["results"]:
+            self.assertEqual(set(row), {"id", "start_date", "end_date", "days_count"})
+            self.assertEqual(row["days_count"], 2)
+        page_sql = self._page_sql(queries)
+        self.assertNotIn("cars_car", page_sql)
+        self.assertNotIn("auth_user", page_sql)
+        self.assertNotIn("cancellation_reason", page_sql)
+        # Page only (ETag from its rows), no per-row lazy loads
+        self.assertEqual(len(queries), 1)
+
+    def test_expand_car_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/reservations/?expand=car")
+        row = response.data["results"][0]
+        self.assertIn("car_details", row)
+        self.assertNotIn("user_details", row)
+        self.assertEqual(row["car_details"]["brand"], "Brand")
+        page_sql = self._page_sql(queries)
+        self.assertIn("cars_car", page_sql)
+        self.assertNotIn("auth_user", page_sql)
+
+    def test_empty_expand_drops_nested_objects(self):
+        response = self.client.get(f"/api/reservations/{self.reservations[0].pk}/?expand=")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("car_details", response.data)
+        self.assertNotIn("user_details", response.data)
+        self.assertEqual(response.data["car"], self.reservations[0].car_id)
+
+    def test_fields_and_expand_combined(self):
+        response = self.client.get("/api/reservations/?fields=id,car_details&expand=car,user")
+        row = response.data["results"][0]
+        self.assertEqual(set(row), {"id", "car_details"})
+
+    def test_unknown_names_rejected(self):
+        self.assertEqual(self.client.get("/api/reservations/?fields=id,nope").status_code, 400)
+        self.assertEqual(self.client.get("/api/reservations/?expand=driver").status_code, 400)
+
+
+class ReservationSerializerFieldCacheTests(TestCase):
+    def setUp(self):
+        clear_field_cache()
+        self.reservations = build_reservations(20)
+
+    def test_role_field_maps(self):
+        customer = ReservationSerializer(context=make_context(is_staff=False))
+        staff = ReservationSerializer(context=make_context(is_staff=True))
+
+        self.assertNotIn("user", customer.fields)
+        self.assertIn("user", staff.fields)
+        for field_name in ReservationSerializer.CUSTOMER_READ_ONLY_FIELDS:
+            self.assertTrue(customer.fields[field_name].read_only, field_name)
+        self.assertFalse(staff.fields["status"].read_only)
+        self.assertFalse(staff.fields["payment_status"].read_only)
+
+    def test_field_map_built_once_per_role(self):
+        with mock.patch.object(
+            drf_serializers.ModelSerializer, "get_fields",
+            autospec=True, side_effect=drf_serializers.ModelSerializer.get_fields,
+        ) as get_fields:
+            for is_staff in (False, True, False, True):
+                ReservationSerializer(self.reservations, many=True,
+                                      context=make_context(is_staff)).data
+        # Reservation (x2 roles) + nested Car + nested User
+        self.assertEqual(get_fields.call_count, 4)
+
+    def test_cached_output_matches_fresh_build(self):
+        for is_staff in (False, True):
+            context = make_context(is_staff)
+            clear_field_cache()
+            fresh = ReservationSerializer(self.reservations[0], context=context).data
+            cached = ReservationSerializer(self.reservations[0], context=context).data
+            self.assertEqual(cached, fresh)
+
+    def test_instances_do_not_share_bound_fields(self):
+        first = ReservationSerializer(context=make_context(is_staff=True))
+        second = ReservationSerializer(context=make_context(is_staff=True))
+        self.assertIsNot(first.fields["start_date"], second.fields["start_date"])
+        self.assertIs(first.fields["start_date"].parent, first)
+        self.assertIs(second.fields["car_details"].root, second)
+
+    def test_bench_command_runs(self):
+        call_command("bench_serializers", rows=5, stdout=mock.Mock())
+
+
+class ReservationValuesListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="values_staff", password="pass1234", is_staff=True)
+        cls.customer = User.objects.create_user(username="values_customer", password="pass1234")
+        cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("99.90"), image="cars/car.jpg" if i % 2 else "")
+            for i in range(4)
+        ])
+        start = timezone.localdate() + timedelta(days=5)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.customer if i % 2 else cls.staff,
+                car=car,
+                start_date=start,
+                end_date=start + timedelta(days=i + 1),
+                daily_rate=Decimal("99.90"),
+                total_amount=Decimal("99.90") * (i + 1),
+                status="cancelled" if i == 0 else "confirmed",
+                cancelled_by=cls.staff if i == 0 else None,
+                cancellation_date=timezone.now() if i == 0 else None,
+                deposit_amount=Decimal("10.00") if i == 1 else None,
+            )
+            for i, car in enumerate(cars)
+        ])
+
+    def _content(self, user, url, values_rendering):
+        client = APIClient()
+        client.force_authenticate(user)
+        with override_settings(VALUES_LIST_RENDERING=values_rendering):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_values_rendering_matches_serializer(self):
+        urls = [
+            "/api/reservations/",
+            "/api/reservations/?expand=",
+            "/api/reservations/?expand=car&page_size=2",
+            "/api/reservations/?fields=id,days_count,car_details,cancelled_by",
+        ]
+        for user in (self.staff, self.customer):
+            for url in urls:
+                with self.subTest(user=user.username, url=url):
+                    self.assertEqual(
+                        self._content(user, url, True),
+                        self._content(user, url, False),
+                    )
+
+    def test_serializer_compiles_for_both_roles(self):
+        for is_staff in (False, True):
+            serializer = ReservationSerializer(context=make_context(is_staff))
+            renderer = ValuesRenderer.compile(serializer, ("id", "created_at"))
+            self.assertIsNotNone(renderer)
+            self.assertIn("car__in_fleet", renderer.columns)
+
+    def test_unknown_method_field_falls_back(self):
+        class ExtraSerializer(ReservationSerializer):
+            extra = drf_serializers.SerializerMethodField()
+
+            def get_extra(self, obj):
+                return None
+
+        self.assertIsNone(ValuesRenderer.compile(ExtraSerializer(context=make_context(True))))
+
+
+class ReservationBulkCreateTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="bulk_staff", password="pass1234", is_staff=True)
+        self.customer = User.objects.create_user(username="bulk_customer", password="pass1234")
+        self.no_profile = User.objects.create_user(username="bulk_no_profile", password="pass1234")
+        for index, user in enumerate((self.staff, self.customer)):
+            UserProfile.objects.create(
+                user=user,
+                phone=f"555000700{index}",
+                address="Main St 7",
+                city="Istanbul",
+                state="TR",
+                zip_code="34000",
+                license_number=f"LIC-70{index}",
+                date_of_birth="1990-01-01",
+                is_verified=True,
+                is_active=True,
+            )
+        self.cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for i in range(6)
+        ])
+        self.start = timezone.localdate() + timedelta(days=5)
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def _item(self, car, offset=0, days=2, **extra):
+        item = {
+            "user": self.customer.pk,
+            "car": car.pk,
+            "start_date": str(self.start + timedelta(days=offset)),
+            "end_date": str(self.start + timedelta(days=offset + days)),
+            "daily_rate": "100.00",
+        }
+        item.update(extra)
+        return item
+
+    def test_staff_creates_batch(self):
+        items = [self._item(self.cars[0]), self._item(self.cars[0], offset=5), self._item(self.cars[1])]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._client(self.staff).post("/api/reservations/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]["total_amount"], "200.00")
+        self.assertEqual(Reservation.objects.count(), 3)
+        self.assertTrue(Car.objects.get(pk=self.cars[0].pk).is_rented)
+        self.assertFalse(Car.objects.get(pk=self.cars[2].pk).is_rented)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        client = self._client(self.staff)
+        counts = []
+        for cars in (self.cars[:2], self.cars[2:]):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(
+                    "/api/reservations/bulk/", [self._item(car) for car in cars], format="json"
+                )
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_overlap_inside_batch(self):
+        items = [self._item(self.cars[0]), self._item(self.cars[0], offset=2)]
+        response = self._client(self.staff).post("/api/reservations/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("item 0", response.data[1]["non_field_errors"][0])
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_per_item_errors(self):
+        Reservation.objects.create(
+            user=self.customer, car=self.cars[1],
+            start_date=self.start, end_date=self.start + timedelta(days=3),
+            daily_rate=Decimal("100.00"), status="confirmed",
+        )
+        items = [
+            self._item(self.cars[0]),
+            self._item(self.cars[1], offset=1),
+            self._item(self.cars[2], user=self.no_profile.pk),
+            self._item(self.cars[3], end_date=None),
+            {**self._item(self.cars[4]), "car": 999999},
+        ]
+        response = self._client(self.staff).post("/api/reservations/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("already reserved", response.data[1]["non_field_errors"][0])
+        self.assertIn("does not have a profile", response.data[2]["non_field_errors"][0])
+        self.assertIn("end_date", response.data[3])
+        self.assertIn("car", response.data[4])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_customer_books_for_self(self):
+        items = [self._item(self.cars[0], user=self.staff.pk, status="active")]
+        response = self._client(self.customer).post("/api/reservations/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 201)
+        reservation = Reservation.objects.get()
+        self.assertEqual(reservation.user, self.customer)
+        self.assertEqual(reservation.status, "confirmed")
+
+    def test_rejects_invalid_body(self):
+        client = self._client(self.staff)
+        response = client.post("/api/reservations/bulk/", {"car": 1}, format="json")
+        self.assertEqual(response.status_code, 400)
+        items = [self._item(self.cars[0], offset=i * 3) for i in range(101)]
+        response = client.post("/api/reservations/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class ReservationOverlapAPITests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="overlap_staff", password="pass1234", is_staff=True)
+        UserProfile.objects.create(
+            user=self.staff, phone="5550008000", address="Main St 8", city="Istanbul",
+            state="TR", zip_code="34000", license_number="LIC-800",
+            date_of_birth="1990-01-01", is_verified=True, is_active=True,
+        )
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White", daily_rate=Decimal("100.00"),
+        )
+        self.start = timezone.localdate() + timedelta(days=5)
+        self.booked = Reservation.objects.create(
+            user=self.staff, car=self.car, start_date=self.start,
+            end_date=self.start + timedelta(days=3), daily_rate=Decimal("100.00"), status="confirmed",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _post(self, offset):
+        return self.client.post("/api/reservations/", {
+            "user": self.staff.pk,
+            "car": self.car.pk,
+            "start_date": str(self.start + timedelta(days=offset)),
+            "end_date": str(self.start + timedelta(days=offset + 2)),
+            "daily_rate": "100.00",
+        }, format="json")
+
+    def test_create_overlap_is_400(self):
+        response = self._post(offset=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already reserved", response.data["non_field_errors"][0])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_lost_race_is_400(self):
+        # The conflict check passes, the exclusion constraint rejects the row
+        with mock.patch.object(Reservation, "check_date_conflict"):
+            response = self._post(offset=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already reserved", response.data["non_field_errors"][0])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_update_into_overlap_is_400(self):
+        other = self._post(offset=10)
+        self.assertEqual(other.status_code, 201)
+        response = self.client.patch(
+            f"/api/reservations/{other.data['id']}/",
+            {"start_date": str(self.start + timedelta(days=2))},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already reserved", response.data["non_field_errors"][0])
+
+
+class ReservationExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="export_staff", password="pass1234", is_staff=True)
+        cls.customer = User.objects.create_user(username="export_customer", password="pass1234")
+        cars = Car.objects.bulk_create([
+            Car(brand="Brand", model=f"Model {i}", year=2020, color="White",
+                daily_rate=Decimal("100.00"))
+            for i in range(3)
+        ])
+        start = timezone.localdate() + timedelta(days=5)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.customer,
+                car=car,
+                start_date=start + timedelta(days=10 * i),
+                end_date=start + timedelta(days=10 * i + 2),
+                daily_rate=Decimal("100.00"),
+                total_amount=Decimal("200.00"),
+                status="cancelled" if i == 2 else "confirmed",
+            )
+            for i, car in enumerate(cars)
+        ])
+        cls.start = start
+
+    def _get(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(url)
+
+    def test_staff_only(self):
+        response = self._get(self.customer, "/api/reservations/export/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_streams_csv(self):
+        response = self._get(self.staff, "/api/reservations/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["username"], "export_customer")
+        self.assertEqual(rows[0]["total_amount"], "200.00")
+        self.assertEqual(rows[0]["start_date"], self.start.isoformat())
+
+    def test_streams_ndjson_with_filters(self):
+        end = self.start + timedelta(days=10)
+        response = self._get(
+            self.staff,
+            f"/api/reservations/export/?output=ndjson&start={self.start}&end={end}&status=confirmed",
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row["status"] for row in rows}, {"confirmed"})
+
+    def test_invalid_filters(self):
+        for query in ("output=xml", "start=tomorrow", "status=lost"):
+            with self.subTest(query=query):
+                response = self._get(self.staff, f"/api/reservations/export/?{query}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_command_writes_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv") as output:
+            call_command(
+                "export_reservations", status="cancelled", output=output.name,
+                stderr=io.StringIO(),
+            )
+            with open(output.name, newline="") as exported:
+                rows = list(csv.DictReader(exported))
+        self.assertEqual([row["status"] for row in rows], ["cancelled"])
+
+    def test_command_stdout_ndjson(self):
+        stdout = io.StringIO()
+        call_command("export_reservations", format="ndjson", stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 3)
+
+
+class ReportAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="report_staff", password="pass1234", is_staff=True)
+        cls.customer = User.objects.create_user(username="report_customer", password="pass1234")
+        cls.toyota, cls.honda = Car.objects.bulk_create([
+            Car(brand="Toyota", model="Corolla", year=2020, color="White", daily_rate=Decimal("100.00")),
+            Car(brand="Honda", model="Civic", year=2021, color="Black", daily_rate=Decimal("50.00")),
+        ])
+        cls.idle = Car.objects.create(
+            brand="Ford", model="Focus", year=2019, color="Blue", daily_rate=Decimal("80.00"),
+        )
+        # First day of a month that is entirely in the future
+        cls.month = (timezone.localdate().replace(day=1) + timedelta(days=40)).replace(day=1)
+
+        def reservation(car, day, days, status="completed", **extra):
+            start = cls.month + timedelta(days=day)
+            return Reservation(
+                user=cls.customer, car=car, start_date=start, end_date=start + timedelta(days=days),
+                daily_rate=car.daily_rate, total_amount=car.daily_rate * days, status=status, **extra
+            )
+
+        Reservation.objects.bulk_create([
+            reservation(cls.toyota, 0, 3),
+            reservation(cls.toyota, 10, 2, status="cancelled", cancellation_fee=Decimal("100.00")),
+            reservation(cls.honda, 5, 4),
+            reservation(cls.honda, 40, 2),
+            # Paid 150.00, cancelled with a 30.00 fee, 120.00 refunded
+            reservation(
+                cls.honda, 50, 3, status="cancelled", payment_status="refunded",
+                cancellation_fee=Decimal("30.00"), refund_amount=Decimal("120.00"),
+            ),
+        ])
+
+    def _get(self, url, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.staff)
+        return client.get(url)
+
+    def test_staff_only(self):
+        self.assertEqual(self._get("/api/reports/revenue/", self.customer).status_code, 403)
+        self.assertEqual(self._get("/api/reports/utilization/", self.customer).status_code, 403)
+
+    def test_revenue_by_car(self):
+        response = self._get(f"/api/reports/revenue/?group_by=car&start={self.month}")
+        self.assertEqual(response.status_code, 200)
+        rows = {row["car_id"]: row for row in response.data["results"]}
+        self.assertEqual(rows[self.toyota.pk]["booked"], "300.00")
+        self.assertEqual(rows[self.toyota.pk]["cancellation_fees"], "100.00")
+        self.assertEqual(rows[self.toyota.pk]["net"], "400.00")
+        self.assertEqual(rows[self.toyota.pk]["model"], "Corolla")
+        self.assertEqual(rows[self.honda.pk]["reservations"], 3)
+        self.assertEqual(rows[self.honda.pk]["booked"], "300.00")
+        self.assertEqual(rows[self.honda.pk]["refunds"], "120.00")
+        # 300.00 booked + the 30.00 kept of the refunded booking
+        self.assertEqual(rows[self.honda.pk]["net"], "330.00")
+        self.assertNotIn(self.idle.pk, rows)
+
+    def test_revenue_by_month_and_brand(self):
+        response = self._get(f"/api/reports/revenue/?start={self.month}")
+        months = [row["month"] for row in response.data["results"]]
+        self.assertEqual(len(months), 2)
+        self.assertEqual(months[0], self.month)
+
+        end = self.month + timedelta(days=20)
+        response = self._get(f"/api/reports/revenue/?group_by=brand&start={self.month}&end={end}")
+        brands = {row["brand"]: row["booked"] for row in response.data["results"]}
+        self.assertEqual(brands, {"Honda": "200.00", "Toyota": "300.00"})
+
+    def test_revenue_runs_in_sql(self):
+        with mock.patch.object(Reservation, "get_total_amount") as total:
+            with self.assertNumQueries(2):
+                self._get(f"/api/reports/revenue/?group_by=car&start={self.month}")
+        total.assert_not_called()
+
+    def test_utilization(self):
+        start = self.month + timedelta(days=1)
+        end = self.month + timedelta(days=11)
+        response = self._get(f"/api/reports/utilization/?start={start}&end={end}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["days"], 10)
+        cars = {row["car_id"]: row for row in response.data["cars"]}
+        # Toyota: days 1-2 of its 0-3 rental (the cancelled one doesn't count)
+        self.assertEqual(cars[self.toyota.pk]["booked_days"], 2)
+        self.assertEqual(cars[self.honda.pk]["booked_days"], 4)
+        self.assertEqual(cars[self.honda.pk]["ratio"], 0.4)
+        self.assertEqual(cars[self.idle.pk]["booked_days"], 0)
+        self.assertEqual(response.data["fleet"]["booked_days"], 6)
+        self.assertEqual(response.data["fleet"]["ratio"], 0.2)
+
+    def test_invalid_params(self):
+        for url in (
+            "/api/reports/revenue/?group_by=color",
+            "/api/reports/revenue/?start=yesterday",
+            "/api/reports/revenue/?start=2026-02-30",
+            "/api/reports/utilization/?end=2026-13-01",
+            "/api/reports/utilization/?start=2030-02-01&end=2030-01-01",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self._get(url).status_code, 400)
+
+
+class OccupancyMatrixTests(TestCase):
+    def test_matrix_matches_intervals(self):
+        matrix = occupancy_matrix(
+            car_ids=np.array([3, 7, 9]),
+            interval_car_ids=np.array([3, 3, 7, 9, 9]),
+            first_days=np.array([-2, 4, 1, 9, 5]),
+            last_days=np.array([1, 5, 1, 12, 6]),
+            days=10,
+        )
+        expected = np.zeros((3, 10), dtype=bool)
+        expected[0, 0:2] = expected[0, 4:6] = True
+        expected[1, 1] = True
+        expected[2, 5:7] = expected[2, 9] = True
+        np.testing.assert_array_equal(matrix, expected)
+
+    def test_overlapping_intervals_and_encodings(self):
+        matrix = occupancy_matrix(
+            np.array([1, 2]), np.array([1, 1]), np.array([0, 2]), np.array([3, 4]), days=9
+        )
+        self.assertEqual(matrix[0].tolist(), [True] * 5 + [False] * 4)
+        self.assertFalse(matrix[1].any())
+        self.assertEqual(encode_runs(matrix), [[[0, 5]], []])
+        # 11111000 0 -> 0xF8 0x00
+        self.assertEqual(encode_bitmap(matrix)[0], "+AA=")
+
+        metrics = car_metrics(matrix)
+        self.assertEqual(metrics["occupied_days"].tolist(), [5, 0])
+        self.assertEqual(metrics["longest_idle"].tolist(), [4, 9])
+        self.assertEqual(metrics["idle_streaks"].tolist(), [1, 1])
+
+
+class OccupancyAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="occupancy_staff", password="pass1234", is_staff=True)
+        cls.customer = User.objects.create_user(username="occupancy_customer", password="pass1234")
+        cls.cars = Car.objects.bulk_create([
+            Car(brand=brand, model=f"Model {i}", year=2020, color="White", daily_rate=Decimal("100.00"))
+            for i, brand in enumerate(["Toyota", "Toyota", "Honda"])
+        ])
+        cls.start = timezone.localdate() + timedelta(days=1)
+
+        def reservation(car, day, days, status="confirmed"):
+            return Reservation(
+                user=cls.customer, car=car,
+                start_date=cls.start + timedelta(days=day),
+                end_date=cls.start + timedelta(days=day + days),
+                daily_rate=Decimal("100.00"), total_amount=Decimal("100.00") * days, status=status,
+            )
+
+        Reservation.objects.bulk_create([
+            reservation(cls.cars[0], 0, 2),
+            reservation(cls.cars[0], 5, 1, status="cancelled"),
+            reservation(cls.cars[2], 3, 1, status="pending"),
+        ])
+
+    def _get(self, url, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.staff)
+        return client.get(url)
+
+    def test_rle_grid_and_metrics(self):
+        response = self._get(f"/api/reports/occupancy/?start={self.start}&days=10&encoding=rle")
+        self.assertEqual(response.status_code, 200)
+        cars = {row["car_id"]: row for row in response.data["cars"]}
+        first, idle, honda = (cars[car.pk] for car in self.cars)
+        # Inclusive of end_date; the cancelled booking is ignored
+        self.assertEqual(first["occupancy"], [[0, 3]])
+        self.assertEqual(first["longest_idle"], 7)
+        self.assertEqual(idle["occupancy"], [])
+        self.assertEqual(honda["occupancy"], [[3, 2]])
+        self.assertEqual(honda["idle_streaks"], 2)
+
+        brands = {row["brand"]: row for row in response.data["brands"]}
+        self.assertEqual(brands["Toyota"]["peak_occupancy"], 0.5)
+        self.assertEqual(brands["Honda"]["peak_day"], 3)
+        self.assertEqual(response.data["fleet_daily"][:5], [1, 1, 1, 1, 1])
+
+    def test_bitmap_default(self):
+        response = self._get(f"/api/reports/occupancy/?start={self.start}")
+        self.assertEqual(response.data["days"], 90)
+        cars = {row["car_id"]: row for row in response.data["cars"]}
+        bits = np.unpackbits(np.frombuffer(
+            base64.b64decode(cars[self.cars[0].pk]["occupancy"]), dtype=np.uint8
+        ))[:90]
+        self.assertEqual(np.flatnonzero(bits).tolist(), [0, 1, 2])
+
+    def test_invalid_params_and_permissions(self):
+        self.assertEqual(self._get("/api/reports/occupancy/", self.customer).status_code, 403)
+        for query in ("days=0", "days=500", "days=many", "encoding=png",
+                      "start=2026-02-30", "start=soon"):
+            with self.subTest(query=query):
+                self.assertEqual(self._get(f"/api/reports/occupancy/?{query}").status_code, 400)
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        cls.customer = User.objects.create_user(username="customer", password="pass1234")
+        UserProfile.objects.create(
+            user=cls.customer, phone="5550000000", address="Street 1", city="Istanbul",
+            state="Istanbul", zip_code="34000", license_number="METRICS1",
+            date_of_birth=date(1990, 1, 1), is_verified=True,
+        )
+        cls.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White", daily_rate=Decimal("100.00"),
+        )
+        start = timezone.localdate() + timedelta(days=5)
+        cls.reservation = Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.customer, car=cls.car, start_date=start, end_date=start + timedelta(days=2),
+                daily_rate=Decimal("100.00"), total_amount=Decimal("200.00"), status="confirmed",
+            ),
+        ])[0]
+
+    def setUp(self):
+        cache.clear()
+        metrics_registry.reset()
+        self.client = APIClient()
+
+    def _sample(self, name, **labels):
+        prefix = name + "{" + ",".join(f'{key}="{value}"' for key, value in labels.items())
+        for line in metrics_registry.render().splitlines():
+            if line.startswith(prefix + "}") or line.startswith(prefix + ","):
+                return float(line.rsplit(" ", 1)[1])
+        return None
+
+    def test_query_count_per_view(self):
+        self.client.force_authenticate(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/reservations/")
+        self.assertEqual(
+            self._sample("db_queries_per_request_sum", view="reservation-list", method="GET"),
+            len(queries),
+        )
+        self.assertEqual(
+            self._sample("http_requests_total", view="reservation-list", method="GET", status=200), 1
+        )
+        self.assertEqual(
+            self._sample("http_request_duration_seconds_count", view="reservation-list", method="GET"), 1
+        )
+        self.assertGreater(
+            self._sample("db_query_duration_seconds_total", view="reservation-list", method="GET"), 0
+        )
+
+    def test_actions_have_their_own_series(self):
+        self.client.force_authenticate(self.customer)
+        self.client.post(f"/api/reservations/{self.reservation.pk}/activate/")
+        self.client.post(f"/api/reservations/{self.reservation.pk}/cancel/", {"reason": "Plans changed"})
+
+        self.assertEqual(
+            self._sample("http_requests_total", view="reservation-activate", method="POST", status=403), 1
+        )
+        self.assertEqual(
+            self._sample("http_requests_total", view="reservation-cancel", method="POST", status=200), 1
+        )
+        self.assertGreater(
+            self._sample("db_queries_per_request_sum", view="reservation-cancel", method="POST"), 0
+        )
+
+    async def test_async_view_queries_counted(self):
+        # Through the ASGI handler: the ORM runs in a sync_to_async thread
+        response = await self.async_client.get(f"/api/async/cars/{self.car.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self._sample("db_queries_per_request_sum", view="async-car-detail", method="GET"), 1
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/cars/")
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn('http_request_duration_seconds_bucket{view="car-list",method="GET",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_middleware_removable(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
+
+
+class SeedingTests(TestCase):
+    def test_seed_dataset(self):
+        counts = seed_dataset(cars=4, users=6, reservations=50, batch_size=7, seed=3)
+
+        self.assertEqual(counts, {"cars": 4, "users": 6, "reservations": 50})
+        self.assertEqual(Reservation.objects.count(), 50)
+        self.assertEqual(UserProfile.objects.count(), 6)
+        # Indexes and constraints dropped for the load are back
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Reservation._meta.db_table)
+        self.assertIn("reservation_no_overlap", constraints)
+        self.assertIn("res_status_end_idx", constraints)
+        self.assertTrue(any(item["foreign_key"] for item in constraints.values()))
+
+        today = timezone.localdate()
+        for reservation in Reservation.objects.all():
+            self.assertGreater(reservation.end_date, reservation.start_date)
+            self.assertEqual(
+                reservation.total_amount, reservation.daily_rate * reservation.get_duration_days()
+            )
+            if reservation.start_date > today:
+                self.assertIn(reservation.status, ("pending", "confirmed"))
+            if reservation.status == "active":
+                self.assertLessEqual(reservation.start_date, today)
+                self.assertGreaterEqual(reservation.end_date, today)
+
+        # Same seed, same data
+        def histories(seed):
+            return list(generate_reservations(
+                [(1, Decimal("50.00")), (2, Decimal("80.00"))], [1, 2], 30, random.Random(seed), today
+            ))
+
+        self.assertEqual(histories(5), histories(5))
+        self.assertNotEqual(histories(5), histories(6))
+
+    def test_find_regressions(self):
+        baseline = {"car_list": {"median_ms": 10.0}, "gone": {"median_ms": 1.0}}
+        results = {
+            "car_list": {"median_ms": 13.0},
+            "new_path": {"median_ms": 50.0},
+        }
+
+        self.assertEqual(find_regressions(results, baseline, 1.25), [("car_list", 10.0, 13.0, 1.3)])
+        self.assertEqual(find_regressions(results, baseline, 1.5), [])
+        # Growth under the noise floor never counts
+        self.assertEqual(find_regressions(results, baseline, 1.25, min_delta_ms=5.0), [])
+
+
+@override_settings(REPLICA_DATABASE="replica")
+class ReplicaReportTests(TransactionTestCase):
+    # The replica alias mirrors default in tests: reports and exports must
+    # run their queries on its connection
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        customer = User.objects.create_user(username="customer", password="pass1234")
+        self.car = Car.objects.create(
+            brand="Toyota", model="Corolla", year=2020, color="White", daily_rate=Decimal("100.00"),
+        )
+        self.start = timezone.localdate() + timedelta(days=5)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=customer, car=self.car, start_date=self.start,
+                end_date=self.start + timedelta(days=3), daily_rate=Decimal("100.00"),
+                total_amount=Decimal("300.00"), status="confirmed",
+            ),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _capture(self):
+        return (
+            CaptureQueriesContext(connections["default"]),
+            CaptureQueriesContext(connections["replica"]),
+        )
+
+    def test_reports_read_replica(self):
+        primary, replica = self._capture()
+        with primary, replica:
+            response = self.client.get(
+                f"/api/reports/utilization/?start={self.start}&end={self.start + timedelta(days=10)}"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(car["car_id"], car["booked_days"]) for car in response.data["cars"]],
+            [(self.car.pk, 3)],
+        )
+        self.assertEqual(len(primary), 0)
+        self.assertGreater(len(replica), 0)
+
+    def test_streamed_export_reads_replica(self):
+        primary, replica = self._capture()
+        with primary, replica:
+            response = self.client.get("/api/reservations/export/?output=ndjson")
+            rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["car_id"] for row in rows], [self.car.pk])
+        self.assertEqual(len(primary), 0)
+        self.assertGreater(len(replica), 0)
@@ -3,17 +3,30 @@ Reservation API Views
 Provides REST API endpoints for Reservation model
 """
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as ModelValidationError
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
+from rest_framework.settings import api_settings
+from car_rental.conditional import ConditionalGetMixin
+from car_rental.db_router import ReplicaReadMixin
+from car_rental.listing import ValuesListMixin
+from .export import FORMATS, export_queryset, parse_filters, stream_rows
 from .models import Reservation
-from .serializers import ReservationSerializer
+from .occupancy import ENCODINGS, occupancy_report
+from .reports import REVENUE_GROUPS, revenue_report, utilization_report
+from .serializers import ReservationBulkItemSerializer, ReservationSerializer
 from .permissions import IsAdminOrOwner
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
 from decimal import Decimal
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     API endpoint for Reservation model
 
@@ -23,13 +36,106 @@ class ReservationViewSet(viewsets.ModelViewSet):
         - GET /api/reservations/{id}/ → Retrieve reservation details
         - PUT /api/reservations/{id}/ → Update reservation
         - DELETE /api/reservations/{id}/ → Delete reservation
+        - POST /api/reservations/bulk/ → Create a batch of reservations
+        - GET /api/reservations/export/ → Streamed CSV / NDJSON export (staff)
 
     Permissions:
         - All operations: Only authenticated users
+
+    Sparse output (GET):
+        - ?fields=id,start_date,end_date → Only these fields
+        - ?expand=car,user → Nested objects to embed (default: both,
+          ?expand= for none); unexpanded relations are not joined
+
+    The list is rendered from values() rows (car_rental/listing.py): only
+    the columns of the requested fields are selected, joins included.
+
+    Conditional GET:
+        - retrieve sends ETag + Last-Modified (reservation and car
+          updated_at), list an ETag of the page rows; unchanged resources
+          get a 304
     """
     serializer_class = ReservationSerializer
     permission_classes = [IsAdminOrOwner]
 
+    # Largest batch accepted by the bulk action
+    bulk_max_items = 100
+
+    def get_etag_scope(self, request):
+        # Staff and customers get different field sets
+        return f"{request.user.pk}:{request.user.is_staff}"
+
+    def get_last_modified_fields(self):
+        # Nested car_details changes with the car, so it counts as a modification
+        if 'car' in self.get_expanded_relations():
+            return ('updated_at', 'car__updated_at')
+        return ('updated_at',)
+
+    def _split_param(self, name):
+        raw = self.request.query_params.get(name)
+        if raw is None:
+            return None
+        return {item.strip() for item in raw.split(',') if item.strip()}
+
+    def get_output_options(self):
+        """
+        Sparse fieldset options from ?fields= and ?expand= (reads only;
+        writes always use the full serializer)
+
+        Returns:
+            tuple: (requested fields or None, expand names)
+        """
+        if not hasattr(self, '_output_options'):
+            fields = None
+            expand = set(ReservationSerializer.EXPANDABLE)
+
+            if self.request.method in SAFE_METHODS:
+                fields = self._split_param('fields')
+                requested_expand = self._split_param('expand')
+                if requested_expand is not None:
+                    unknown = requested_expand - expand
+                    if unknown:
+                        raise ValidationError(
+                            {"expand": f"Unknown relations: {', '.join(sorted(unknown))}"}
+                        )
+                    expand = requested_expand
+
+            self._output_options = (fields, expand)
+        return self._output_options
+
+    def get_expanded_relations(self):
+        """
+        Relations that will actually be embedded in the output
+
+        Returns:
+            list: Subset of ['car', 'user']
+        """
+        fields, expand = self.get_output_options()
+        return [
+            name
+            for name, field_name in ReservationSerializer.EXPANDABLE.items()
+            if name in expand and (fields is None or field_name in fields)
+        ]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self.get_output_options()
+        context['fields'] = fields
+        context['expand'] = expand
+        return context
+
+    def _get_only_fields(self, fields, expanded):
+        """
+        Model columns needed to render the requested fields
+        (plus what permissions, pagination and ETags read)
+        """
+        model_fields = {field.name for field in Reservation._meta.concrete_fields}
+        columns = {'id', 'user', 'created_at', 'updated_at'} | (fields & model_fields)
+        columns |= set(expanded)
+        if 'days_count' in fields:
+            columns |= {'start_date', 'end_date'}
+        return columns
+
     def get_queryset(self):
         """
         Filter reservations based on user role
@@ -38,13 +144,34 @@ class ReservationViewSet(viewsets.ModelViewSet):
             QuerySet: All reservations for admin, user's own for regular users
         """
         user = self.request.user
+        fields, _ = self.get_output_options()
+        expanded = self.get_expanded_relations()
+
+        # Nested details are serialized for every row: join them up front,
+        # but only the ones that are actually expanded
+        queryset = Reservation.objects.all()
+        if expanded:
+            queryset = queryset.select_related(*expanded)
+        if fields is not None:
+            queryset = queryset.only(*self._get_only_fields(fields, expanded))
 
         # Admin/Staff can see all reservations
         if user.is_staff:
-            return Reservation.objects.all()
+            return queryset
 
         # Regular users can only see their own reservations
-        return Reservation.objects.filter(user=user)
+        return queryset.filter(user=user)
+
+    def _save(self, serializer, **kwargs):
+        """
+        serializer.save(), with Reservation.save()'s model ValidationError
+        (clean() rules, a date conflict, a lost race on the overlap
+        constraint) raised as a 400 instead of a 500
+        """
+        try:
+            serializer.save(**kwargs)
+        except ModelValidationError as exc:
+            raise ValidationError(self._validation_error_detail(exc))
 
     def perform_create(self, serializer):
         """
@@ -52,9 +179,118 @@ class ReservationViewSet(viewsets.ModelViewSet):
         Admin can override by specifying user in request
         """
         if self.request.user.is_staff:
-            serializer.save()
+            self._save(serializer)
+        else:
+            self._save(serializer, user=self.request.user, status='confirmed')
+
+    def perform_update(self, serializer):
+        self._save(serializer)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create a batch of reservations, all or nothing.
+
+        Body: list of {car, start_date, end_date[, daily_rate, user, status]}
+        (no daily_rate: priced from the car's rate calendar)
+        (user/status: staff only; regular users book for themselves, confirmed)
+
+        The batch is validated as a whole (Reservation.clean_batch: fixed
+        number of queries, overlaps inside the batch included) and inserted
+        with one bulk_create.
+
+        Returns:
+            201: Created reservations, in input order
+            400: List of per-item errors aligned with the input ({} = valid)
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "Expected a non-empty list of reservations."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {"detail": f"At most {self.bulk_max_items} reservations per batch."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        errors = [{} for _ in items]
+        reservations = []
+        positions = []
+        for index, item in enumerate(items):
+            serializer = ReservationBulkItemSerializer(
+                data=item, context=self.get_serializer_context()
+            )
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            reservation = Reservation(**serializer.validated_data)
+            if not request.user.is_staff:
+                reservation.user_id = request.user.id
+                reservation.status = 'confirmed'
+            reservations.append(reservation)
+            positions.append(index)
+
+        if any(errors):
+            # Parse errors first: report the rest of the batch as well
+            batch_errors = Reservation.clean_batch(reservations)
         else:
-            serializer.save(user=self.request.user, status='confirmed')
+            batch_errors = Reservation.create_batch(reservations)
+
+        for position, exc in batch_errors.items():
+            errors[positions[position]] = self._validation_error_detail(exc)
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(reservations, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _validation_error_detail(self, exc):
+        if hasattr(exc, 'error_dict'):
+            return exc.message_dict
+        return {api_settings.NON_FIELD_ERRORS_KEY: exc.messages}
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Stream every reservation matching the filters (staff only).
+
+        Query params:
+            - output: csv (default) or ndjson
+            - start / end: YYYY-MM-DD bounds on start_date
+            - status: Comma-separated statuses
+
+        Rows are streamed straight from a database cursor, so memory use
+        does not depend on the number of reservations.
+        """
+        output_format = request.query_params.get("output", "csv")
+        if output_format not in FORMATS:
+            return Response(
+                {"detail": f"output must be one of: {', '.join(FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            filters = parse_filters(
+                start=request.query_params.get("start"),
+                end=request.query_params.get("end"),
+                status=request.query_params.get("status"),
+            )
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The body is read after the view returns: pick the database now
+        queryset = export_queryset(**filters)
+        queryset = queryset.using(queryset.db)
+
+        content_type = "text/csv" if output_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(
+            stream_rows(queryset, output_format),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="reservations.{output_format}"'
+        return response
 
     @action(detail=True, methods=['post'])
     def activate(self, request, pk=None):
@@ -181,6 +417,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
         reservation.payment_method = request.data.get("payment_method", "credit_card")
         reservation.stripe_payment_id = request.data.get("stripe_payment_id", "")
         reservation.paid_at = timezone.now()
+        reservation.payment_deadline = None
 
         # NOTE: remaining_amount stays for future partial-payment (e.g., deposit) support.
         reservation.payment_status = 'paid'
@@ -276,4 +513,126 @@ class ReservationViewSet(viewsets.ModelViewSet):
             {"reservation_id": reservation.id, "cancellation_fee": fee},
             status=status.HTTP_200_OK,
         )
-        
\ No newline at end of file
+        
+
+
+class ReportViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """
+    Staff reports, aggregated in the database (see reservations/reports.py)
+
+    Provides:
+        - GET /api/reports/revenue/?group_by=month|car|brand&start=&end=
+          → booked amount, cancellation fees, refunds and net per group
+          (default: reservations starting in the last 365 days)
+        - GET /api/reports/utilization/?start=&end=
+          → booked days / window days per car (default: last 30 days)
+        - GET /api/reports/occupancy/?start=&days=90&encoding=bitmap|rle
+          → cars × days occupancy grid with per-car and per-brand metrics
+    """
+    permission_classes = [IsAdminUser]
+
+    # Windows when no dates are given
+    default_revenue_days = 365
+    default_window_days = 30
+    default_occupancy_days = 90
+    max_occupancy_days = 366
+
+    def _parse_dates(self, request):
+        """
+        Returns:
+            tuple: (start, end) dates or None when not given
+
+        Raises:
+            ValidationError: Invalid date or start after end
+        """
+        dates = []
+        for name in ("start", "end"):
+            raw = request.query_params.get(name)
+            try:
+                # None when malformed, ValueError when impossible (2026-02-30)
+                value = parse_date(raw) if raw else None
+            except ValueError:
+                value = None
+            if raw and value is None:
+                raise ValidationError({name: "Must be a date (YYYY-MM-DD)."})
+            dates.append(value)
+        start, end = dates
+        if start and end and start > end:
+            raise ValidationError({"detail": "Start date must not be after end date."})
+        return start, end
+
+    @action(detail=False, methods=['get'])
+    def revenue(self, request):
+        """
+        Revenue grouped by month (of start_date), car or brand.
+        start / end bound start_date (inclusive); end may be left open
+        when start is given.
+        """
+        group_by = request.query_params.get("group_by", "month")
+        if group_by not in REVENUE_GROUPS:
+            return Response(
+                {"group_by": f"Must be one of: {', '.join(REVENUE_GROUPS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end = self._parse_dates(request)
+        if start is None and end is None:
+            end = timezone.localdate()
+        if start is None:
+            start = end - timedelta(days=self.default_revenue_days)
+        return Response(
+            {
+                "group_by": group_by,
+                "start": start,
+                "end": end,
+                "results": revenue_report(group_by, start, end),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=['get'])
+    def utilization(self, request):
+        """
+        Booked-days ratio per car over the window start <= day < end.
+        """
+        start, end = self._parse_dates(request)
+        if end is None:
+            end = timezone.localdate()
+        if start is None:
+            start = end - timedelta(days=self.default_window_days)
+        if start >= end:
+            return Response(
+                {"detail": "Start date must be before end date."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(utilization_report(start, end), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def occupancy(self, request):
+        """
+        Live-reservation occupancy of every car, day by day, from start
+        (default: today) for `days` days.
+
+        encoding=bitmap: base64 of the packed day bits per car
+        encoding=rle: [first_day, length] occupied runs per car
+        """
+        start, _ = self._parse_dates(request)
+        if start is None:
+            start = timezone.localdate()
+
+        encoding = request.query_params.get("encoding", "bitmap")
+        if encoding not in ENCODINGS:
+            return Response(
+                {"encoding": f"Must be one of: {', '.join(ENCODINGS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            days = int(request.query_params.get("days", self.default_occupancy_days))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= self.max_occupancy_days:
+            return Response(
+                {"days": f"Must be between 1 and {self.max_occupancy_days}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(occupancy_report(start, days, encoding), status=status.HTTP_200_OK)